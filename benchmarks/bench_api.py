@@ -0,0 +1,261 @@
+"""
+End-to-end load test of POST /analyze: boots the API (with the real or stub MCP
+servers), drives it from concurrent keep-alive connections with a mix of
+billing, tech, both and unknown-intent requests, and reports latency
+percentiles, throughput and error rate per request kind.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_api --servers stub --concurrency 16 --requests 2000
+    python -m benchmarks.bench_api --servers real --mix billing=1,tech=1 --compare
+    python -m benchmarks.bench_api --url http://127.0.0.1:8000 --requests 500   # already running API
+
+--save-baseline stores the results under benchmarks/baselines/, --compare checks
+a run against the stored baseline and exits with status 1 on a regression.
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlparse
+
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_DIR = os.path.join(PROJECT_ROOT, "benchmarks", "baselines")
+SERVER_LOG = os.path.join(tempfile.gettempdir(), "sentinel_bench_api.log")
+
+MESSAGES = {
+    "billing": "Why is my bill so expensive this month?",
+    "tech": "My internet is very slow in Zone B",
+    "both": "My bill is huge! And my internet is very slow in Zone B.",
+    "unknown": "Hello, I would like to talk to someone please.",
+}
+DEFAULT_MIX = "billing=0.3,tech=0.3,both=0.3,unknown=0.1"
+STUB_MODULES = {
+    "SENTINEL_BILLING_SERVER_MODULE": "benchmarks.stub_billing_server",
+    "SENTINEL_TECH_SERVER_MODULE": "benchmarks.stub_tech_server",
+}
+
+
+def parse_mix(mix):
+    weights = {}
+    for part in mix.split(","):
+        kind, _, weight = part.partition("=")
+        if kind not in MESSAGES:
+            raise ValueError(f"Unknown request kind '{kind}'. Choose from: {', '.join(MESSAGES)}")
+        weights[kind] = float(weight or 1)
+    return weights
+
+
+def boot_api(args):
+    """Starts uvicorn in a subprocess and waits until GET /ready answers 200."""
+    env = dict(os.environ, PYTHONPATH=PROJECT_ROOT)
+    if args.servers == "stub":
+        env.update(STUB_MODULES)
+        env["SENTINEL_STUB_LATENCY_MS"] = str(args.stub_latency_ms)
+    if not args.response_cache:
+        # Repeated (customer, message) pairs would otherwise be answered from the cache
+        env["SENTINEL_RESPONSE_CACHE_SIZE"] = "0"
+    log = open(SERVER_LOG, "w")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.api:app", "--port", str(args.port), "--log-level", "warning"],
+        cwd=PROJECT_ROOT, env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+
+    start = time.perf_counter()
+    while time.perf_counter() - start < args.boot_timeout:
+        if process.poll() is not None:
+            raise RuntimeError(f"API exited during startup (code {process.returncode}), see {SERVER_LOG}")
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", args.port, timeout=2)
+            connection.request("GET", "/ready")
+            if connection.getresponse().status == 200:
+                return process, round(time.perf_counter() - start, 2)
+        except OSError:
+            pass
+        time.sleep(0.25)
+    process.kill()
+    raise RuntimeError(f"API not ready within {args.boot_timeout}s, see {SERVER_LOG}")
+
+
+def run_load(url, weights, concurrency, total_requests, warmup, customers, timeout, seed):
+    """
+    Closed-loop load: each worker thread keeps one keep-alive connection and
+    sends its next request as soon as the previous one returns.
+    Returns one (kind, latency_ms, outcome) tuple per measured request, and the
+    wall-clock time from the first measured request to the last answer.
+    """
+    target = urlparse(url)
+    kinds, probabilities = list(weights), np.array(list(weights.values()))
+    rng = random.Random(seed)
+    plan = [
+        (kind, f"CUST_{rng.randint(1, customers):04d}")
+        for kind in rng.choices(kinds, weights=probabilities, k=warmup + total_requests)
+    ]
+    results = [None] * len(plan)
+    next_index = iter(range(len(plan)))
+    lock = threading.Lock()
+
+    def worker():
+        connection = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=timeout)
+        while True:
+            with lock:
+                index = next(next_index, None)
+            if index is None:
+                break
+            kind, customer_id = plan[index]
+            body = json.dumps({"customer_id": customer_id, "message": MESSAGES[kind]})
+            start = time.perf_counter()
+            try:
+                connection.request("POST", "/analyze", body=body, headers={"Content-Type": "application/json"})
+                response = connection.getresponse()
+                payload = response.read()
+                if response.status != 200:
+                    outcome = f"http_{response.status}"
+                else:
+                    outcome = "partial" if json.loads(payload).get("status") == "partial" else "ok"
+            except (OSError, http.client.HTTPException, ValueError) as e:
+                outcome = type(e).__name__
+                connection.close()
+                connection = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=timeout)
+            end = time.perf_counter()
+            results[index] = (kind, (end - start) * 1000, outcome, start, end)
+        connection.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    measured = results[warmup:]
+    elapsed = max(row[4] for row in measured) - min(row[3] for row in measured)
+    return [row[:3] for row in measured], elapsed
+
+
+def summarize(results, elapsed):
+    def stats(rows):
+        latencies = np.array([latency for _, latency, _ in rows])
+        errors = sum(outcome not in ("ok", "partial") for _, _, outcome in rows)
+        return {
+            "requests": len(rows),
+            "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+            "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+            "p99_ms": round(float(np.percentile(latencies, 99)), 2),
+            "max_ms": round(float(latencies.max()), 2),
+            "error_rate": round(errors / len(rows), 4),
+            "partial_rate": round(sum(outcome == "partial" for _, _, outcome in rows) / len(rows), 4),
+        }
+
+    summary = dict(stats(results), throughput_rps=round(len(results) / elapsed, 1))
+    summary["by_kind"] = {
+        kind: stats([row for row in results if row[0] == kind])
+        for kind in MESSAGES if any(row[0] == kind for row in results)
+    }
+    outcomes = {}
+    for _, _, outcome in results:
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+    summary["outcomes"] = outcomes
+    return summary
+
+
+def compare(summary, baseline, tolerance):
+    """Returns the regressions of `summary` against `baseline` (empty when within tolerance)."""
+    regressions = []
+    for key in ("p50_ms", "p95_ms", "p99_ms"):
+        if summary[key] > baseline[key] * (1 + tolerance):
+            regressions.append(f"{key}: {summary[key]} > {baseline[key]} (+{tolerance:.0%})")
+    if summary["throughput_rps"] < baseline["throughput_rps"] * (1 - tolerance):
+        regressions.append(f"throughput_rps: {summary['throughput_rps']} < {baseline['throughput_rps']} (-{tolerance:.0%})")
+    if summary["error_rate"] > baseline["error_rate"] + 0.001:
+        regressions.append(f"error_rate: {summary['error_rate']} > {baseline['error_rate']}")
+    return regressions
+
+
+def print_summary(summary):
+    columns = ["requests", "p50_ms", "p95_ms", "p99_ms", "max_ms", "error_rate", "partial_rate"]
+    print(f"{'kind':<10}" + "".join(f"{column:>14}" for column in columns))
+    for kind, stats in list(summary["by_kind"].items()) + [("all", summary)]:
+        print(f"{kind:<10}" + "".join(f"{stats[column]:>14}" for column in columns))
+    print(f"Throughput: {summary['throughput_rps']} req/s, outcomes: {summary['outcomes']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end /analyze load test")
+    parser.add_argument("--servers", choices=["stub", "real"], default="stub", help="MCP servers behind the API")
+    parser.add_argument("--url", help="Benchmark an API that is already running instead of booting one")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Weights per request kind, e.g. billing=1,tech=1")
+    parser.add_argument("--customers", type=int, default=100, help="Customer ids drawn from CUST_0001..N")
+    parser.add_argument("--stub-latency-ms", type=float, default=5.0)
+    parser.add_argument("--response-cache", action="store_true", help="Keep the API response cache enabled")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request client timeout (s)")
+    parser.add_argument("--boot-timeout", type=float, default=180.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline", help="Baseline file (default: benchmarks/baselines/api_<servers>.json)")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true", help="Exit with status 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown")
+    args = parser.parse_args()
+
+    weights = parse_mix(args.mix)
+    process = None
+    boot_s = None
+    if args.url:
+        url = args.url
+    else:
+        print(f"Booting the API with {args.servers} MCP servers on port {args.port}...")
+        process, boot_s = boot_api(args)
+        url = f"http://127.0.0.1:{args.port}"
+        print(f"API ready in {boot_s}s")
+
+    try:
+        print(f"Sending {args.requests} requests (+{args.warmup} warm-up) from {args.concurrency} connections, mix {weights}")
+        results, elapsed = run_load(
+            url, weights, args.concurrency, args.requests, args.warmup, args.customers, args.timeout, args.seed
+        )
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+
+    summary = summarize(results, elapsed)
+    summary["boot_s"] = boot_s
+    print_summary(summary)
+
+    baseline_path = args.baseline or os.path.join(BASELINE_DIR, f"api_{args.servers}.json")
+    config = {
+        "servers": args.servers, "concurrency": args.concurrency, "requests": args.requests,
+        "mix": weights, "stub_latency_ms": args.stub_latency_ms if args.servers == "stub" else None,
+        "response_cache": args.response_cache,
+    }
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(baseline_path), exist_ok=True)
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump({"config": config, "machine": platform.platform(), "cpus": os.cpu_count(), "results": summary}, f, indent=2)
+        print(f"Baseline saved to {baseline_path}")
+
+    if args.compare:
+        with open(baseline_path, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["config"] != config:
+            print(f"Warning: baseline was recorded with a different configuration: {baseline['config']}")
+        regressions = compare(summary, baseline["results"], args.tolerance)
+        if regressions:
+            print("REGRESSION against baseline:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print(f"No regression against {baseline_path} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
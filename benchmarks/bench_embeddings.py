@@ -0,0 +1,143 @@
+"""
+Compares the embedding backends (torch, int8, onnx) of the tech agent on the
+shipped knowledge base: retrieval quality on a labelled query set, agreement
+with the full-precision torch reference, model load time and encode latency.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_embeddings --threads 2
+Each backend runs in a fresh subprocess, so load time and thread settings are not shared.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Query -> ISSUE number of the section that answers it
+LABELLED_QUERIES = [
+    ("My internet is very slow and I live in Zone B", "105"),
+    ("Zone B customer complains the connection is sluggish, maybe firmware", "105"),
+    ("Slow connection, I see packet loss", "105"),
+    ("The box has a red light on it", "202"),
+    ("No internet at all since this morning", "202"),
+    ("Optical box shows red, I think the cable was cut", "202"),
+    ("My TV keeps freezing", "303"),
+    ("The picture on the decoder freezes when I watch a movie", "303"),
+    ("HDMI image stuck on the TV box", "303"),
+    ("WiFi drops every time I use the microwave", "404"),
+    ("Wireless keeps disconnecting, lots of neighbor networks", "404"),
+    ("Which WiFi channel should I use to stop drops?", "404"),
+    ("Internet is slow and the signal is weak", "101"),
+    ("Signal is at -85dBm, do I need a repeater?", "101"),
+    ("Slow internet, should I restart the box?", "101"),
+]
+
+
+def run_backend(args):
+    from src.embeddings import load_embedding_model
+    from src.tech_agent import split_sections
+
+    with open(os.path.join(args.data_dir, "knowledge_base.txt"), "r", encoding="utf-8") as f:
+        chunks = split_sections(f.read())
+    titles = [title for _, title, _, _ in chunks]
+    documents = [document for _, _, document, _ in chunks]
+    queries = [query for query, _ in LABELLED_QUERIES]
+
+    start = time.perf_counter()
+    model = load_embedding_model(args.model, args.backend, args.threads)
+    load_ms = (time.perf_counter() - start) * 1000
+
+    def encode(texts):
+        return model.encode(list(texts), normalize_embeddings=True, convert_to_numpy=True).astype(np.float32)
+
+    doc_embeddings = encode(documents)
+    query_embeddings = encode(queries)
+    top1 = np.argmax(query_embeddings @ doc_embeddings.T, axis=1)
+    hits = sum(f"ISSUE {label}:" in titles[i] for i, (_, label) in zip(top1, LABELLED_QUERIES))
+
+    encode(queries[:2])  # warm-up
+    latencies = []
+    for _ in range(args.repeat):
+        for query in queries:
+            t = time.perf_counter()
+            encode([query])
+            latencies.append((time.perf_counter() - t) * 1000)
+    t = time.perf_counter()
+    for _ in range(args.repeat):
+        encode(queries)
+    batch_ms = (time.perf_counter() - t) * 1000 / (args.repeat * len(queries))
+
+    np.save(os.path.join(args.out_dir, f"{args.backend}.npy"), np.concatenate([doc_embeddings, query_embeddings]))
+    return {
+        "load_ms": round(load_ms, 1),
+        "top1_accuracy": round(hits / len(LABELLED_QUERIES), 3),
+        "top1": [titles[i] for i in top1],
+        "single_p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "single_p95_ms": round(float(np.percentile(latencies, 95)), 2),
+        "batch_ms_per_query": round(batch_ms, 2),
+    }
+
+
+def run_child(args, backend, out_dir):
+    cmd = [
+        sys.executable, "-m", "benchmarks.bench_embeddings", "--backend", backend, "--out-dir", out_dir,
+        "--model", args.model, "--data-dir", args.data_dir, "--threads", str(args.threads), "--repeat", str(args.repeat)
+    ]
+    output = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    from src.paths import DATA_DIR
+    from src.tech_agent import EMBEDDING_MODEL
+
+    parser = argparse.ArgumentParser(description="Embedding backend benchmark")
+    parser.add_argument("--backends", default="torch,int8,onnx")
+    parser.add_argument("--threads", type=int, default=0, help="Intra-op threads (0 = library default)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--backend", help=argparse.SUPPRESS)
+    parser.add_argument("--out-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.backend:
+        print(json.dumps(run_backend(args)))
+        return
+
+    print(f"{len(LABELLED_QUERIES)} labelled queries, threads={args.threads or 'default'}")
+    rows = []
+    with tempfile.TemporaryDirectory() as out_dir:
+        for backend in args.backends.split(","):
+            try:
+                rows.append((backend, run_child(args, backend, out_dir)))
+            except subprocess.CalledProcessError as e:
+                print(f"- {backend}: failed ({e.stderr.strip().splitlines()[-1] if e.stderr else e})")
+
+        # Agreement with the full-precision reference: same top-1 section, and cosine of the vectors
+        reference = dict(rows).get("torch")
+        reference_path = os.path.join(out_dir, "torch.npy")
+        for backend, result in rows:
+            if reference is None:
+                result["top1_agreement"] = result["min_cosine_vs_torch"] = "-"
+                continue
+            same = sum(a == b for a, b in zip(result["top1"], reference["top1"]))
+            result["top1_agreement"] = round(same / len(LABELLED_QUERIES), 3)
+            cosines = np.sum(np.load(reference_path) * np.load(os.path.join(out_dir, f"{backend}.npy")), axis=1)
+            result["min_cosine_vs_torch"] = round(float(cosines.min()), 4)
+
+    columns = [
+        "load_ms", "top1_accuracy", "top1_agreement", "min_cosine_vs_torch",
+        "single_p50_ms", "single_p95_ms", "batch_ms_per_query"
+    ]
+    print(f"{'backend':<10}" + "".join(f"{column:>22}" for column in columns))
+    for backend, result in rows:
+        print(f"{backend:<10}" + "".join(f"{result[column]:>22}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Serialization cost per MCP tool call: encoding a tool payload on the server,
+and decoding the JSON-RPC line plus the payload on the client, for the billing
+history at realistic sizes, a single anomaly result and a bulk batch of them.
+
+Compares the previous format (to_string() history, indent=2 JSON, stdlib json)
+with the compact columnar payloads, encoded with the stdlib json and with orjson.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_serialization --sizes 12,36,120,1200 --repeat 300
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.serialization import frame_to_columns
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def make_history(months, seed=0):
+    """A customer's bill history, shaped like BillingAgent.get_billing_history()."""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2020-01-10", periods=months, freq="30D")
+    return pd.DataFrame({
+        "billing_id": [f"BILL_CUST_0001_{date:%Y-%m}" for date in dates],
+        "customer_id": "CUST_0001",
+        "date": dates,
+        "amount": np.round(rng.normal(50, 5, months), 2),
+    })
+
+
+def make_anomaly(i=1):
+    return {
+        "status": "SUCCESS", "customer_id": f"CUST_{i:04d}", "latest_bill_date": "2026-01-07",
+        "latest_bill_amount": 83.76, "historical_mean": 49.87, "z_score": 12.41, "is_anomaly": True,
+        "risk_level": "CRITICAL", "message": "Bill is €83.76 (Avg: €49.87). Z-Score: 12.41"
+    }
+
+
+def _std_compact(obj):
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+
+def _envelope(text):
+    """The JSON-RPC line a tool result travels in (FastMCP writes it with compact separators)."""
+    return json.dumps(
+        {"jsonrpc": "2.0", "id": 1, "result": {"content": [{"type": "text", "text": text}], "isError": False}},
+        separators=(",", ":"), ensure_ascii=False
+    ).encode("utf-8")
+
+
+# name -> (encode(kind, data) -> text, decode(line) -> payload)
+def variants():
+    def before_encode(kind, data):
+        if kind == "history":
+            return data.to_string(index=False)
+        return json.dumps(data, indent=2)
+
+    def before_decode(kind, line):
+        text = json.loads(line)["result"]["content"][0]["text"]
+        # The to_string() table cannot be parsed back: the client only gets text
+        return text if kind == "history" else json.loads(text)
+
+    def columnar(kind, data):
+        if kind == "history":
+            return {"status": "SUCCESS", "customer_id": "CUST_0001", "rows": len(data),
+                    "columns": frame_to_columns(data, exclude=("customer_id",))}
+        return data
+
+    found = {
+        "before (text/indent, json)": (before_encode, before_decode),
+        "compact (json)": (
+            lambda kind, data: _std_compact(columnar(kind, data)),
+            lambda kind, line: json.loads(json.loads(line)["result"]["content"][0]["text"]),
+        ),
+    }
+    if orjson is not None:
+        found["compact (orjson)"] = (
+            lambda kind, data: orjson.dumps(columnar(kind, data), option=orjson.OPT_SERIALIZE_NUMPY).decode("utf-8"),
+            lambda kind, line: orjson.loads(orjson.loads(line)["result"]["content"][0]["text"]),
+        )
+    return found
+
+
+def time_per_call(fn, repeat):
+    fn()  # warm-up
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MCP payload serialization benchmark")
+    parser.add_argument("--sizes", default="12,36,120,1200", help="History lengths (bills per customer)")
+    parser.add_argument("--bulk", type=int, default=1000, help="Results in the bulk anomaly payload")
+    parser.add_argument("--repeat", type=int, default=300)
+    args = parser.parse_args()
+
+    cases = [(f"history x{months}", "history", make_history(int(months))) for months in args.sizes.split(",")]
+    cases.append(("anomaly result", "anomaly", make_anomaly()))
+    cases.append((f"bulk x{args.bulk}", "bulk", {"status": "SUCCESS", "results": [make_anomaly(i) for i in range(args.bulk)]}))
+
+    if orjson is None:
+        print("orjson is not installed: only the stdlib variants are measured (pip install orjson)")
+    columns = ["bytes", "encode_us", "decode_us", "total_us"]
+    print(f"{'payload':<18}{'variant':<30}" + "".join(f"{column:>12}" for column in columns))
+    for label, kind, data in cases:
+        for name, (encode, decode) in variants().items():
+            line = _envelope(encode(kind, data))
+            encode_us = time_per_call(lambda: encode(kind, data), args.repeat)
+            decode_us = time_per_call(lambda: decode(kind, line), args.repeat)
+            row = [len(line), round(encode_us, 1), round(decode_us, 1), round(encode_us + decode_us, 1)]
+            print(f"{label:<18}{name:<30}" + "".join(f"{value:>12}" for value in row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Compares the vector store backends (chroma vs numpy) on startup time, query
+latency and memory, using a synthetic corpus of random unit embeddings so the
+numbers isolate the index from the embedding model.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_vector_store --docs 5000 --queries 500
+Each backend runs in fresh subprocesses, so import cost and memory are not shared.
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+
+def rss_mb():
+    """Current resident memory of this process (falls back to peak RSS off Linux)."""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def synthetic_corpus(docs, dim, seed=42):
+    rng = np.random.default_rng(seed)
+    embeddings = rng.standard_normal((docs, dim)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    ids = [f"doc_{i}" for i in range(docs)]
+    documents = [f"## SECTION {i}\nSynthetic manual section number {i}." for i in range(docs)]
+    metadatas = [{"title": f"SECTION {i}", "content_hash": str(i)} for i in range(docs)]
+    return ids, documents, metadatas, embeddings
+
+
+def run_build(args):
+    from src.vector_store import create_vector_store
+
+    ids, documents, metadatas, embeddings = synthetic_corpus(args.docs, args.dim)
+    start = time.perf_counter()
+    store = create_vector_store(args.backend, args.dir)
+    for i in range(0, args.docs, 1000):
+        store.upsert(ids[i:i + 1000], documents[i:i + 1000], metadatas[i:i + 1000], embeddings[i:i + 1000])
+    return {"build_s": round(time.perf_counter() - start, 3)}
+
+
+def run_query(args):
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    from src.vector_store import create_vector_store
+    store = create_vector_store(args.backend, args.dir)
+    store.count()
+    startup_ms = (time.perf_counter() - start) * 1000
+
+    rng = np.random.default_rng(7)
+    queries = rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    store.query(queries[:1], top_k=args.top_k)  # warm-up
+    latencies = []
+    for query in queries:
+        t = time.perf_counter()
+        store.query([query], top_k=args.top_k)
+        latencies.append((time.perf_counter() - t) * 1000)
+
+    t = time.perf_counter()
+    store.query(queries, top_k=args.top_k)
+    batch_ms = (time.perf_counter() - t) * 1000
+
+    return {
+        "startup_ms": round(startup_ms, 1),
+        "query_p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "query_p95_ms": round(float(np.percentile(latencies, 95)), 3),
+        "batch_ms_per_query": round(batch_ms / args.queries, 3),
+        "rss_mb": round(rss_mb(), 1),
+        "rss_delta_mb": round(rss_mb() - rss_before, 1),
+    }
+
+
+def run_child(args, phase, backend, directory):
+    cmd = [
+        sys.executable, "-m", "benchmarks.bench_vector_store", "--phase", phase,
+        "--backend", backend, "--dir", directory, "--docs", str(args.docs), "--dim", str(args.dim),
+        "--queries", str(args.queries), "--top-k", str(args.top_k)
+    ]
+    output = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vector store backend benchmark")
+    parser.add_argument("--docs", type=int, default=5000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--backends", default="numpy,chroma")
+    parser.add_argument("--phase", choices=["build", "query"], help=argparse.SUPPRESS)
+    parser.add_argument("--backend", help=argparse.SUPPRESS)
+    parser.add_argument("--dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.phase:
+        result = run_build(args) if args.phase == "build" else run_query(args)
+        print(json.dumps(result))
+        return
+
+    print(f"Corpus: {args.docs} docs x {args.dim} dims, {args.queries} queries, top_k={args.top_k}")
+    rows = []
+    for backend in args.backends.split(","):
+        with tempfile.TemporaryDirectory() as directory:
+            try:
+                result = run_child(args, "build", backend, directory)
+                result.update(run_child(args, "query", backend, directory))
+            except subprocess.CalledProcessError as e:
+                print(f"- {backend}: failed ({e.stderr.strip().splitlines()[-1] if e.stderr else e})")
+                continue
+        rows.append((backend, result))
+
+    columns = ["build_s", "startup_ms", "query_p50_ms", "query_p95_ms", "batch_ms_per_query", "rss_mb", "rss_delta_mb"]
+    print(f"{'backend':<10}" + "".join(f"{column:>20}" for column in columns))
+    for backend, result in rows:
+        print(f"{backend:<10}" + "".join(f"{result[column]:>20}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
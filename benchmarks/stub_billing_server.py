@@ -0,0 +1,47 @@
+"""
+Stub Billing Server for bench_api: same tools as src.servers.billing_server,
+answering after a fixed latency (SENTINEL_STUB_LATENCY_MS) without loading data.
+"""
+import asyncio
+import json
+import os
+
+from mcp.server.fastmcp import FastMCP
+
+LATENCY_S = float(os.environ.get("SENTINEL_STUB_LATENCY_MS", "5")) / 1000
+
+mcp = FastMCP("Sentinel Stub Billing Service")
+
+def _normal_bill(customer_id):
+    return {
+        "status": "SUCCESS",
+        "customer_id": customer_id,
+        "is_anomaly": False,
+        "risk_level": "NORMAL",
+        "message": "Bill is €50.0 (Avg: €50.0). Z-Score: 0.0"
+    }
+
+@mcp.tool()
+async def detect_billing_anomaly(customer_id: str) -> str:
+    await asyncio.sleep(LATENCY_S)
+    return json.dumps(_normal_bill(customer_id))
+
+@mcp.tool()
+async def detect_billing_anomalies_bulk(customer_ids: list[str]) -> str:
+    await asyncio.sleep(LATENCY_S)
+    return json.dumps({"status": "SUCCESS", "results": [_normal_bill(customer_id) for customer_id in customer_ids]})
+
+@mcp.tool()
+async def scan_billing_anomalies(threshold: float = 3.0, top_n: int | None = 100) -> str:
+    await asyncio.sleep(LATENCY_S)
+    return json.dumps({
+        "status": "SUCCESS", "threshold": threshold, "customers_scanned": 0,
+        "customers_scored": 0, "anomalies_found": 0, "anomalies": []
+    })
+
+@mcp.tool()
+def get_data_version() -> str:
+    return json.dumps({"data_version": 0})
+
+if __name__ == "__main__":
+    mcp.run()
@@ -0,0 +1,36 @@
+"""
+Stub Technical Server for bench_api: same tools as src.servers.tech_server,
+answering after a fixed latency (SENTINEL_STUB_LATENCY_MS) without loading the model.
+"""
+import asyncio
+import json
+import os
+
+from mcp.server.fastmcp import FastMCP
+
+LATENCY_S = float(os.environ.get("SENTINEL_STUB_LATENCY_MS", "5")) / 1000
+
+mcp = FastMCP("Sentinel Stub Technical Service")
+
+@mcp.tool()
+async def search_technical_manual(query: str) -> str:
+    await asyncio.sleep(LATENCY_S)
+    return "## ISSUE 000: Stub Section\nRestart the box."
+
+@mcp.tool()
+async def search_technical_manual_batch(queries: list[str], top_k: int = 3) -> str:
+    await asyncio.sleep(LATENCY_S)
+    match = {"id": "doc_stub", "title": "## ISSUE 000: Stub Section", "document": "## ISSUE 000: Stub Section\nRestart the box.", "score": 1.0}
+    return json.dumps({"status": "SUCCESS", "results": [[match] for _ in queries]})
+
+@mcp.tool()
+async def classify_intent(query: str) -> str:
+    await asyncio.sleep(LATENCY_S)
+    return json.dumps({"status": "SUCCESS", "scores": {"billing": 0.1, "tech": 0.1}})
+
+@mcp.tool()
+def get_health() -> str:
+    return json.dumps({"ready": True, "warming_up": False, "error": None})
+
+if __name__ == "__main__":
+    mcp.run()
@@ -0,0 +1,192 @@
+import asyncio
+import os
+import time
+from collections import deque
+
+from src.metrics import AGENT_CALLS_RUNNING, AGENT_CALLS_SHED, AGENT_QUEUE_DEPTH
+
+# Per agent, at most MAX_CONCURRENCY calls run at once and MAX_QUEUE more wait for a slot;
+# overridable per agent with SENTINEL_<AGENT>_MAX_CONCURRENCY / SENTINEL_<AGENT>_MAX_QUEUE
+MAX_CONCURRENCY = int(os.environ.get("SENTINEL_AGENT_MAX_CONCURRENCY", "64"))
+MAX_QUEUE = int(os.environ.get("SENTINEL_AGENT_MAX_QUEUE", "256"))
+# Retry-After (seconds) sent with the 503 when a queue is full
+RETRY_AFTER_S = int(os.environ.get("SENTINEL_RETRY_AFTER_S", "1"))
+
+
+class Overloaded(Exception):
+    """An agent's queue is full: the request is rejected before any work starts."""
+    def __init__(self, agent, retry_after_s=RETRY_AFTER_S):
+        super().__init__(f"The {agent} agent is overloaded, retry in {retry_after_s}s.")
+        self.agent = agent
+        self.retry_after_s = retry_after_s
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """A queued call's deadline passed before it got a slot; it is dropped without running."""
+
+
+def agent_limits(agent):
+    """Reads SENTINEL_<AGENT>_MAX_CONCURRENCY and SENTINEL_<AGENT>_MAX_QUEUE."""
+    prefix = f"SENTINEL_{agent.upper()}"
+    max_concurrency = int(os.environ.get(f"{prefix}_MAX_CONCURRENCY", MAX_CONCURRENCY))
+    max_queue = int(os.environ.get(f"{prefix}_MAX_QUEUE", MAX_QUEUE))
+    return max_concurrency, max_queue
+
+
+class Ticket:
+    """
+    A call admitted on an agent: either holding a slot already or queued for one.
+    'async with ticket:' waits for the slot (DeadlineExceeded if it expires first)
+    and frees it on exit.
+    """
+    def __init__(self, queue, expires_at, waiter=None):
+        self.queue = queue
+        self.expires_at = expires_at
+        self.waiter = waiter
+        self.closed = False
+
+    @property
+    def holds_slot(self):
+        if self.waiter is None:
+            return True
+        return self.waiter.done() and not self.waiter.cancelled() and self.waiter.exception() is None
+
+    async def __aenter__(self):
+        if self.waiter is not None:
+            try:
+                await self.waiter
+            except BaseException:
+                # Dropped, or cancelled while queued (possibly just as the slot was handed over)
+                self.close()
+                raise
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Frees the slot, or the place in the queue; safe to call more than once."""
+        if self.closed:
+            return
+        self.closed = True
+        if self.holds_slot:
+            self.queue._release()
+        else:
+            if not self.waiter.done():
+                self.waiter.cancel()
+            self.queue._forget(self)
+
+
+class AgentQueue:
+    """
+    Bounded admission for one agent: max_concurrency calls run, up to max_queue
+    wait in FIFO order, and anything beyond is rejected at once with Overloaded.
+    A queued call whose deadline passes is dropped before it runs, so a backlog
+    never spends agent time on answers nobody is waiting for anymore.
+    """
+    def __init__(self, agent, max_concurrency=MAX_CONCURRENCY, max_queue=MAX_QUEUE, retry_after_s=RETRY_AFTER_S):
+        self.agent = agent
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.retry_after_s = retry_after_s
+        self.running = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.expired = 0
+        self._queue = deque()
+        self._update_gauges()
+
+    def _update_gauges(self):
+        AGENT_CALLS_RUNNING.set(self.running, agent=self.agent)
+        AGENT_QUEUE_DEPTH.set(len(self._queue), agent=self.agent)
+
+    def admit(self, expires_at=None):
+        """
+        Takes a free slot or a place in the queue, without waiting; raises Overloaded
+        when both are full. expires_at is a time.monotonic() deadline.
+        """
+        if self.running < self.max_concurrency and not self._queue:
+            self.running += 1
+            ticket = Ticket(self, expires_at)
+        elif len(self._queue) < self.max_queue:
+            ticket = Ticket(self, expires_at, waiter=asyncio.get_running_loop().create_future())
+            self._queue.append(ticket)
+            if expires_at is not None:
+                asyncio.get_running_loop().call_later(max(expires_at - time.monotonic(), 0.0), self._expire, ticket)
+        else:
+            self.rejected += 1
+            AGENT_CALLS_SHED.inc(agent=self.agent, reason="queue_full")
+            raise Overloaded(self.agent, self.retry_after_s)
+        self.admitted += 1
+        self._update_gauges()
+        return ticket
+
+    def _drop(self, ticket):
+        self.expired += 1
+        AGENT_CALLS_SHED.inc(agent=self.agent, reason="deadline")
+        ticket.waiter.set_exception(DeadlineExceeded(f"{self.agent} call expired after waiting for a slot."))
+
+    def _expire(self, ticket):
+        if ticket.waiter.done() or ticket not in self._queue:
+            return
+        self._queue.remove(ticket)
+        self._drop(ticket)
+        self._update_gauges()
+
+    def _forget(self, ticket):
+        if ticket in self._queue:
+            self._queue.remove(ticket)
+            self._update_gauges()
+
+    def _release(self):
+        """Hands the freed slot to the oldest queued call still within its deadline."""
+        now = time.monotonic()
+        while self._queue:
+            ticket = self._queue.popleft()
+            if ticket.waiter.done():
+                continue
+            if ticket.expires_at is not None and ticket.expires_at <= now:
+                self._drop(ticket)
+                continue
+            ticket.waiter.set_result(None)
+            break
+        else:
+            self.running -= 1
+        self._update_gauges()
+
+    def stats(self):
+        return {
+            "running": self.running,
+            "queued": len(self._queue),
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "expired": self.expired
+        }
+
+
+class AdmissionController:
+    """One AgentQueue per agent; admits the calls a request needs all at once, or none."""
+    def __init__(self, agents):
+        self.queues = {agent: AgentQueue(agent, *agent_limits(agent)) for agent in agents}
+
+    def admit(self, deadlines):
+        """
+        deadlines: {agent: seconds}. Returns {agent: Ticket}. If any queue is full,
+        the tickets already taken are given back and Overloaded is raised, so a
+        request never holds one agent's slot while being rejected by another.
+        """
+        now = time.monotonic()
+        tickets = {}
+        try:
+            for agent, deadline in deadlines.items():
+                tickets[agent] = self.queues[agent].admit(now + deadline if deadline else None)
+        except Overloaded:
+            for ticket in tickets.values():
+                ticket.close()
+            raise
+        return tickets
+
+    def stats(self):
+        return {agent: queue.stats() for agent, queue in self.queues.items()}
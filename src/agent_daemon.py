@@ -0,0 +1,181 @@
+"""
+Shared agent daemon: runs the Billing and Technical server pools once per
+machine (or pod) and serves them to every API worker over a Unix-domain socket,
+so N workers share one copy of the billing data and one embedding model.
+
+Usage (from the repository root):
+    python -m src.agent_daemon --socket /run/sentinel/agents.sock
+    SENTINEL_AGENT_DAEMON_SOCKET=/run/sentinel/agents.sock uvicorn src.api:app --workers 4
+"""
+import argparse
+import asyncio
+import os
+import signal
+import sys
+
+from src.mcp_client import MAX_LINE_BYTES, MCP_PROTOCOL_VERSION
+from src.serialization import dumps_bytes, loads
+from src.supervisor_mcp import AGENT_DAEMON_SOCKET, build_server_pools
+from src.tracing import start_trace
+
+DEFAULT_SOCKET = "/tmp/sentinel/agents.sock"
+DAEMON_INFO = {"name": "sentinel-agent-daemon", "version": "2.0-mcp"}
+# How often a connection waiting in 'initialize' checks whether its pool is up
+POOL_READY_POLL_S = 0.2
+
+
+class AgentDaemon:
+    """
+    Hosts one MCPServerPool per agent and relays MCP JSON-RPC from socket clients.
+    A connection is bound to a pool by its initialize request (params._meta.server);
+    its tool calls, pings and cancellations then go to that pool. Two more methods
+    act on the pool as a whole: sentinel/call_all (broadcast, optionally replayed
+    on later replicas) and sentinel/status.
+    """
+    def __init__(self, path, pools):
+        self.path = path
+        self.pools = pools
+        self.connections = 0
+        self._server = None
+        self._start_tasks = []
+
+    async def start(self):
+        # Pools boot in the background; clients wait in 'initialize' until theirs is ready
+        self._start_tasks = [asyncio.create_task(self._start_pool(name, pool)) for name, pool in self.pools.items()]
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        if os.path.exists(self.path):
+            os.unlink(self.path) # Left behind by a previous run
+        self._server = await asyncio.start_unix_server(self._serve, path=self.path, limit=MAX_LINE_BYTES)
+        print(f"[Agent Daemon] Listening on {self.path} ({', '.join(self.pools)})", file=sys.stderr)
+
+    async def _start_pool(self, name, pool):
+        try:
+            await pool.start()
+            print(f"[Agent Daemon] {name} pool ready", file=sys.stderr)
+        except Exception as e:
+            # The pool's monitor keeps retrying the replicas that failed
+            print(f"[Agent Daemon] {name} pool failed to start: {e}", file=sys.stderr)
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+        for task in self._start_tasks:
+            task.cancel()
+        await asyncio.gather(*self._start_tasks, return_exceptions=True)
+        await asyncio.gather(*(pool.stop() for pool in self.pools.values()), return_exceptions=True)
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    async def _serve(self, reader, writer):
+        """Reads one client's requests and answers each in its own task, so they run concurrently."""
+        self.connections += 1
+        binding = {}
+        tasks = {}
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = loads(line)
+                except ValueError:
+                    continue
+                if "id" not in message:
+                    if message.get("method") == "notifications/cancelled":
+                        # The client gave up on the call: drop it here and on the server replica
+                        task = tasks.get((message.get("params") or {}).get("requestId"))
+                        if task is not None:
+                            task.cancel()
+                    continue
+                request_id = message["id"]
+                task = asyncio.create_task(self._respond(writer, binding, message))
+                tasks[request_id] = task
+                task.add_done_callback(lambda _, request_id=request_id: tasks.pop(request_id, None))
+        except (ConnectionResetError, ValueError) as e:
+            print(f"[Agent Daemon] Connection dropped: {e}", file=sys.stderr)
+        finally:
+            self.connections -= 1
+            for task in list(tasks.values()):
+                task.cancel()
+            writer.close()
+
+    async def _respond(self, writer, binding, message):
+        try:
+            result = await self._handle(binding, message["method"], message.get("params") or {})
+            response = {"jsonrpc": "2.0", "id": message["id"], "result": result}
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            response = {"jsonrpc": "2.0", "id": message["id"], "error": {"code": -32603, "message": str(e)}}
+        if writer.is_closing():
+            return
+        # A single write() per line, so concurrent answers never interleave
+        writer.write(dumps_bytes(response) + b"\n")
+        try:
+            await writer.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    async def _handle(self, binding, method, params):
+        if method == "initialize":
+            server = (params.get("_meta") or {}).get("server")
+            pool = self.pools.get(server)
+            if pool is None:
+                raise ValueError(f"Unknown server '{server}', expected one of {sorted(self.pools)}.")
+            # Answering once the pool is ready makes the client's handshake its readiness wait
+            while not pool.ready:
+                await asyncio.sleep(POOL_READY_POLL_S)
+            binding["server"] = server
+            return {"protocolVersion": MCP_PROTOCOL_VERSION, "capabilities": {"tools": {}}, "serverInfo": DAEMON_INFO}
+        if method == "ping":
+            return {}
+
+        pool = self.pools.get(binding.get("server"))
+        if pool is None:
+            raise RuntimeError("Connection not initialized.")
+        if method == "tools/call":
+            return await self._call_tool(pool, params)
+        if method == "sentinel/call_all":
+            results = await pool.call_all(params["name"], params.get("arguments", {}), replay=params.get("replay", False))
+            return {"results": results}
+        if method == "sentinel/status":
+            return pool.status()
+        return await pool.request(method, params)
+
+    @staticmethod
+    async def _call_tool(pool, params):
+        trace_id = (params.get("_meta") or {}).get("trace_id")
+        with start_trace(trace_id) as trace:
+            result = await pool.call_tool(params["name"], params.get("arguments", {}))
+        # The server's spans go back to the worker with this hop's own; those are renamed so
+        # the worker's mcp.call and mcp.transport stages are not counted twice
+        spans = [
+            dict(span, name=f"daemon.{span['name']}") if span["name"].startswith("mcp.") else span
+            for span in trace.to_dict()["spans"]
+        ]
+        return dict(result, _meta={"trace_id": trace_id, "spans": spans})
+
+
+async def serve(path):
+    daemon = AgentDaemon(path, build_server_pools())
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await daemon.start()
+    try:
+        await stop.wait()
+    finally:
+        print("[Agent Daemon] Shutting down...", file=sys.stderr)
+        await daemon.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sentinel agent daemon: MCP server pools shared over a Unix socket")
+    parser.add_argument("--socket", default=AGENT_DAEMON_SOCKET or DEFAULT_SOCKET, help="Unix socket path to listen on")
+    args = parser.parse_args()
+    asyncio.run(serve(args.socket))
+
+
+if __name__ == "__main__":
+    main()
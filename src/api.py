@@ -1,8 +1,17 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import JSONResponse, Response
+import asyncio
+import os
 from pydantic import BaseModel
 import uuid
 import time
-from src.supervisor_mcp import SupervisorAgentMCP
+from src import metrics
+from src.admission import Overloaded
+from src.supervisor_mcp import InvalidBills, SupervisorAgentMCP
+from src.tracing import start_trace
+
+# Largest batch accepted by POST /analyze/batch
+MAX_BATCH_SIZE = int(os.environ.get("SENTINEL_MAX_BATCH_SIZE", "5000"))
 
 # --- DATA CONTRACTS ---
 class CustomerRequest(BaseModel):
@@ -15,6 +24,55 @@ class SentinelResponse(BaseModel):
     response: str
     status: str
 
+class BatchAnalyzeRequest(BaseModel):
+    items: list[CustomerRequest]
+
+class BatchItemResponse(BaseModel):
+    # The batch's trace_id (logs and spans are per batch) and the item's position in it
+    trace_id: str
+    index: int
+    response: str
+    status: str
+
+class BatchAnalyzeResponse(BaseModel):
+    trace_id: str
+    processing_time_ms: float
+    results: list[BatchItemResponse]
+
+class BillingAnomaly(BaseModel):
+    customer_id: str
+    latest_bill_date: str
+    latest_bill_amount: float
+    historical_mean: float
+    z_score: float
+    risk_level: str
+
+class BillingScanResponse(BaseModel):
+    trace_id: str
+    processing_time_ms: float
+    customers_scanned: int
+    anomalies_found: int
+    anomalies: list[BillingAnomaly]
+    status: str
+
+class BillRecord(BaseModel):
+    customer_id: str
+    date: str
+    amount: float
+    billing_id: str | None = None
+
+class BillIngestRequest(BaseModel):
+    records: list[BillRecord]
+
+class BillIngestResponse(BaseModel):
+    trace_id: str
+    processing_time_ms: float
+    ingested: int
+    duplicates: int = 0
+    data_version: int
+    replicas: int
+    status: str
+
 app = FastAPI(
     title="SFR Sentinel API (MCP Enabled)",
     description="Autonomous Multi-Agent System using Model Context Protocol",
@@ -23,38 +81,131 @@ app = FastAPI(
 
 # Global Agent
 supervisor = None
+startup_task = None
+
+async def _start_agents():
+    try:
+        await supervisor.start()
+        print("Sentinel Agents Ready.")
+    except Exception as e:
+        print(f"Sentinel Agents failed to start: {e}")
 
 @app.on_event("startup")
 async def startup_event():
-    global supervisor
+    global supervisor, startup_task
     print("Loading Sentinel Agents (MCP Client)...")
     supervisor = SupervisorAgentMCP()
-    print("Sentinel Agents Ready.")
+    # Boot the servers in the background so health and readiness probes answer right away
+    startup_task = asyncio.create_task(_start_agents())
+    if metrics.MULTIPROCESS_DIR:
+        asyncio.create_task(_flush_metrics())
+
+def _update_replica_gauges():
+    for gauge in (metrics.REPLICA_IN_FLIGHT, metrics.REPLICA_READY):
+        gauge.clear()
+    for server, pool in supervisor.status()["servers"].items():
+        for replica in pool.get("replicas", []):
+            metrics.REPLICA_IN_FLIGHT.set(replica["in_flight"], server=server, replica=replica["name"])
+            metrics.REPLICA_READY.set(int(replica["ready"]), server=server, replica=replica["name"])
+
+async def _flush_metrics():
+    """With several workers, each one shares its samples so any worker's /metrics covers them all."""
+    while True:
+        try:
+            _update_replica_gauges()
+            metrics.REGISTRY.write_snapshot()
+        except (OSError, ValueError) as e:
+            print(f"[Metrics] Could not write samples to {metrics.MULTIPROCESS_DIR}: {e}")
+        await asyncio.sleep(metrics.MULTIPROCESS_FLUSH_S)
+
+class HTTPMetricsMiddleware:
+    """Counts requests and times them per route (plain ASGI, so it adds no extra task per request)."""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start_time = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Label by route template, so path parameters cannot blow up the series count
+            route = scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            metrics.HTTP_REQUESTS.inc(route=path, status=status)
+            metrics.HTTP_LATENCY.observe(time.perf_counter() - start_time, route=path)
+
+app.add_middleware(HTTPMetricsMiddleware)
+
+def _require_ready():
+    if supervisor is None or not supervisor.ready:
+        raise HTTPException(status_code=503, detail="Sentinel agents are still starting.")
+
+def _overloaded(trace_id, error):
+    """Load shedding: a full agent queue answers 503 at once, telling the client when to retry."""
+    print(f"[{trace_id}] Shed: {error}")
+    return HTTPException(status_code=503, detail=str(error), headers={"Retry-After": str(error.retry_after_s)})
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if supervisor:
+        await supervisor.stop()
 
 @app.get("/")
 def health_check():
     return {"status": "operational", "system": "SFR Sentinel MCP"}
 
+@app.get("/ready")
+def readiness_check():
+    """Readiness probe: 200 once every agent server has completed the MCP handshake."""
+    if supervisor is None:
+        return JSONResponse(status_code=503, content={"ready": False, "servers": {}})
+    status = supervisor.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+@app.get("/metrics")
+def metrics_endpoint():
+    """Prometheus scrape endpoint: request, stage, tool and per-replica metrics."""
+    if supervisor is not None:
+        _update_replica_gauges()
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 @app.post("/analyze", response_model=SentinelResponse)
 async def analyze_request(req: CustomerRequest):
     trace_id = str(uuid.uuid4())
     start_time = time.time()
     
     print(f"[{trace_id}] Received request for {req.customer_id}")
+    _require_ready()
     
     try:
-        # ASYNC Call to Supervisor
-        result = await supervisor.handle_request_async(req.customer_id, req.message)
+        # ASYNC Call to Supervisor (agents are queried in parallel), traced per stage
+        with start_trace(trace_id, log=True):
+            result = await supervisor.dispatch(req.customer_id, req.message)
         
         duration = (time.time() - start_time) * 1000
         
+        if result['partial']:
+            print(f"[{trace_id}] Partial response, timed out: {', '.join(result['timed_out'])}")
+        
         return SentinelResponse(
             trace_id=trace_id,
             processing_time_ms=round(duration, 2),
-            response=result,
-            status="success"
+            response=result['response'],
+            status="partial" if result['partial'] else "success"
         )
         
+    except Overloaded as e:
+        raise _overloaded(trace_id, e)
     except Exception as e:
         print(f"[{trace_id}] ERROR: {str(e)}")
         # In prod, log stack trace
@@ -62,6 +213,119 @@ async def analyze_request(req: CustomerRequest):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/analyze/batch", response_model=BatchAnalyzeResponse)
+async def analyze_batch(req: BatchAnalyzeRequest):
+    """
+    Analyzes many requests at once: one bulk Billing Server call and one batched
+    Tech Server search for the whole batch. Results keep the order of the items,
+    each with its status, its index and the batch's trace_id; the batch is timed as a whole.
+    """
+    trace_id = str(uuid.uuid4())
+    start_time = time.time()
+    
+    print(f"[{trace_id}] Received batch of {len(req.items)} requests")
+    if len(req.items) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch too large: {len(req.items)} items (max {MAX_BATCH_SIZE}).")
+    _require_ready()
+    
+    try:
+        with start_trace(trace_id, log=True):
+            results = await supervisor.dispatch_batch([(item.customer_id, item.message) for item in req.items])
+        
+        duration = round((time.time() - start_time) * 1000, 2)
+        timed_out = sorted({agent for result in results for agent in result['timed_out']})
+        if timed_out:
+            print(f"[{trace_id}] Partial batch, timed out: {', '.join(timed_out)}")
+        
+        return BatchAnalyzeResponse(
+            trace_id=trace_id,
+            processing_time_ms=duration,
+            results=[
+                BatchItemResponse(
+                    trace_id=trace_id,
+                    index=index,
+                    response=result['response'],
+                    status="partial" if result['partial'] else "success"
+                )
+                for index, result in enumerate(results)
+            ]
+        )
+        
+    except Overloaded as e:
+        raise _overloaded(trace_id, e)
+    except Exception as e:
+        print(f"[{trace_id}] ERROR: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/billing/anomalies", response_model=BillingScanResponse)
+async def scan_billing_anomalies(threshold: float = 3.0, top_n: int | None = Query(None, ge=1)):
+    """Bulk sweep: scores every customer's latest bill in one Billing Server call. top_n keeps the worst N, default all."""
+    trace_id = str(uuid.uuid4())
+    start_time = time.time()
+    
+    print(f"[{trace_id}] Received billing anomaly scan (threshold={threshold}, top_n={top_n})")
+    _require_ready()
+    
+    try:
+        with start_trace(trace_id, log=True):
+            result = await supervisor.scan_billing_anomalies_async(threshold=threshold, top_n=top_n)
+        
+        duration = (time.time() - start_time) * 1000
+        
+        return BillingScanResponse(
+            trace_id=trace_id,
+            processing_time_ms=round(duration, 2),
+            customers_scanned=result['customers_scanned'],
+            anomalies_found=result['anomalies_found'],
+            anomalies=result['anomalies'],
+            status="success"
+        )
+        
+    except Overloaded as e:
+        raise _overloaded(trace_id, e)
+    except Exception as e:
+        print(f"[{trace_id}] ERROR: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/billing/bills", response_model=BillIngestResponse)
+async def ingest_bills(req: BillIngestRequest):
+    """Appends new bills to the running Billing Servers, no restart or reload needed."""
+    trace_id = str(uuid.uuid4())
+    start_time = time.time()
+    
+    print(f"[{trace_id}] Received {len(req.records)} bills to ingest")
+    _require_ready()
+    
+    try:
+        records = [record.model_dump(exclude_none=True) for record in req.records]
+        with start_trace(trace_id, log=True):
+            result = await supervisor.ingest_bills_async(records)
+        
+        duration = (time.time() - start_time) * 1000
+        
+        return BillIngestResponse(
+            trace_id=trace_id,
+            processing_time_ms=round(duration, 2),
+            ingested=result['ingested'],
+            duplicates=result.get('duplicates', 0),
+            data_version=result['data_version'],
+            replicas=result['replicas'],
+            status="success"
+        )
+        
+    except InvalidBills as e:
+        print(f"[{trace_id}] Rejected bills: {e}")
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        print(f"[{trace_id}] ERROR: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="127.0.0.1", port=8000)
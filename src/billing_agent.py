@@ -2,70 +2,358 @@ import pandas as pd
 import numpy as np
 import os
 import sys
+import threading
+import time
+from src.columnar_cache import load_csv
+from src.paths import DATA_DIR
 
 class BillingAgent:
-    def __init__(self, data_dir=r"C:\Users\hayth\Desktop\SFR\Sentinel\data"):
+    # Z-Score > 3 means the bill is 3 standard deviations away (99.7% outlier)
+    Z_SCORE_THRESHOLD = 3
+
+    def __init__(self, data_dir=DATA_DIR):
         self.data_dir = data_dir
         self.billing_file = os.path.join(data_dir, "billing.csv")
+        # Guards the running statistics: ingestion and readers never see a half-applied batch
+        self._lock = threading.Lock()
+        # Incremented by every ingested batch
+        self.data_version = 0
         self._load_data()
 
     def _load_data(self):
-        """Loads the billing database."""
+        """
+        Loads the billing database through the columnar cache, so a warm start
+        memory-maps typed arrays instead of re-parsing the CSV.
+        """
         if os.path.exists(self.billing_file):
-            self.billing_df = pd.read_csv(self.billing_file)
-            # Ensure proper types
-            self.billing_df['amount'] = pd.to_numeric(self.billing_df['amount'])
-            self.billing_df['date'] = pd.to_datetime(self.billing_df['date'])
+            start_time = time.perf_counter()
+            self.billing_df, self.load_stats = load_csv(
+                self.billing_file, parse_dates=['date'], numeric=['amount']
+            )
+            self._build_customer_index()
+            self.load_stats['startup_ms'] = round((time.perf_counter() - start_time) * 1000, 2)
+            print(
+                f"[BillingAgent] Loaded {self.load_stats['rows']} bills in {self.load_stats['startup_ms']} ms "
+                f"(columnar cache: {self.load_stats['cache']}, read: {self.load_stats['load_ms']} ms)",
+                file=sys.stderr
+            )
         else:
             # Print to stderr if needed
             print(f"Error: Billing data not found at {self.billing_file}", file=sys.stderr)
             raise FileNotFoundError(f"Billing data not found at {self.billing_file}")
 
-    def get_billing_history(self, customer_id):
-        """Retrieves billing history for a specific customer."""
-        customer_bills = self.billing_df[self.billing_df['customer_id'] == customer_id].copy()
-        return customer_bills.sort_values(by='date')
+    def _build_customer_index(self):
+        """
+        Sorts the bills by (customer_id, date) once and records the offsets of
+        each customer's contiguous block, so lookups become O(customer bills)
+        slices instead of a mask over the whole table.
+        """
+        df = self.billing_df
+        # customer_id is a categorical with sorted categories, so codes follow id order
+        codes = df['customer_id'].cat.codes.to_numpy()
+        dates = df['date'].to_numpy()
 
-    def detect_billing_anomaly(self, customer_id):
+        # The generator already writes bills in order: only sort when we have to
+        code_steps = np.diff(codes)
+        is_sorted = bool(np.all((code_steps > 0) | ((code_steps == 0) & (np.diff(dates) >= np.timedelta64(0)))))
+        if not is_sorted:
+            order = np.lexsort((dates, codes))
+            df = df.take(order).reset_index(drop=True)
+            codes = codes[order]
+        self.billing_df = df
+
+        if len(codes) == 0:
+            starts = ends = np.empty(0, dtype=np.int64)
+        else:
+            # A new block starts wherever the customer id changes
+            starts = np.flatnonzero(np.r_[True, np.diff(codes) != 0])
+            ends = np.r_[starts[1:], len(df)].astype(np.int64)
+
+        customer_ids = df['customer_id'].cat.categories[codes[starts]]
+        self._customer_offsets = dict(zip(customer_ids, zip(starts.tolist(), ends.tolist())))
+        # billing_id codes in table order, to spot re-sent bills without materializing the ids
+        self._billing_id_codes = df['billing_id'].cat.codes.to_numpy()
+        self._seed_running_stats(list(customer_ids), starts, ends)
+
+    def _seed_running_stats(self, customer_ids, starts, ends):
         """
-        Analyzes billing history to find anomalies using Z-Score.
-        Returns a dict with analysis results.
+        Builds each customer's running statistics from the loaded table in one pass:
+        the latest bill, and count/mean/M2 (sum of squared deviations, Welford's
+        accumulator) of all the earlier bills.
         """
-        history = self.get_billing_history(customer_id)
-        
-        if len(history) < 3:
+        amounts = self.billing_df['amount'].to_numpy(dtype=np.float64)
+        dates = self.billing_df['date'].to_numpy()
+        n_customers = len(customer_ids)
+
+        self._customer_ids = customer_ids
+        self._positions = {customer_id: i for i, customer_id in enumerate(customer_ids)}
+        # Bills ingested after startup, per customer (the loaded table stays read-only)
+        self._ingested = {}
+        self._ingested_ids = set()
+        if len(ends) == 0:
+            # Empty table: every customer will arrive through ingest_bills
+            self._past_counts = np.zeros(0, dtype=np.int64)
+            self._past_means = np.zeros(0)
+            self._past_m2 = np.zeros(0)
+            self._latest_amounts = np.zeros(0)
+            self._latest_dates = np.zeros(0, dtype='datetime64[ns]')
+            return
+
+        positions = np.repeat(np.arange(n_customers), ends - starts)
+        is_past = np.ones(len(amounts), dtype=bool)
+        is_past[ends - 1] = False
+
+        past_positions, past_amounts = positions[is_past], amounts[is_past]
+        counts = np.bincount(past_positions, minlength=n_customers)
+        sums = np.bincount(past_positions, weights=past_amounts, minlength=n_customers)
+        means = np.divide(sums, counts, out=np.zeros(n_customers), where=counts > 0)
+        m2 = np.bincount(past_positions, weights=(past_amounts - means[past_positions]) ** 2, minlength=n_customers)
+
+        self._past_counts = counts.astype(np.int64)
+        self._past_means = means
+        self._past_m2 = m2
+        self._latest_amounts = amounts[ends - 1].copy()
+        self._latest_dates = dates[ends - 1].astype('datetime64[ns]')
+
+    def _add_customer(self, customer_id):
+        position = len(self._customer_ids)
+        self._customer_ids.append(customer_id)
+        self._positions[customer_id] = position
+        # Grow geometrically, so adding customers one by one stays amortized O(1)
+        if position >= len(self._past_counts):
+            extra = max(len(self._past_counts), 16)
+            self._past_counts = np.concatenate([self._past_counts, np.zeros(extra, dtype=np.int64)])
+            self._past_means = np.concatenate([self._past_means, np.zeros(extra)])
+            self._past_m2 = np.concatenate([self._past_m2, np.zeros(extra)])
+            self._latest_amounts = np.concatenate([self._latest_amounts, np.zeros(extra)])
+            self._latest_dates = np.concatenate([self._latest_dates, np.full(extra, np.datetime64('NaT', 'ns'))])
+        return position
+
+    def _add_past_amount(self, position, amount):
+        # Welford's update: numerically stable running mean and M2 in O(1)
+        count = self._past_counts[position] + 1
+        delta = amount - self._past_means[position]
+        self._past_counts[position] = count
+        self._past_means[position] += delta / count
+        self._past_m2[position] += delta * (amount - self._past_means[position])
+
+    def _is_known_bill(self, customer_id, billing_id):
+        """True if this billing_id was loaded from the table or ingested already."""
+        if billing_id in self._ingested_ids:
+            return True
+        start, end = self._customer_offsets.get(customer_id, (0, 0))
+        code = self.billing_df['billing_id'].cat.categories.get_indexer([billing_id])[0]
+        return code >= 0 and bool((self._billing_id_codes[start:end] == code).any())
+
+    def ingest_bills(self, records):
+        """
+        Appends new bills while the agent is serving. Each record needs customer_id,
+        date and amount (billing_id is optional, BILL_<customer_id>_<YYYY-MM> by default).
+        A bill newer than the customer's latest one becomes the latest and the previous
+        one joins the running statistics; an older bill joins them directly. O(1) per bill.
+        Bills whose billing_id is already known are skipped, so re-sending a batch is harmless.
+        The whole batch is applied atomically with respect to readers.
+        """
+        parsed = []
+        for record in records:
+            try:
+                customer_id = str(record['customer_id'])
+                date = pd.Timestamp(record['date'])
+                amount = float(record['amount'])
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"Invalid bill record {record!r}: {e}") from e
+            if not np.isfinite(amount) or pd.isna(date):
+                raise ValueError(f"Invalid bill record {record!r}: amount and date are required")
+            billing_id = record.get('billing_id') or f"BILL_{customer_id}_{date.strftime('%Y-%m')}"
+            parsed.append((customer_id, date, amount, billing_id))
+
+        applied = []
+        with self._lock:
+            for customer_id, date, amount, billing_id in parsed:
+                if self._is_known_bill(customer_id, billing_id):
+                    continue
+                applied.append(customer_id)
+                self._ingested_ids.add(billing_id)
+                position = self._positions.get(customer_id)
+                if position is None:
+                    position = self._add_customer(customer_id)
+
+                latest_date = self._latest_dates[position]
+                if np.isnat(latest_date):
+                    self._latest_amounts[position] = amount
+                    self._latest_dates[position] = date.to_datetime64()
+                elif date.to_datetime64() >= latest_date:
+                    self._add_past_amount(position, self._latest_amounts[position])
+                    self._latest_amounts[position] = amount
+                    self._latest_dates[position] = date.to_datetime64()
+                else:
+                    self._add_past_amount(position, amount)
+
+                self._ingested.setdefault(customer_id, []).append(
+                    {"billing_id": billing_id, "customer_id": customer_id, "date": date, "amount": amount}
+                )
+            if applied:
+                self.data_version += 1
+            data_version = self.data_version
+
+        return {
+            "status": "SUCCESS",
+            "ingested": len(applied),
+            "duplicates": len(parsed) - len(applied),
+            "customers": len(set(applied)),
+            "data_version": data_version
+        }
+
+    def export_ingested(self):
+        """
+        The bills ingested since startup, in ingestion order per customer, with the
+        data_version they produced: enough for restore_ingested() to rebuild this state.
+        """
+        with self._lock:
+            records = [
+                dict(record, date=record["date"].isoformat())
+                for customer_records in self._ingested.values() for record in customer_records
+            ]
+            data_version = self.data_version
+        return {"status": "SUCCESS", "records": records, "data_version": data_version}
+
+    def restore_ingested(self, records, data_version):
+        """Applies an export_ingested() snapshot to a freshly loaded agent, data_version included."""
+        result = self.ingest_bills(records)
+        with self._lock:
+            self.data_version = int(data_version)
+        return dict(result, data_version=self.data_version)
+
+    def get_billing_history(self, customer_id):
+        """
+        Retrieves billing history for a specific customer, sorted by date.
+        Without ingested bills the result is a slice of the indexed table: treat it as read-only.
+        """
+        start, end = self._customer_offsets.get(customer_id, (0, 0))
+        history = self.billing_df.iloc[start:end]
+        with self._lock:
+            ingested = list(self._ingested.get(customer_id, ()))
+        if not ingested:
+            return history
+        appended = pd.DataFrame(ingested, columns=[name for name in history.columns if name in ingested[0]])
+        history = pd.concat([history.astype({'customer_id': str}), appended], ignore_index=True)
+        return history.sort_values(by='date', kind='stable').reset_index(drop=True)
+
+    def _latest_bill_stats(self, customer_id):
+        """Mean/std of a customer's past bills and their latest bill; the caller holds the lock."""
+        position = self._positions.get(customer_id)
+        past_count = self._past_counts[position] if position is not None else 0
+        if past_count < 2:
+            return None
+        # Stats of PAST bills (all EXCEPT the latest), sample std like pandas
+        mean_spend = self._past_means[position]
+        std_dev = np.sqrt(self._past_m2[position] / (past_count - 1))
+        return mean_spend, std_dev, self._latest_amounts[position], self._latest_dates[position]
+
+    def _assess(self, customer_id, stats):
+        if stats is None:
             return {
                 "status": "INSUFFICIENT_DATA",
                 "is_anomaly": False,
                 "message": "Not enough billing history to analyze."
             }
-
-        # Get the latest bill
-        latest_bill = history.iloc[-1]
-        past_bills = history.iloc[:-1] # All bills EXCEPT the latest
-
-        # Calculate Stats on PAST bills
-        mean_spend = past_bills['amount'].mean()
-        std_dev = past_bills['amount'].std()
+        mean_spend, std_dev, latest_amount, latest_date = stats
 
         # Avoid division by zero
         if std_dev == 0:
             std_dev = 0.01
 
         # Calculate Z-Score of the LATEST bill
-        z_score = (latest_bill['amount'] - mean_spend) / std_dev
+        z_score = (latest_amount - mean_spend) / std_dev
         
-        # Threshold: Z-Score > 3 means the bill is 3 standard deviations away (99.7% outlier)
-        is_anomaly = z_score > 3
+        is_anomaly = z_score > self.Z_SCORE_THRESHOLD
 
         return {
             "status": "SUCCESS",
             "customer_id": customer_id,
-            "latest_bill_date": latest_bill['date'].strftime("%Y-%m-%d"),
-            "latest_bill_amount": float(latest_bill['amount']),
+            "latest_bill_date": pd.Timestamp(latest_date).strftime("%Y-%m-%d"),
+            "latest_bill_amount": float(latest_amount),
             "historical_mean": round(float(mean_spend), 2),
             "z_score": round(float(z_score), 2),
             "is_anomaly": bool(is_anomaly),
             "risk_level": "CRITICAL" if is_anomaly else "NORMAL",
-            "message": f"Bill is €{latest_bill['amount']} (Avg: €{round(mean_spend, 2)}). Z-Score: {round(z_score, 2)}"
+            "message": f"Bill is €{latest_amount} (Avg: €{round(mean_spend, 2)}). Z-Score: {round(z_score, 2)}"
+        }
+
+    def detect_billing_anomaly(self, customer_id):
+        """
+        Analyzes billing history to find anomalies using Z-Score.
+        The statistics are kept up to date on ingestion, so this is a constant-time lookup.
+        Returns a dict with analysis results.
+        """
+        with self._lock:
+            stats = self._latest_bill_stats(customer_id)
+        return self._assess(customer_id, stats)
+
+    def detect_billing_anomalies_bulk(self, customer_ids):
+        """
+        Same analysis as detect_billing_anomaly for many customers, read under a
+        single lock acquisition (one consistent data version).
+        Returns one result per customer id, in the same order.
+        """
+        customer_ids = list(customer_ids)
+        with self._lock:
+            stats = [self._latest_bill_stats(customer_id) for customer_id in customer_ids]
+        return [self._assess(customer_id, customer_stats) for customer_id, customer_stats in zip(customer_ids, stats)]
+
+    def scan_billing_anomalies(self, threshold=None, top_n=None):
+        """
+        Scores every customer in one vectorized pass over the running statistics,
+        using the same rule as detect_billing_anomaly (latest bill vs mean/std of the earlier bills).
+        Returns the flagged customers sorted by descending Z-Score, optionally
+        limited to the top_n worst (top_n must be at least 1; None keeps them all).
+        """
+        if top_n is not None and top_n < 1:
+            raise ValueError(f"top_n must be at least 1, got {top_n}.")
+        if threshold is None:
+            threshold = self.Z_SCORE_THRESHOLD
+
+        # Snapshot the running statistics, so the scan sees one consistent data version
+        with self._lock:
+            n_customers = len(self._customer_ids)
+            customer_ids = np.asarray(self._customer_ids, dtype=object)
+            counts = self._past_counts[:n_customers].copy()
+            means = self._past_means[:n_customers].copy()
+            m2 = self._past_m2[:n_customers].copy()
+            latest_amounts = self._latest_amounts[:n_customers].copy()
+            latest_dates = self._latest_dates[:n_customers].copy()
+
+        # Same minimum as the per-customer check: at least 3 bills in total
+        scored = np.flatnonzero(counts >= 2)
+        std_dev = np.sqrt(m2[scored] / (counts[scored] - 1))
+        std_dev = np.where(std_dev == 0, 0.01, std_dev)
+        z_scores = (latest_amounts[scored] - means[scored]) / std_dev
+
+        is_flagged = z_scores > threshold
+        flagged_order = np.argsort(-z_scores[is_flagged], kind='stable')
+        flagged = scored[is_flagged][flagged_order]
+        flagged_z_scores = z_scores[is_flagged][flagged_order]
+        anomalies_found = len(flagged)
+        if top_n is not None:
+            flagged, flagged_z_scores = flagged[:top_n], flagged_z_scores[:top_n]
+
+        anomalies = [
+            {
+                "customer_id": customer_ids[i],
+                "latest_bill_date": pd.Timestamp(latest_dates[i]).strftime("%Y-%m-%d"),
+                "latest_bill_amount": float(latest_amounts[i]),
+                "historical_mean": round(float(means[i]), 2),
+                "z_score": round(float(z_score), 2),
+                "risk_level": "CRITICAL",
+            }
+            for i, z_score in zip(flagged, flagged_z_scores)
+        ]
+
+        return {
+            "status": "SUCCESS",
+            "threshold": float(threshold),
+            "customers_scanned": int(n_customers),
+            "customers_scored": int(len(scored)),
+            "anomalies_found": int(anomalies_found),
+            "anomalies": anomalies
         }
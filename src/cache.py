@@ -0,0 +1,226 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class TTLCache:
+    """
+    Bounded LRU cache with an optional per-entry time-to-live.
+    Thread-safe, and keeps hit/miss/eviction counters for monitoring.
+    """
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def peek(self, key, default=None):
+        """Returns a live entry without touching LRU order or the counters."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or (entry[1] is not None and entry[1] <= time.monotonic()):
+                return default
+            return entry[0]
+
+    def keys(self):
+        with self._lock:
+            return list(self._data)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return default if entry is None else entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_s": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent asyncio calls with the same key: the first caller starts
+    the work, later callers await the same result instead of repeating it.
+    """
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self._in_flight = {}
+
+    def __len__(self):
+        return len(self._in_flight)
+
+    def __contains__(self, key):
+        return key in self._in_flight
+
+    async def do(self, key, make_coroutine):
+        """Awaits make_coroutine() for this key, or the run already in flight for it."""
+        task = self._in_flight.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(make_coroutine())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.coalesced += 1
+        # A caller that gives up (e.g. the client disconnected) must not cancel the shared run
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+
+    def stats(self):
+        return {"in_flight": len(self._in_flight), "calls": self.calls, "coalesced": self.coalesced}
+
+
+class SemanticCache:
+    """
+    Reuses a cached value when a new query embedding is close enough (cosine
+    similarity >= threshold) to the embedding of a query answered before.
+    Bounded (LRU) and expiring like TTLCache; lookups are one matrix-vector product.
+    Embeddings are rows of a preallocated matrix that doubles when full, and a
+    dropped entry only frees its row for the next write, so writes cost O(d)
+    instead of a rebuild of the matrix.
+    """
+    def __init__(self, threshold=0.95, maxsize=1024, ttl=None):
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # key -> (row, value, expires_at), least recently used first
+        self._entries = OrderedDict()
+        self._matrix = None
+        self._row_keys = []
+        self._used = np.zeros(0, dtype=bool)
+        self._free_rows = []
+        self._rows_in_use = 0 # High-water mark: rows past it were never written
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(embedding):
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _drop(self, key):
+        row = self._entries.pop(key)[0]
+        self._used[row] = False
+        self._row_keys[row] = None
+        self._free_rows.append(row)
+
+    def _allocate_row(self, dimension):
+        if self._free_rows:
+            return self._free_rows.pop()
+        capacity = 0 if self._matrix is None else len(self._matrix)
+        if self._rows_in_use == capacity:
+            # Never more rows than entries: freed rows are reused before the matrix grows
+            capacity = min(max(2 * capacity, 16), self.maxsize)
+            matrix = np.zeros((capacity, dimension), dtype=np.float32)
+            if self._matrix is not None:
+                matrix[:self._rows_in_use] = self._matrix[:self._rows_in_use]
+            self._matrix = matrix
+            self._used = np.concatenate([self._used, np.zeros(capacity - len(self._used), dtype=bool)])
+            self._row_keys.extend([None] * (capacity - len(self._row_keys)))
+        self._rows_in_use += 1
+        return self._rows_in_use - 1
+
+    def get(self, embedding):
+        vector = self._normalize(embedding)
+        with self._lock:
+            if self._entries:
+                similarities = self._matrix[:self._rows_in_use] @ vector
+                similarities[~self._used[:self._rows_in_use]] = -np.inf
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    key = self._row_keys[best]
+                    _, value, expires_at = self._entries[key]
+                    if expires_at is None or expires_at > time.monotonic():
+                        self._entries.move_to_end(key)
+                        self.hits += 1
+                        return value
+                    self._drop(key)
+            self.misses += 1
+            return None
+
+    def set(self, key, embedding, value):
+        if self.maxsize <= 0:
+            return
+        vector = self._normalize(embedding)
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            while len(self._entries) >= self.maxsize:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+            row = self._allocate_row(len(vector))
+            self._matrix[row] = vector
+            self._used[row] = True
+            self._row_keys[row] = key
+            self._entries[key] = (row, value, expires_at)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._used[:] = False
+            self._row_keys = [None] * len(self._row_keys)
+            self._free_rows = []
+            self._rows_in_use = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
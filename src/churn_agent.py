@@ -0,0 +1,251 @@
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.columnar_cache import load_csv
+from src.paths import DATA_DIR
+
+
+class ChurnAgent:
+    """
+    Detects "weak signals" of churn in daily data usage.
+
+    Each customer keeps time-decayed running sums of their usage records:
+    a 30-day half-life weighted linear regression (usage trend and baseline level)
+    and a 7-day half-life weighted mean (recent level). The sums are built for
+    everyone in one vectorized pass at startup, and a new daily record updates a
+    customer's sums in O(1), without rescanning their history.
+    """
+    # Half-lives (days) of the trend/baseline window and of the recent window
+    TREND_HALF_LIFE_DAYS = 30
+    RECENT_HALF_LIFE_DAYS = 7
+    # Usage falling by more than 20% of the baseline per month...
+    TREND_THRESHOLD = -0.20
+    # ...and the recent level below 85% of the baseline means a churn risk
+    DECLINE_RATIO_THRESHOLD = 0.85
+    # Records needed before a customer is scored
+    MIN_RECORDS = 14
+
+    # Columns of the per-customer state: trend-window weight and weighted sums
+    # of x (day), y (usage), x*y and x*x, then the recent-window weight and sum of y
+    _W, _SX, _SY, _SXY, _SXX, _RW, _RSY = range(7)
+
+    def __init__(self, data_dir=DATA_DIR):
+        self.data_dir = data_dir
+        self.usage_file = os.path.join(data_dir, "usage.csv")
+        self._lock = threading.Lock()
+        self._load_data()
+
+    def _load_data(self):
+        """Loads the usage table through the columnar cache and builds the running aggregates."""
+        if not os.path.exists(self.usage_file):
+            print(f"Error: Usage data not found at {self.usage_file}", file=sys.stderr)
+            raise FileNotFoundError(f"Usage data not found at {self.usage_file}")
+
+        start_time = time.perf_counter()
+        usage_df, self.load_stats = load_csv(self.usage_file, parse_dates=['date'], numeric=['data_usage_gb'])
+        self._build_aggregates(usage_df)
+        self.load_stats['startup_ms'] = round((time.perf_counter() - start_time) * 1000, 2)
+        print(
+            f"[ChurnAgent] Loaded {self.load_stats['rows']} usage records for {len(self._customer_ids)} customers "
+            f"in {self.load_stats['startup_ms']} ms (columnar cache: {self.load_stats['cache']})",
+            file=sys.stderr
+        )
+
+    def _build_aggregates(self, df):
+        """
+        Computes every customer's decayed sums in one pass: each record is weighted
+        by 0.5 ** (age / half-life), its age counted from the customer's latest record.
+        """
+        codes = df['customer_id'].cat.codes.to_numpy().astype(np.int64)
+        categories = df['customer_id'].cat.categories
+        dates = df['date'].to_numpy().astype('datetime64[D]')
+        usage = df['data_usage_gb'].to_numpy(dtype=np.float64)
+
+        # Days are counted from a fixed origin, so x stays small and later records share it
+        self._origin = dates.min() if len(dates) else np.datetime64('1970-01-01', 'D')
+        days = (dates - self._origin).astype(np.float64)
+
+        n_customers = len(categories)
+        last_day = np.full(n_customers, -np.inf)
+        np.maximum.at(last_day, codes, days)
+        age = last_day[codes] - days
+
+        trend_weights = 0.5 ** (age / self.TREND_HALF_LIFE_DAYS)
+        recent_weights = 0.5 ** (age / self.RECENT_HALF_LIFE_DAYS)
+
+        state = np.empty((n_customers, 7), dtype=np.float64)
+        for column, weights in (
+            (self._W, trend_weights),
+            (self._SX, trend_weights * days),
+            (self._SY, trend_weights * usage),
+            (self._SXY, trend_weights * days * usage),
+            (self._SXX, trend_weights * days * days),
+            (self._RW, recent_weights),
+            (self._RSY, recent_weights * usage),
+        ):
+            state[:, column] = np.bincount(codes, weights=weights, minlength=n_customers)
+
+        self._state = state
+        self._last_day = last_day
+        self._counts = np.bincount(codes, minlength=n_customers).astype(np.int64)
+        self._customer_ids = list(categories)
+        self._positions = {customer_id: i for i, customer_id in enumerate(self._customer_ids)}
+
+    def _add_customer(self, customer_id):
+        position = len(self._customer_ids)
+        self._customer_ids.append(customer_id)
+        self._positions[customer_id] = position
+        # Grow geometrically, so adding customers one by one stays amortized O(1)
+        if position >= len(self._state):
+            capacity = max(2 * len(self._state), 16)
+            self._state = np.concatenate([self._state, np.zeros((capacity - len(self._state), 7))])
+            self._last_day = np.concatenate([self._last_day, np.full(capacity - len(self._last_day), -np.inf)])
+            self._counts = np.concatenate([self._counts, np.zeros(capacity - len(self._counts), dtype=np.int64)])
+        return position
+
+    def record_usage(self, customer_id, date, data_usage_gb):
+        """
+        Adds one daily usage record and updates the customer's score in O(1).
+        Records may arrive late: an older record is weighted by its age instead of
+        decaying the sums. Returns the customer's updated churn assessment.
+        A non-finite usage or a missing date raises ValueError: either would poison
+        the customer's decayed sums for good.
+        """
+        try:
+            timestamp = pd.Timestamp(date)
+            usage = float(data_usage_gb)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Invalid usage record for {customer_id}: {e}") from e
+        if not np.isfinite(usage) or pd.isna(timestamp):
+            raise ValueError(f"Invalid usage record for {customer_id}: a date and a finite data_usage_gb are required")
+        day = float((np.datetime64(timestamp.date(), 'D') - self._origin).astype(np.int64))
+
+        with self._lock:
+            position = self._positions.get(customer_id)
+            if position is None:
+                position = self._add_customer(customer_id)
+
+            state = self._state[position]
+            last_day = self._last_day[position]
+            if day >= last_day:
+                # Age the existing sums to the new latest day, then add the record at full weight
+                if np.isfinite(last_day):
+                    state[:self._RW] *= 0.5 ** ((day - last_day) / self.TREND_HALF_LIFE_DAYS)
+                    state[self._RW:] *= 0.5 ** ((day - last_day) / self.RECENT_HALF_LIFE_DAYS)
+                self._last_day[position] = day
+                trend_weight = recent_weight = 1.0
+            else:
+                trend_weight = 0.5 ** ((last_day - day) / self.TREND_HALF_LIFE_DAYS)
+                recent_weight = 0.5 ** ((last_day - day) / self.RECENT_HALF_LIFE_DAYS)
+
+            state[self._W] += trend_weight
+            state[self._SX] += trend_weight * day
+            state[self._SY] += trend_weight * usage
+            state[self._SXY] += trend_weight * day * usage
+            state[self._SXX] += trend_weight * day * day
+            state[self._RW] += recent_weight
+            state[self._RSY] += recent_weight * usage
+            self._counts[position] += 1
+
+        return self.get_churn_risk(customer_id)
+
+    def _score(self, state):
+        """
+        Vectorized scores for rows of the state: baseline and recent daily usage,
+        the monthly trend relative to the baseline, and the recent/baseline ratio.
+        """
+        W, Sx, Sy, Sxy, Sxx = (state[:, column] for column in (self._W, self._SX, self._SY, self._SXY, self._SXX))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            baseline = Sy / W
+            recent = state[:, self._RSY] / state[:, self._RW]
+            slope = (W * Sxy - Sx * Sy) / (W * Sxx - Sx * Sx)
+            monthly_trend = np.where(baseline > 0, slope * 30 / baseline, 0.0)
+            decline_ratio = np.where(baseline > 0, recent / baseline, 1.0)
+        is_risk = (monthly_trend <= self.TREND_THRESHOLD) & (decline_ratio <= self.DECLINE_RATIO_THRESHOLD)
+        return baseline, recent, monthly_trend, decline_ratio, is_risk
+
+    def _day_to_date(self, day):
+        return str(self._origin + np.timedelta64(int(day), 'D'))
+
+    def get_churn_risk(self, customer_id):
+        """
+        Scores a customer's usage trend from their running aggregates (O(1)).
+        Returns a dict with analysis results.
+        """
+        with self._lock:
+            position = self._positions.get(customer_id)
+            if position is None or self._counts[position] < self.MIN_RECORDS:
+                return {
+                    "status": "INSUFFICIENT_DATA",
+                    "is_churn_risk": False,
+                    "message": "Not enough usage history to analyze."
+                }
+            state = self._state[position:position + 1].copy()
+            last_day = self._last_day[position]
+            records = int(self._counts[position])
+
+        baseline, recent, monthly_trend, decline_ratio, is_risk = (values[0] for values in self._score(state))
+        trend_pct = round(float(monthly_trend) * 100, 1)
+
+        return {
+            "status": "SUCCESS",
+            "customer_id": customer_id,
+            "last_usage_date": self._day_to_date(last_day),
+            "records": records,
+            "baseline_daily_usage_gb": round(float(baseline), 2),
+            "recent_daily_usage_gb": round(float(recent), 2),
+            "monthly_trend_pct": trend_pct,
+            "decline_ratio": round(float(decline_ratio), 3),
+            "is_churn_risk": bool(is_risk),
+            "risk_level": "HIGH" if is_risk else "LOW",
+            "message": (
+                f"Recent usage is {round(float(recent), 2)} GB/day vs a baseline of {round(float(baseline), 2)} GB/day "
+                f"(trend: {trend_pct}% per month)."
+            )
+        }
+
+    def scan_churn_risks(self, top_n=None):
+        """
+        Scores every customer at once from the running aggregates and returns the
+        churn risks, steepest decline first, optionally limited to the top_n.
+        """
+        with self._lock:
+            n_customers = len(self._customer_ids)
+            state = self._state[:n_customers].copy()
+            last_day = self._last_day[:n_customers].copy()
+            counts = self._counts[:n_customers].copy()
+            customer_ids = list(self._customer_ids)
+
+        baseline, recent, monthly_trend, decline_ratio, is_risk = self._score(state)
+        scored = counts >= self.MIN_RECORDS
+        flagged = np.flatnonzero(is_risk & scored)
+        flagged = flagged[np.argsort(decline_ratio[flagged], kind='stable')]
+        risks_found = len(flagged)
+        if top_n:
+            flagged = flagged[:top_n]
+
+        risks = [
+            {
+                "customer_id": customer_ids[i],
+                "last_usage_date": self._day_to_date(last_day[i]),
+                "baseline_daily_usage_gb": round(float(baseline[i]), 2),
+                "recent_daily_usage_gb": round(float(recent[i]), 2),
+                "monthly_trend_pct": round(float(monthly_trend[i]) * 100, 1),
+                "decline_ratio": round(float(decline_ratio[i]), 3),
+                "risk_level": "HIGH"
+            }
+            for i in flagged
+        ]
+
+        return {
+            "status": "SUCCESS",
+            "customers_scanned": int(n_customers),
+            "customers_scored": int(scored.sum()),
+            "churn_risks_found": int(risks_found),
+            "churn_risks": risks
+        }
@@ -0,0 +1,284 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.paths import CACHE_DIR
+
+# Bump when the on-disk layout changes so old caches are rebuilt
+CACHE_FORMAT_VERSION = 1
+META_FILE = "meta.json"
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """Hashes a file in chunks so large CSVs are never fully loaded in memory."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cache_entry_dir(csv_path, cache_dir):
+    # One entry per source path, so data dirs sharing a cache never collide
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+    path_key = hashlib.sha1(os.path.abspath(csv_path).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(cache_dir, "columnar", f"{name}-{path_key}")
+
+
+def _read_meta(entry_dir):
+    try:
+        with open(os.path.join(entry_dir, META_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(entry_dir, meta):
+    tmp_path = os.path.join(entry_dir, f"{META_FILE}.tmp-{os.getpid()}")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_path, os.path.join(entry_dir, META_FILE))
+
+
+def _save_array(path, values):
+    # Write then rename, so processes building the same cache concurrently never see a torn file
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        np.save(f, values)
+    os.replace(tmp_path, path)
+
+
+def write_columns(entry_dir, columns, source_meta):
+    """
+    Writes one .npy file per column. `columns` maps a column name to either a
+    NumPy array or a (codes, categories) tuple for string columns.
+    The meta file is written last, so a half-written cache is never used.
+    """
+    os.makedirs(entry_dir, exist_ok=True)
+    meta_path = os.path.join(entry_dir, META_FILE)
+    try:
+        os.remove(meta_path)
+    except FileNotFoundError:
+        pass
+
+    layout = []
+    for name, values in columns.items():
+        if isinstance(values, tuple):
+            codes, categories = values
+            _save_array(os.path.join(entry_dir, f"{name}.codes.npy"), codes)
+            _save_array(os.path.join(entry_dir, f"{name}.categories.npy"), categories)
+            layout.append({"name": name, "kind": "category"})
+        else:
+            _save_array(os.path.join(entry_dir, f"{name}.npy"), values)
+            layout.append({"name": name, "kind": "array"})
+
+    meta = dict(source_meta)
+    meta["format_version"] = CACHE_FORMAT_VERSION
+    meta["columns"] = layout
+    _write_meta(entry_dir, meta)
+    return meta
+
+
+class _ArrayAppender:
+    """
+    Builds a 1-D .npy file from chunks of unknown total length: the chunks go to
+    a raw temporary file, and finish() writes the header followed by the data.
+    """
+    def __init__(self, path, dtype):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.length = 0
+        self._raw_path = f"{path}.raw-{os.getpid()}"
+        self._raw = open(self._raw_path, "wb")
+
+    def append(self, values):
+        values = np.ascontiguousarray(values, dtype=self.dtype)
+        self._raw.write(values.tobytes())
+        self.length += len(values)
+
+    def finish(self):
+        self._raw.close()
+        tmp_path = f"{self.path}.tmp-{os.getpid()}"
+        header = {"descr": np.lib.format.dtype_to_descr(self.dtype), "fortran_order": False, "shape": (self.length,)}
+        with open(tmp_path, "wb") as f, open(self._raw_path, "rb") as raw:
+            np.lib.format.write_array_header_1_0(f, header)
+            shutil.copyfileobj(raw, f, 16 << 20)
+        os.remove(self._raw_path)
+        os.replace(tmp_path, self.path)
+
+    def discard(self):
+        self._raw.close()
+        os.remove(self._raw_path)
+
+
+class ColumnarWriter:
+    """
+    Streams a table into the columnar cache while its CSV is being written, so
+    the first load_csv() of a freshly generated file is already a cache hit.
+    `schema` maps each column name to its dtype, or to ("category", categories_dtype)
+    for string columns. Chunks must arrive in the final row order; category columns
+    are given as (codes, new_categories), the codes indexing all categories appended so far.
+    """
+    def __init__(self, csv_path, schema, cache_dir=CACHE_DIR):
+        self.csv_path = csv_path
+        self.entry_dir = _cache_entry_dir(csv_path, cache_dir)
+        os.makedirs(self.entry_dir, exist_ok=True)
+
+        self.rows = 0
+        self._layout = []
+        self._appenders = {}
+        for name, dtype in schema.items():
+            if isinstance(dtype, tuple):
+                self._appenders[name] = (
+                    _ArrayAppender(os.path.join(self.entry_dir, f"{name}.codes.npy"), np.int32),
+                    _ArrayAppender(os.path.join(self.entry_dir, f"{name}.categories.npy"), dtype[1])
+                )
+                self._layout.append({"name": name, "kind": "category"})
+            else:
+                self._appenders[name] = _ArrayAppender(os.path.join(self.entry_dir, f"{name}.npy"), dtype)
+                self._layout.append({"name": name, "kind": "array"})
+
+    def append(self, columns):
+        """Appends one chunk of rows; `columns` must hold every column of the schema."""
+        for name, appender in self._appenders.items():
+            if isinstance(appender, tuple):
+                codes, new_categories = columns[name]
+                appender[0].append(codes)
+                appender[1].append(new_categories)
+            else:
+                appender.append(columns[name])
+        first = self._appenders[self._layout[0]["name"]]
+        self.rows = first[0].length if isinstance(first, tuple) else first.length
+
+    def close(self, sha256):
+        """Finishes the arrays and writes the meta file, keyed on the now complete CSV."""
+        # Chunks went to temp files so far: an interrupted run leaves the previous entry valid
+        try:
+            os.remove(os.path.join(self.entry_dir, META_FILE))
+        except FileNotFoundError:
+            pass
+        for appender in self._appenders.values():
+            for part in (appender if isinstance(appender, tuple) else (appender,)):
+                part.finish()
+        source_stat = os.stat(self.csv_path)
+        meta = {
+            "source": os.path.abspath(self.csv_path),
+            "size": source_stat.st_size,
+            "mtime_ns": source_stat.st_mtime_ns,
+            "sha256": sha256,
+            "rows": self.rows,
+            "format_version": CACHE_FORMAT_VERSION,
+            "columns": self._layout,
+        }
+        _write_meta(self.entry_dir, meta)
+        return meta
+
+    def discard(self):
+        for appender in self._appenders.values():
+            for part in (appender if isinstance(appender, tuple) else (appender,)):
+                part.discard()
+
+
+def categorize_strings(df):
+    """Turns every non-numeric, non-date column into a categorical with sorted categories."""
+    for name in df.columns:
+        series = df[name]
+        if not (pd.api.types.is_numeric_dtype(series) or pd.api.types.is_datetime64_any_dtype(series)):
+            df[name] = pd.Categorical(series.astype(str))
+    return df
+
+
+def frame_to_columns(df):
+    """Converts a typed, categorized DataFrame into cacheable columns."""
+    columns = {}
+    for name in df.columns:
+        series = df[name]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes = series.cat.codes.to_numpy().astype(np.int32)
+            columns[name] = (codes, np.asarray(series.cat.categories, dtype=str))
+        else:
+            columns[name] = series.to_numpy()
+    return columns
+
+
+def _load_columns(entry_dir, meta):
+    data = {}
+    for column in meta["columns"]:
+        name = column["name"]
+        if column["kind"] == "category":
+            codes = np.load(os.path.join(entry_dir, f"{name}.codes.npy"), mmap_mode="r")
+            categories = np.load(os.path.join(entry_dir, f"{name}.categories.npy"))
+            data[name] = pd.Categorical.from_codes(codes, categories=categories)
+        else:
+            data[name] = np.load(os.path.join(entry_dir, f"{name}.npy"), mmap_mode="r")
+    return pd.DataFrame(data, copy=False)
+
+
+def load_csv(csv_path, parse_dates=(), numeric=(), cache_dir=CACHE_DIR):
+    """
+    Loads a CSV through the columnar cache.
+    The cache is keyed on the source file's mtime and size (fast path) and its
+    SHA-256 (checked when the mtime changed), and is rebuilt when stale.
+    Returns (DataFrame, stats) where stats reports how the data was obtained.
+    """
+    start_time = time.perf_counter()
+    entry_dir = _cache_entry_dir(csv_path, cache_dir)
+    source_stat = os.stat(csv_path)
+    meta = _read_meta(entry_dir)
+
+    status = "rebuilt"
+    if meta and meta.get("format_version") == CACHE_FORMAT_VERSION and meta.get("size") == source_stat.st_size:
+        if meta.get("mtime_ns") == source_stat.st_mtime_ns:
+            status = "hit"
+        elif meta.get("sha256") == file_sha256(csv_path):
+            # Touched but unchanged (e.g. fresh checkout): keep the arrays, refresh the key
+            meta["mtime_ns"] = source_stat.st_mtime_ns
+            _write_meta(entry_dir, meta)
+            status = "revalidated"
+
+    df = None
+    if status != "rebuilt":
+        try:
+            df = _load_columns(entry_dir, meta)
+        except (OSError, ValueError) as e:
+            print(f"Warning: Columnar cache at {entry_dir} is unreadable ({e}), rebuilding.", file=sys.stderr)
+            status = "rebuilt"
+
+    if df is None:
+        df = pd.read_csv(csv_path)
+        for name in numeric:
+            df[name] = pd.to_numeric(df[name])
+        for name in parse_dates:
+            df[name] = pd.to_datetime(df[name])
+        # Same dtypes whether or not the cache can be written
+        df = categorize_strings(df)
+
+        source_meta = {
+            "source": os.path.abspath(csv_path),
+            "size": source_stat.st_size,
+            "mtime_ns": source_stat.st_mtime_ns,
+            "sha256": file_sha256(csv_path),
+            "rows": len(df),
+        }
+        try:
+            meta = write_columns(entry_dir, frame_to_columns(df), source_meta)
+            # Serve the mapped arrays so every start sees the same dtypes
+            df = _load_columns(entry_dir, meta)
+        except OSError as e:
+            print(f"Warning: Could not write columnar cache to {entry_dir}: {e}", file=sys.stderr)
+            meta = source_meta
+
+    stats = {
+        "source": csv_path,
+        "rows": len(df),
+        "cache": status,
+        "sha256": meta.get("sha256"),
+        "load_ms": round((time.perf_counter() - start_time) * 1000, 2),
+    }
+    return df, stats
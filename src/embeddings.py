@@ -0,0 +1,69 @@
+import os
+import sys
+
+from src.paths import CACHE_DIR
+
+# 'torch' (full-precision PyTorch, the reference), 'int8' (PyTorch with dynamically
+# quantized Linear layers) or 'onnx' (ONNX Runtime on the CPU execution provider)
+EMBEDDING_BACKEND = os.environ.get("SENTINEL_EMBEDDING_BACKEND", "torch")
+# Intra-op threads for the forward pass (0 keeps the library default, usually one per core)
+EMBEDDING_THREADS = int(os.environ.get("SENTINEL_EMBEDDING_THREADS", "0"))
+
+EMBEDDING_BACKENDS = ("torch", "int8", "onnx")
+
+
+def _load_torch(model_name, threads):
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    if threads:
+        torch.set_num_threads(threads)
+    return SentenceTransformer(model_name, device="cpu")
+
+
+def _load_int8(model_name, threads):
+    import torch
+
+    model = _load_torch(model_name, threads)
+    # Weights of every Linear layer become int8, activations are quantized on the fly
+    torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return model
+
+
+def _load_onnx(model_name, threads):
+    import onnxruntime
+    from sentence_transformers import SentenceTransformer
+
+    session_options = onnxruntime.SessionOptions()
+    if threads:
+        session_options.intra_op_num_threads = threads
+        session_options.inter_op_num_threads = 1
+    model_kwargs = {"provider": "CPUExecutionProvider", "session_options": session_options}
+
+    # The first start exports the model to ONNX (needs `optimum[onnxruntime]`) and keeps
+    # the export in the cache, so later starts only load the graph
+    export_dir = os.path.join(CACHE_DIR, "onnx", model_name.strip("/").replace("/", "__"))
+    if os.path.exists(os.path.join(export_dir, "onnx", "model.onnx")):
+        return SentenceTransformer(export_dir, device="cpu", backend="onnx", model_kwargs=model_kwargs)
+
+    model = SentenceTransformer(model_name, device="cpu", backend="onnx", model_kwargs=model_kwargs)
+    try:
+        model.save_pretrained(export_dir)
+    except OSError as e:
+        print(f"Warning: Could not cache the ONNX export in {export_dir}: {e}", file=sys.stderr)
+    return model
+
+
+_LOADERS = {"torch": _load_torch, "int8": _load_int8, "onnx": _load_onnx}
+
+
+def load_embedding_model(model_name, backend=EMBEDDING_BACKEND, threads=EMBEDDING_THREADS):
+    """
+    Loads a SentenceTransformer for CPU inference on the requested backend.
+    All backends expose the same encode() API and produce vectors of the same dimension.
+    """
+    if backend not in _LOADERS:
+        raise ValueError(f"Unknown embedding backend '{backend}'. Choose from: {', '.join(EMBEDDING_BACKENDS)}")
+    model = _LOADERS[backend](model_name, threads)
+    print(f"[Embeddings] Loaded {model_name} ({backend}, threads={threads or 'default'})", file=sys.stderr)
+    return model
@@ -1,127 +1,326 @@
-import pandas as pd
+"""
+Synthetic telecom data generator (customers, monthly bills, daily usage).
+
+Rows are built as NumPy arrays, one chunk of customers at a time, and streamed
+to CSV and to the columnar cache, so tens of millions of rows never sit in
+memory at once. Chunks can be generated by worker processes.
+
+Usage (from the repository root):
+    python -m src.generator --customers 100
+    python -m src.generator --customers 1000000 --days 90 --workers 8 --output-dir /tmp/sentinel-data
+
+Each chunk draws from its own seed derived from --seed, so a run is
+reproducible for a given seed and --chunk-size, whatever the number of workers.
+"""
+import argparse
+import hashlib
+import os
+import sys
+import time
+from datetime import date
+from multiprocessing import Pool
+
 import numpy as np
+import pandas as pd
 from faker import Faker
-import random
-from datetime import datetime, timedelta
-import os
 
-# Configuration
+from src.columnar_cache import ColumnarWriter
+from src.paths import CACHE_DIR, DATA_DIR
+
+# Defaults
 NUM_CUSTOMERS = 100
 MONTHS_HISTORY = 6
-START_DATE = datetime.now() - timedelta(days=30*MONTHS_HISTORY)
-OUTPUT_DIR = r"C:\Users\hayth\Desktop\SFR\Sentinel\data"
-
-fake = Faker()
-np.random.seed(42)  # For reproducibility
-
-def ensure_dir(directory):
-    if not os.path.exists(directory):
-        os.makedirs(directory)
-
-def generate_customers(n=NUM_CUSTOMERS):
-    customers = []
-    for i in range(n):
-        customers.append({
-            "customer_id": f"CUST_{i+1:04d}",
-            "name": fake.name(),
-            "email": fake.email(),
-            "phone": fake.phone_number(),
-            "plan_type": random.choice(["Basic", "Standard", "Premium"]),
-            "base_cost": random.choice([29.99, 49.99, 79.99]),
-            "region": random.choice(["Zone A", "Zone B", "Zone C"])
-        })
-    return pd.DataFrame(customers)
-
-def generate_billing(customers_df):
-    billing_records = []
-    
-    # Select 5% of customers to have a "Billing Anomaly" in the last month
-    anomaly_indices = np.random.choice(customers_df.index, size=int(len(customers_df) * 0.05), replace=False)
-    
-    for idx, row in customers_df.iterrows():
-        customer_id = row["customer_id"]
-        base_cost = row["base_cost"]
-        
-        for m in range(MONTHS_HISTORY):
-            # Month calculation
-            bill_date = START_DATE + timedelta(days=30*m)
-            month_str = bill_date.strftime("%Y-%m")
-            
-            # Normal random variation (+/- 5%)
-            variation = np.random.uniform(-0.05, 0.05)
-            amount = base_cost * (1 + variation)
-            
-            # Label
-            is_anomaly = False
-            
-            # If this is an anomaly customer AND it's the last month (most recent bill)
-            if idx in anomaly_indices and m == MONTHS_HISTORY - 1:
-                amount = amount * 3.5  # HUGE spike
-                is_anomaly = True
-            
-            billing_records.append({
-                "billing_id": f"BILL_{customer_id}_{month_str}",
-                "customer_id": customer_id,
-                "date": bill_date.strftime("%Y-%m-%d"),
-                "amount": round(amount, 2),
-                "is_anomaly_truth": is_anomaly # Hidden label for verification
-            })
-            
-    return pd.DataFrame(billing_records)
-
-def generate_usage(customers_df):
-    usage_records = []
-    
-    # Select 10% of customers to have "Weak Signal" (Usage Drop) -> Churn Risk
-    churn_risk_indices = np.random.choice(customers_df.index, size=int(len(customers_df) * 0.10), replace=False)
-    
-    for idx, row in customers_df.iterrows():
-        customer_id = row["customer_id"]
-        
-        # Base usage between 5GB and 50GB daily (avg)
-        avg_daily_usage = np.random.uniform(5, 50)
-        
-        # Simulate last 90 days
-        for day in range(90):
-            date = datetime.now() - timedelta(days=90-day)
-            
-            usage = np.random.normal(avg_daily_usage, 2) # Normal noise
-            
-            # If churn risk, gradually reduce usage over time
-            if idx in churn_risk_indices:
-                # Factor decreases from 1.0 down to 0.2 over 90 days
-                decline_factor = 1 - (day / 90) * 0.8  
-                usage = usage * decline_factor
-            
-            usage = max(0, usage) # No negative usage
-            
-            usage_records.append({
-                "customer_id": customer_id,
-                "date": date.strftime("%Y-%m-%d"),
-                "data_usage_gb": round(usage, 2),
-                "is_churn_risk_truth": (idx in churn_risk_indices) # Hidden label
-            })
-            
-    return pd.DataFrame(usage_records)
+USAGE_DAYS = 90
+BILLING_ANOMALY_RATE = 0.05  # "Billing Anomaly" on the most recent bill
+CHURN_RISK_RATE = 0.10       # "Weak Signal" (Usage Drop) -> Churn Risk
+CHUNK_SIZE = 10000           # customers per chunk
+
+PLAN_TYPES = np.array(["Basic", "Standard", "Premium"])
+BASE_COSTS = np.array([29.99, 49.99, 79.99])
+REGIONS = np.array(["Zone A", "Zone B", "Zone C"])
+# Names are drawn from Faker-made pools instead of one Faker call per row
+NAME_POOL_SIZE = 1000
+# Same resolution pd.to_datetime gives, so the streamed cache matches a CSV reload
+DATE_DTYPE = np.dtype(pd.to_datetime(pd.Series(["2000-01-01"])).dtype)
+
+CUSTOMER_COLUMNS = ["customer_id", "name", "email", "phone", "plan_type", "base_cost", "region"]
+BILLING_COLUMNS = ["billing_id", "customer_id", "date", "amount", "is_anomaly_truth"]
+USAGE_COLUMNS = ["customer_id", "date", "data_usage_gb", "is_churn_risk_truth"]
+
+_name_pools = None
+
+
+def build_name_pools(seed):
+    Faker.seed(seed)
+    fake = Faker()
+    return {
+        "first": np.array([fake.first_name() for _ in range(NAME_POOL_SIZE)]),
+        "last": np.array([fake.last_name() for _ in range(NAME_POOL_SIZE)]),
+        "domain": np.array(sorted({fake.free_email_domain() for _ in range(50)})),
+    }
+
+
+def _init_worker(name_pools):
+    global _name_pools
+    _name_pools = name_pools
+
+
+def customer_ids(start, stop, width):
+    """CUST_0001-style ids; zero-padded to a fixed width, so string order is numeric order."""
+    return np.char.add("CUST_", np.char.zfill(np.arange(start + 1, stop + 1).astype(str), width))
+
+
+def _join(*parts):
+    result = parts[0]
+    for part in parts[1:]:
+        result = np.char.add(result, part)
+    return result
+
+
+def _to_csv(columns, names):
+    return pd.DataFrame(dict(zip(names, columns))).to_csv(index=False, header=False).encode("utf-8")
+
+
+def generate_chunk(task):
+    """
+    Generates the customers, bills and usage records of one chunk of customers.
+    Returns CSV bytes for each table, plus the billing and usage columns as arrays.
+    """
+    rng = np.random.default_rng(task["seed"])
+    start, stop = task["start"], task["stop"]
+    months, days, end_date = task["months"], task["days"], task["end_date"]
+    anomaly, churn = task["anomaly"], task["churn"]
+    n = stop - start
+    ids = customer_ids(start, stop, task["width"])
+
+    # --- Customers ---
+    first = _name_pools["first"][rng.integers(0, NAME_POOL_SIZE, n)]
+    last = _name_pools["last"][rng.integers(0, NAME_POOL_SIZE, n)]
+    domain = _name_pools["domain"][rng.integers(0, len(_name_pools["domain"]), n)]
+    numbers = np.arange(start + 1, stop + 1).astype(str)
+    phone = _join(
+        "(", rng.integers(200, 1000, n).astype(str), ")", rng.integers(200, 1000, n).astype(str),
+        "-", np.char.zfill(rng.integers(0, 10000, n).astype(str), 4)
+    )
+    plan_type = PLAN_TYPES[rng.integers(0, 3, n)]
+    base_cost = BASE_COSTS[rng.integers(0, 3, n)]
+    region = REGIONS[rng.integers(0, 3, n)]
+    customers_csv = _to_csv([
+        ids, _join(first, " ", last), _join(np.char.lower(first), ".", np.char.lower(last), numbers, "@", domain),
+        phone, plan_type, base_cost, region
+    ], CUSTOMER_COLUMNS)
+
+    # --- Billing: one bill every 30 days, the last one 30 days before end_date ---
+    bill_dates = end_date - np.timedelta64(30 * months, "D") + np.arange(months) * np.timedelta64(30, "D")
+    # Normal random variation (+/- 5%)
+    amounts = base_cost[:, None] * (1 + rng.uniform(-0.05, 0.05, (n, months)))
+    is_anomaly = np.zeros((n, months), dtype=bool)
+    # Anomaly customers get a HUGE spike on their most recent bill
+    amounts[anomaly, -1] *= 3.5
+    is_anomaly[anomaly, -1] = True
+    amounts = np.round(amounts, 2).ravel()
+    is_anomaly = is_anomaly.ravel()
+
+    month_strings = np.datetime_as_string(bill_dates.astype("datetime64[M]"))
+    billing_ids = _join("BILL_", np.repeat(ids, months), "_", np.tile(month_strings, n))
+    billing_dates = np.tile(bill_dates, n)
+    billing_csv = _to_csv([
+        billing_ids, np.repeat(ids, months), np.datetime_as_string(billing_dates), amounts, is_anomaly
+    ], BILLING_COLUMNS)
+
+    # --- Usage: the `days` days before end_date ---
+    usage_dates = end_date - np.arange(days, 0, -1) * np.timedelta64(1, "D")
+    # Base usage between 5GB and 50GB daily (avg), plus normal noise
+    usage = rng.normal(rng.uniform(5, 50, n)[:, None], 2, (n, days))
+    # Churn risks gradually reduce usage: factor decreases from 1.0 down to 0.2
+    usage[churn] *= 1 - (np.arange(days) / days) * 0.8
+    usage = np.round(np.maximum(usage, 0), 2).ravel()  # No negative usage
+    is_churn = np.repeat(churn, days)
+    usage_day_dates = np.tile(usage_dates, n)
+    usage_csv = _to_csv([
+        np.repeat(ids, days), np.datetime_as_string(usage_day_dates), usage, is_churn
+    ], USAGE_COLUMNS)
+
+    customer_codes = np.arange(start, stop, dtype=np.int32)
+    return {
+        "customer_ids": ids,
+        "customers": customers_csv,
+        "billing": (billing_csv, {
+            "billing_id": billing_ids,
+            "customer_id": np.repeat(customer_codes, months),
+            "date": billing_dates.astype(DATE_DTYPE),
+            "amount": amounts,
+            "is_anomaly_truth": is_anomaly,
+        }),
+        "usage": (usage_csv, {
+            "customer_id": np.repeat(customer_codes, days),
+            "date": usage_day_dates.astype(DATE_DTYPE),
+            "data_usage_gb": usage,
+            "is_churn_risk_truth": is_churn,
+        }),
+    }
+
+
+class _TableOutput:
+    """
+    A CSV written chunk by chunk (hashed on the fly) and, optionally, its columnar cache.
+    Rows go to a per-process temp file renamed into place by close(), so an interrupted
+    run never leaves a truncated CSV under the real name.
+    """
+    def __init__(self, path, columns, schema=None, cache_dir=CACHE_DIR):
+        self.path = path
+        self.rows = 0
+        self._digest = hashlib.sha256()
+        self._temp_path = f"{path}.tmp-{os.getpid()}"
+        self._file = open(self._temp_path, "wb")
+        self._writer = ColumnarWriter(path, schema, cache_dir) if schema else None
+        # Last billing_id written, to number repeated ids across chunks
+        self._last_category = None
+        self._categories = 0
+        self.write((",".join(columns) + "\n").encode("utf-8"))
+
+    def write(self, data, columns=None):
+        self._file.write(data)
+        self._digest.update(data)
+        if columns is not None and self._writer is not None:
+            self._writer.append(columns)
+
+    def category_codes(self, values):
+        """Codes of a sorted string column arriving in order (repeats stay adjacent)."""
+        is_new = np.empty(len(values), dtype=bool)
+        is_new[1:] = values[1:] != values[:-1]
+        if len(values):
+            is_new[0] = values[0] != self._last_category
+            self._last_category = values[-1]
+        codes = (self._categories + np.cumsum(is_new) - 1).astype(np.int32)
+        self._categories += int(is_new.sum())
+        return codes, values[is_new]
+
+    def close(self):
+        self._file.close()
+        os.replace(self._temp_path, self.path)
+        # The cache is keyed on the CSV's final name, size and mtime
+        if self._writer is not None:
+            self._writer.close(self._digest.hexdigest())
+
+    def discard(self):
+        self._file.close()
+        try:
+            os.remove(self._temp_path)
+        except FileNotFoundError:
+            pass
+        if self._writer is not None:
+            self._writer.discard()
+
+
+def generate(customers=NUM_CUSTOMERS, months=MONTHS_HISTORY, days=USAGE_DAYS,
+             billing_anomaly_rate=BILLING_ANOMALY_RATE, churn_rate=CHURN_RISK_RATE, seed=42,
+             output_dir=DATA_DIR, end_date=None, workers=1, chunk_size=CHUNK_SIZE,
+             columnar=True, cache_dir=CACHE_DIR):
+    """Writes customers.csv, billing.csv and usage.csv to output_dir. Returns row counts."""
+    if customers < 1 or months < 1 or days < 1:
+        raise ValueError("customers, months and days must be at least 1")
+    os.makedirs(output_dir, exist_ok=True)
+    end_date = np.datetime64(end_date or date.today(), "D")
+    width = max(4, len(str(customers)))
+
+    # Exact label counts, like sampling without replacement over the whole customer base
+    selection_seed, chunks_seed = np.random.SeedSequence(seed).spawn(2)
+    rng = np.random.default_rng(selection_seed)
+    anomaly = np.zeros(customers, dtype=bool)
+    anomaly[rng.choice(customers, size=int(customers * billing_anomaly_rate), replace=False)] = True
+    churn = np.zeros(customers, dtype=bool)
+    churn[rng.choice(customers, size=int(customers * churn_rate), replace=False)] = True
+
+    starts = range(0, customers, chunk_size)
+    tasks = (
+        {
+            "start": start, "stop": min(start + chunk_size, customers), "width": width,
+            "seed": chunk_seed, "months": months, "days": days, "end_date": end_date,
+            "anomaly": anomaly[start:start + chunk_size], "churn": churn[start:start + chunk_size],
+        }
+        for start, chunk_seed in zip(starts, chunks_seed.spawn(len(starts)))
+    )
+
+    id_dtype = f"<U{5 + width}"
+    billing_schema = {
+        "billing_id": ("category", f"<U{5 + 5 + width + 1 + 7}"),
+        "customer_id": ("category", id_dtype),
+        "date": DATE_DTYPE, "amount": np.float64, "is_anomaly_truth": np.bool_,
+    } if columnar else None
+    usage_schema = {
+        "customer_id": ("category", id_dtype),
+        "date": DATE_DTYPE, "data_usage_gb": np.float64, "is_churn_risk_truth": np.bool_,
+    } if columnar else None
+
+    outputs = {
+        "customers": _TableOutput(os.path.join(output_dir, "customers.csv"), CUSTOMER_COLUMNS),
+        "billing": _TableOutput(os.path.join(output_dir, "billing.csv"), BILLING_COLUMNS, billing_schema, cache_dir),
+        "usage": _TableOutput(os.path.join(output_dir, "usage.csv"), USAGE_COLUMNS, usage_schema, cache_dir),
+    }
+    name_pools = build_name_pools(seed)
+    pool = Pool(workers, initializer=_init_worker, initargs=(name_pools,)) if workers > 1 else None
+    try:
+        if pool is None:
+            _init_worker(name_pools)
+        # imap keeps chunk order, so the files are identical whatever the worker count
+        results = pool.imap(generate_chunk, tasks) if pool else map(generate_chunk, tasks)
+        for done, result in enumerate(results, 1):
+            outputs["customers"].write(result["customers"])
+            outputs["customers"].rows += len(result["customer_ids"])
+            for table in ("billing", "usage"):
+                data, columns = result[table]
+                output = outputs[table]
+                columns["customer_id"] = (columns["customer_id"], result["customer_ids"])
+                if "billing_id" in columns:
+                    columns["billing_id"] = output.category_codes(columns["billing_id"])
+                output.write(data, columns)
+                output.rows += len(columns["date"])
+            print(f"  chunk {done}/{len(starts)} written", file=sys.stderr)
+    except BaseException:
+        for output in outputs.values():
+            output.discard()
+        raise
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+    for output in outputs.values():
+        output.close()
+    return {table: output.rows for table, output in outputs.items()}
+
 
 def main():
-    ensure_dir(OUTPUT_DIR)
-    print("Generating Customers...")
-    customers_df = generate_customers()
-    customers_df.to_csv(os.path.join(OUTPUT_DIR, "customers.csv"), index=False)
-    
-    print("Generating Billing History...")
-    billing_df = generate_billing(customers_df)
-    billing_df.to_csv(os.path.join(OUTPUT_DIR, "billing.csv"), index=False)
-    
-    print("Generating Usage Data (Weak Signals)...")
-    usage_df = generate_usage(customers_df)
-    usage_df.to_csv(os.path.join(OUTPUT_DIR, "usage.csv"), index=False)
-    
-    print(f"Data generation complete! Files saved to {OUTPUT_DIR}")
-    print(f"- Customers: {len(customers_df)}")
-    print(f"- Billing Records: {len(billing_df)}")
-    print(f"- Usage Records: {len(usage_df)}")
+    parser = argparse.ArgumentParser(description="Generates synthetic Sentinel data.")
+    parser.add_argument("--customers", type=int, default=NUM_CUSTOMERS)
+    parser.add_argument("--months", type=int, default=MONTHS_HISTORY, help="Monthly bills per customer")
+    parser.add_argument("--days", type=int, default=USAGE_DAYS, help="Daily usage records per customer")
+    parser.add_argument("--anomaly-rate", type=float, default=BILLING_ANOMALY_RATE,
+                        help="Share of customers with a billing spike on their latest bill")
+    parser.add_argument("--churn-rate", type=float, default=CHURN_RISK_RATE,
+                        help="Share of customers whose usage declines (churn risk)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output-dir", default=DATA_DIR)
+    parser.add_argument("--end-date", help="Day after the last usage record, YYYY-MM-DD (default: today)")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes generating chunks")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Customers per chunk")
+    parser.add_argument("--no-columnar", action="store_true", help="Only write CSVs, skip the columnar cache")
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    print(f"Generating data for {args.customers} customers into {args.output_dir}...")
+    counts = generate(
+        customers=args.customers, months=args.months, days=args.days,
+        billing_anomaly_rate=args.anomaly_rate, churn_rate=args.churn_rate, seed=args.seed,
+        output_dir=args.output_dir, end_date=args.end_date, workers=args.workers,
+        chunk_size=args.chunk_size, columnar=not args.no_columnar
+    )
+
+    print(f"Data generation complete in {time.perf_counter() - start_time:.1f}s! Files saved to {args.output_dir}")
+    print(f"- Customers: {counts['customers']}")
+    print(f"- Billing Records: {counts['billing']}")
+    print(f"- Usage Records: {counts['usage']}")
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,698 @@
+import asyncio
+import json
+import os
+import sys
+import time
+
+from src.metrics import TOOL_CALLS, TOOL_LATENCY
+from src.serialization import dumps_bytes, loads
+from src.tracing import add_remote_spans, current_trace_id, record_span
+
+# Tool results (e.g. billing histories) can be far bigger than asyncio's 64 KiB default line limit
+MAX_LINE_BYTES = 32 * 1024 * 1024
+
+MCP_PROTOCOL_VERSION = "2024-11-05"
+CLIENT_INFO = {"name": "sentinel-supervisor", "version": "2.0-mcp"}
+WARM_UP_POLL_S = 0.2
+# How often a client retries a Unix socket that does not accept connections yet
+CONNECT_RETRY_S = 0.5
+# How long a server gets to exit after SIGTERM before it is killed
+STOP_TIMEOUT_S = 5.0
+# Replayed broadcasts kept before the log is compacted into a snapshot of a replica's state
+REPLAY_LOG_MAX = int(os.environ.get("SENTINEL_REPLAY_LOG_MAX", "32"))
+
+
+def _succeeded(result):
+    """False for MCP tool errors and for payloads reporting status ERROR (the servers' convention)."""
+    if result.get("isError"):
+        return False
+    try:
+        payload = loads(result["content"][0]["text"])
+    except (KeyError, IndexError, ValueError):
+        return True
+    return not (isinstance(payload, dict) and payload.get("status") == "ERROR")
+
+
+class SimpleMCPClient:
+    """
+    Asyncio JSON-RPC client for one MCP server subprocess (stdio transport).
+    A single reader task per process dispatches responses to per-id futures,
+    so many calls can be in flight over the same pipe without blocking the
+    event loop or reading each other's responses.
+    """
+    def __init__(self, command, args, cwd=None, env=None, default_timeout=30.0, name=None,
+                 startup_timeout=120.0, ready_tool=None, server=None):
+        self.command = command
+        self.args = args
+        self.cwd = cwd
+        self.env = env
+        self.default_timeout = default_timeout
+        self.startup_timeout = startup_timeout
+        # Optional tool returning {"ready": bool, ...} for servers that warm up after the handshake
+        self.ready_tool = ready_tool
+        self.name = name or " ".join(args)
+        # Metrics label shared by the replicas of a pool
+        self.server = server or self.name
+        self.process = None
+        self._reader = None
+        self._writer = None
+        self.ready = False
+        self.handshake_ms = None
+        self.boot_time_ms = None
+        self.server_info = {}
+        self.warm_up_status = None
+        self.request_id = 0
+        self.last_response_at = 0.0
+        self._pending = {}
+        self._reader_task = None
+
+    @property
+    def in_flight(self):
+        """Number of requests sent and still waiting for a response."""
+        return len(self._pending)
+
+    @property
+    def is_alive(self):
+        return self._connected() and self._reader_task is not None and not self._reader_task.done()
+
+    # --- Transport: the server's stdio pipes (UnixSocketMCPClient swaps in a socket) ---
+
+    async def _connect(self):
+        """Spawns the server process; returns the (reader, writer) streams to talk to it."""
+        full_cmd = [self.command] + self.args
+        print(f"Starting MCP Server: {' '.join(full_cmd)}")
+        self.process = await asyncio.create_subprocess_exec(
+            *full_cmd,
+            cwd=self.cwd,
+            env=self.env,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=sys.stderr, # Redirect stderr to main process stderr
+            limit=MAX_LINE_BYTES
+        )
+        return self.process.stdout, self.process.stdin
+
+    def _connected(self):
+        return self.process is not None and self.process.returncode is None
+
+    async def _disconnect(self):
+        if self.process and self.process.returncode is None:
+            try:
+                self.process.terminate()
+                await asyncio.wait_for(self.process.wait(), STOP_TIMEOUT_S)
+            except ProcessLookupError:
+                pass
+            except asyncio.TimeoutError:
+                # A hung (or stopped) process may never act on SIGTERM
+                print(f"[MCP Client] {self.name} ignored SIGTERM for {STOP_TIMEOUT_S}s, killing it", file=sys.stderr)
+                self.process.kill()
+                await self.process.wait()
+
+    def _exit_status(self):
+        return f"Return code: {self.process.returncode}"
+
+    def _initialize_params(self):
+        return {"protocolVersion": MCP_PROTOCOL_VERSION, "capabilities": {}, "clientInfo": CLIENT_INFO}
+
+    async def start(self):
+        """
+        Spawns the server and performs the MCP initialize/initialized handshake.
+        The server only counts as ready once it has answered 'initialize' and, if
+        it warms up in the background, once its ready_tool reports it is warm.
+        """
+        start_time = time.perf_counter()
+        self.ready = False
+        self._reader, self._writer = await self._connect()
+        self._reader_task = asyncio.create_task(self._read_loop())
+
+        try:
+            result = await self.request("initialize", self._initialize_params(), timeout=self.startup_timeout)
+        except asyncio.TimeoutError:
+            await self.stop()
+            raise RuntimeError(f"Server {self.name} not ready within {self.startup_timeout}s.")
+        except RuntimeError:
+            await self.stop()
+            raise RuntimeError(f"Server {self.name} failed to start. {self._exit_status()}")
+
+        self._write({"jsonrpc": "2.0", "method": "notifications/initialized"})
+        await self._writer.drain()
+
+        self.server_info = result.get("serverInfo", {})
+        self.handshake_ms = round((time.perf_counter() - start_time) * 1000, 2)
+
+        if self.ready_tool:
+            try:
+                await self._wait_for_warm_up(start_time + self.startup_timeout)
+            except (RuntimeError, asyncio.TimeoutError) as e:
+                await self.stop()
+                raise RuntimeError(f"Server {self.name} did not warm up: {e}")
+
+        self.boot_time_ms = round((time.perf_counter() - start_time) * 1000, 2)
+        self.ready = True
+        print(f"[MCP Client] {self.name} ready in {self.boot_time_ms} ms ({self.server_info.get('name', 'unknown server')})", file=sys.stderr)
+
+    async def _wait_for_warm_up(self, deadline):
+        """Polls the server's ready_tool until it reports ready, failed, or the deadline passes."""
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                raise RuntimeError(f"not warm within {self.startup_timeout}s")
+            result = await self.call_tool(self.ready_tool, {}, timeout=remaining)
+            self.warm_up_status = loads(result['content'][0]['text'])
+            if self.warm_up_status.get("ready"):
+                return
+            if self.warm_up_status.get("error"):
+                raise RuntimeError(self.warm_up_status["error"])
+            await asyncio.sleep(WARM_UP_POLL_S)
+
+    def status(self):
+        return {
+            "name": self.name,
+            "pid": self.process.pid if self.process else None,
+            "ready": self.ready and self.is_alive,
+            "in_flight": self.in_flight,
+            "handshake_ms": self.handshake_ms,
+            "boot_time_ms": self.boot_time_ms,
+            "warm_up": self.warm_up_status
+        }
+
+    async def _read_loop(self):
+        """Reads every line the server writes and resolves the matching pending call."""
+        try:
+            while True:
+                line = await self._reader.readline()
+                if not line:
+                    break
+
+                try:
+                    data = loads(line)
+                except json.JSONDecodeError:
+                    continue # Ignore non-JSON log lines
+                if not isinstance(data, dict) or "id" not in data:
+                    continue # Notifications from the server
+
+                self.last_response_at = time.monotonic()
+                future = self._pending.pop(data["id"], None)
+                if future is None or future.done():
+                    continue # Caller already timed out or was cancelled
+
+                if "error" in data:
+                    future.set_exception(RuntimeError(f"Tool error: {data['error']}"))
+                else:
+                    future.set_result(data.get("result", {}))
+        except (asyncio.IncompleteReadError, ValueError) as e:
+            print(f"[MCP Client] Reader stopped: {e}", file=sys.stderr)
+        finally:
+            self._fail_pending(RuntimeError("Server closed connection."))
+
+    def _fail_pending(self, error):
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
+
+    def _write(self, message):
+        # A single write() call per line, so concurrent callers never interleave
+        self._writer.write(dumps_bytes(message) + b"\n")
+
+    async def request(self, method, params, timeout=None):
+        """
+        Sends a JSON-RPC request and waits for its response.
+        Docs: https://www.jsonrpc.org/specification
+        On timeout or cancellation the server is told to drop the request.
+        """
+        if self._writer is None:
+            await self.start()
+        if not self.is_alive:
+            raise RuntimeError("Server disconnected.")
+
+        self.request_id += 1
+        current_id = self.request_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[current_id] = future
+
+        req = {
+            "jsonrpc": "2.0",
+            "method": method,
+            "params": params,
+            "id": current_id
+        }
+
+        try:
+            self._write(req)
+            await self._writer.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            self._pending.pop(current_id, None)
+            raise RuntimeError("Server disconnected.")
+
+        try:
+            return await asyncio.wait_for(future, timeout or self.default_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            self._pending.pop(current_id, None)
+            reason = "timeout" if isinstance(e, asyncio.TimeoutError) else "cancelled"
+            self._notify_cancelled(current_id, reason)
+            raise
+
+    def _notify_cancelled(self, request_id, reason):
+        """Best-effort MCP cancellation notice, so the server can skip abandoned work."""
+        try:
+            self._write({
+                "jsonrpc": "2.0",
+                "method": "notifications/cancelled",
+                "params": {"requestId": request_id, "reason": reason}
+            })
+        except (BrokenPipeError, ConnectionResetError, RuntimeError):
+            pass
+
+    async def call_tool(self, tool_name, arguments, timeout=None):
+        """
+        Executes a tool on the server ('tools/call').
+        Result is in 'result' -> 'content' -> list, as per the MCP spec.
+        The current trace_id travels in params._meta, and the spans the server
+        reports back in the result _meta are joined into the current trace.
+        """
+        params = {"name": tool_name, "arguments": arguments}
+        trace_id = current_trace_id()
+        if trace_id:
+            params["_meta"] = {"trace_id": trace_id}
+
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await self.request("tools/call", params, timeout=timeout)
+            outcome = "ok"
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            raise
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            TOOL_CALLS.inc(server=self.server, replica=self.name, tool=tool_name, outcome=outcome)
+            TOOL_LATENCY.observe(elapsed_ms / 1000, server=self.server, replica=self.name, tool=tool_name)
+
+        record_span("mcp.call", start, elapsed_ms, tool=tool_name, replica=self.name)
+        server_spans = (result.get("_meta") or {}).get("spans")
+        if server_spans:
+            add_remote_spans(server_spans, start, replica=self.name)
+            # Whatever the server did not spend in the tool went to the pipes and queues
+            server_ms = max(span["duration_ms"] for span in server_spans)
+            record_span("mcp.transport", start, max(elapsed_ms - server_ms, 0.0), tool=tool_name, replica=self.name)
+        return result
+
+    async def stop(self):
+        self.ready = False
+        await self._disconnect()
+        if self._reader_task:
+            await self._reader_task
+
+
+class UnixSocketMCPClient(SimpleMCPClient):
+    """
+    MCP client for a server pool hosted by the agent daemon (src/agent_daemon.py),
+    over a Unix-domain socket instead of a subprocess' pipes. The initialize
+    request names the pool (params._meta.server) the connection is bound to.
+    """
+    def __init__(self, path, server, **kwargs):
+        super().__init__(None, [], server=server, **kwargs)
+        self.path = path
+
+    async def _connect(self):
+        # The daemon may still be booting (e.g. a sidecar started next to the API): retry until the startup timeout
+        deadline = time.perf_counter() + self.startup_timeout
+        while True:
+            try:
+                return await asyncio.open_unix_connection(self.path, limit=MAX_LINE_BYTES)
+            except (FileNotFoundError, ConnectionRefusedError) as e:
+                if time.perf_counter() >= deadline:
+                    raise RuntimeError(f"Agent daemon not reachable at {self.path}: {e}")
+                await asyncio.sleep(CONNECT_RETRY_S)
+
+    def _connected(self):
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def _disconnect(self):
+        if self._writer is not None and not self._writer.is_closing():
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+    def _exit_status(self):
+        return f"Connection to {self.path} closed."
+
+    def _initialize_params(self):
+        return dict(super()._initialize_params(), _meta={"server": self.server})
+
+
+class MCPServerPool:
+    """
+    A pool of identical MCP server processes, used like a single client.
+    Calls go to the least-loaded healthy replica. A monitor task respawns dead
+    or hung replicas and grows or shrinks the pool between min_size and
+    max_size based on the number of in-flight calls per replica.
+    """
+    def __init__(self, name, command, args, cwd=None, env=None, min_size=1, max_size=None,
+                 scale_up_load=4, health_interval=5.0, health_timeout=10.0, max_failed_checks=2,
+                 idle_checks_before_shrink=6, startup_timeout=120.0, ready_tool=None, snapshot_tools=None):
+        self.name = name
+        self.command = command
+        self.args = args
+        self.cwd = cwd
+        self.env = env
+        self.min_size = max(1, min_size)
+        self.max_size = max(self.min_size, max_size or self.min_size)
+        self.scale_up_load = scale_up_load
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self.max_failed_checks = max_failed_checks
+        self.idle_checks_before_shrink = idle_checks_before_shrink
+        self.startup_timeout = startup_timeout
+        self.ready_tool = ready_tool
+
+        self.replicas = []
+        self.restarts = 0
+        # Replaced replicas still shutting down
+        self._stopping = set()
+        self._next_replica = 0
+        self._failed_checks = {}
+        self._idle_checks = 0
+        self._scaling = False
+        self._monitor_task = None
+        # Broadcast calls that change server state, replayed on every new replica. Past
+        # REPLAY_LOG_MAX entries the log is compacted: snapshot_tools = (export tool, restore
+        # tool), the export's payload being the restore's arguments
+        self.snapshot_tools = snapshot_tools
+        self._replay_base = None
+        self._replay_log = []
+        # Held by replayed broadcasts and by replicas catching up, so none misses a broadcast
+        self._replay_lock = asyncio.Lock()
+
+    @property
+    def in_flight(self):
+        return sum(replica.in_flight for replica in self.replicas)
+
+    def _new_client(self):
+        self._next_replica += 1
+        return SimpleMCPClient(
+            self.command, self.args, cwd=self.cwd, env=self.env,
+            name=f"{self.name}-{self._next_replica}",
+            startup_timeout=self.startup_timeout,
+            ready_tool=self.ready_tool,
+            server=self.name
+        )
+
+    async def _spawn(self):
+        client = self._new_client()
+        await client.start()
+        # Catch up on state-changing broadcasts before taking traffic; broadcasts wait
+        # until this replica has joined, so it cannot miss one
+        try:
+            async with self._replay_lock:
+                entries = ([self._replay_base] if self._replay_base else []) + self._replay_log
+                for tool_name, arguments in entries:
+                    if not _succeeded(await client.call_tool(tool_name, arguments)):
+                        raise RuntimeError(f"{client.name} failed to replay {tool_name}")
+                self.replicas.append(client)
+        except BaseException:
+            await client.stop()
+            raise
+        return client
+
+    @property
+    def ready(self):
+        return any(replica.ready and replica.is_alive for replica in self.replicas)
+
+    def status(self):
+        return {
+            "ready": self.ready,
+            "restarts": self.restarts,
+            "replicas": [replica.status() for replica in self.replicas]
+        }
+
+    async def start(self):
+        """Boots min_size replicas in parallel; the monitor keeps retrying any that failed."""
+        results = await asyncio.gather(*(self._spawn() for _ in range(self.min_size)), return_exceptions=True)
+        self._monitor_task = asyncio.create_task(self._monitor())
+        errors = [result for result in results if isinstance(result, Exception)]
+        for error in errors:
+            print(f"[MCP Pool] {self.name} replica failed to start: {error}", file=sys.stderr)
+        if not self.replicas:
+            raise errors[0]
+
+    async def stop(self):
+        if self._monitor_task:
+            self._monitor_task.cancel()
+            try:
+                await self._monitor_task
+            except asyncio.CancelledError:
+                pass
+        replicas, self.replicas = self.replicas, []
+        await asyncio.gather(*(replica.stop() for replica in replicas), *self._stopping, return_exceptions=True)
+
+    def _pick(self):
+        healthy = [replica for replica in self.replicas if replica.is_alive]
+        if not healthy:
+            raise RuntimeError(f"No healthy {self.name} server available.")
+        return min(healthy, key=lambda replica: replica.in_flight)
+
+    def _route(self):
+        replica = self._pick()
+        if replica.in_flight >= self.scale_up_load:
+            # Even the least-loaded replica is busy: grow now rather than at the next check
+            self._schedule_scale_up()
+        return replica
+
+    async def request(self, method, params, timeout=None):
+        return await self._route().request(method, params, timeout=timeout)
+
+    async def call_tool(self, tool_name, arguments, timeout=None):
+        return await self._route().call_tool(tool_name, arguments, timeout=timeout)
+
+    async def call_all(self, tool_name, arguments, timeout=None, replay=False):
+        """
+        Calls a tool on every live replica concurrently (e.g. to apply a write to
+        each replica's in-memory state) and returns their results.
+        With replay=True the call is a replicated write, kept all or nothing across
+        the pool: once a replica applied it, it is logged (and replayed on replicas
+        started later), and every replica that failed it is replaced by one caught up
+        from the log. If no replica applied it, nothing is logged and the replicas that
+        raised (and may have half-applied it) are replaced. Such writes must be
+        idempotent, so a client retrying after an error is harmless.
+        Returns the results of the replicas that applied the write, or all the
+        results if every replica rejected it.
+        """
+        if not replay:
+            return await self._broadcast(tool_name, arguments, timeout)
+        async with self._replay_lock:
+            replicas = self._live_replicas()
+            results = await asyncio.gather(*(
+                replica.call_tool(tool_name, arguments, timeout=timeout) for replica in replicas
+            ), return_exceptions=True)
+            applied = [not isinstance(result, BaseException) and _succeeded(result) for result in results]
+            if any(applied):
+                failed = [replica for replica, ok in zip(replicas, applied) if not ok]
+                self._replay_log.append((tool_name, arguments))
+                if len(self._replay_log) > REPLAY_LOG_MAX and self.snapshot_tools:
+                    await self._compact_replay_log()
+            else:
+                failed = [replica for replica, result in zip(replicas, results) if isinstance(result, BaseException)]
+            # Out of rotation before the lock is released, so no call reaches a replica
+            # whose state disagrees with the log
+            for replica in failed:
+                if replica in self.replicas:
+                    self.replicas.remove(replica)
+        if failed:
+            replaced = await asyncio.gather(*(
+                self._replace(replica, f"failed to apply {tool_name}") for replica in failed
+            ), return_exceptions=True)
+            for error in replaced:
+                if isinstance(error, Exception):
+                    # The monitor tops the pool back up to min_size
+                    print(f"[MCP Pool] Could not replace a {self.name} replica: {error}", file=sys.stderr)
+        if any(applied):
+            return [result for result, ok in zip(results, applied) if ok]
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            raise errors[0]
+        return results
+
+    def _live_replicas(self):
+        replicas = [replica for replica in self.replicas if replica.is_alive]
+        if not replicas:
+            raise RuntimeError(f"No healthy {self.name} server available.")
+        return replicas
+
+    async def _broadcast(self, tool_name, arguments, timeout):
+        return await asyncio.gather(*(
+            replica.call_tool(tool_name, arguments, timeout=timeout) for replica in self._live_replicas()
+        ))
+
+    async def _compact_replay_log(self):
+        """
+        Replaces the snapshot and log with one snapshot of a live replica's state; the
+        caller holds the replay lock, so that state covers exactly the logged broadcasts.
+        """
+        export_tool, restore_tool = self.snapshot_tools
+        try:
+            result = await self._pick().call_tool(export_tool, {})
+            snapshot = loads(result['content'][0]['text'])
+        except Exception as e:
+            print(f"[MCP Pool] Could not compact the {self.name} replay log: {e}", file=sys.stderr)
+            return
+        if snapshot.pop("status", None) != "SUCCESS":
+            print(f"[MCP Pool] Could not compact the {self.name} replay log: {snapshot.get('message')}", file=sys.stderr)
+            return
+        self._replay_base = (restore_tool, snapshot)
+        self._replay_log = []
+
+    def _schedule_scale_up(self):
+        if self._scaling or len(self.replicas) >= self.max_size:
+            return
+        self._scaling = True
+        asyncio.create_task(self._scale_up())
+
+    async def _scale_up(self):
+        try:
+            client = await self._spawn()
+            print(f"[MCP Pool] Scaled {self.name} up to {len(self.replicas)} replicas ({client.name})", file=sys.stderr)
+        except Exception as e:
+            print(f"[MCP Pool] Could not add a {self.name} replica: {e}", file=sys.stderr)
+        finally:
+            self._scaling = False
+
+    async def _replace(self, replica, reason):
+        print(f"[MCP Pool] Restarting {replica.name}: {reason}", file=sys.stderr)
+        if replica in self.replicas:
+            self.replicas.remove(replica)
+        self._failed_checks.pop(replica.name, None)
+        self.restarts += 1
+        # Shutting down a hung replica can take STOP_TIMEOUT_S: its successor boots meanwhile
+        task = asyncio.create_task(replica.stop())
+        self._stopping.add(task)
+        task.add_done_callback(self._stopping.discard)
+        if len(self.replicas) < self.min_size:
+            await self._spawn()
+
+    async def _is_responsive(self, replica):
+        """A replica that answered recently is healthy; otherwise it must answer a ping in time."""
+        if time.monotonic() - replica.last_response_at < self.health_interval:
+            return True
+        try:
+            await replica.request("ping", {}, timeout=self.health_timeout)
+        except asyncio.TimeoutError:
+            return False
+        except RuntimeError:
+            # An error reply still proves the process is serving requests
+            return replica.is_alive
+        return True
+
+    async def _check_health(self):
+        await asyncio.gather(*(
+            self._replace(replica, "process exited") for replica in self.replicas if not replica.is_alive
+        ))
+        while len(self.replicas) < self.min_size:
+            await self._spawn()
+
+        replicas = list(self.replicas)
+        responsive = await asyncio.gather(*(self._is_responsive(replica) for replica in replicas))
+        replacements = []
+        for replica, ok in zip(replicas, responsive):
+            if ok:
+                self._failed_checks.pop(replica.name, None)
+                continue
+            failures = self._failed_checks.get(replica.name, 0) + 1
+            self._failed_checks[replica.name] = failures
+            if failures >= self.max_failed_checks:
+                replacements.append(self._replace(replica, f"no answer to {failures} health checks"))
+        # Replacements run side by side, so one slow boot does not hold up the others
+        await asyncio.gather(*replacements)
+
+    async def _autoscale(self):
+        if not self.replicas:
+            return
+        load = self.in_flight / len(self.replicas)
+        if load >= self.scale_up_load:
+            self._idle_checks = 0
+            self._schedule_scale_up()
+        elif self.in_flight == 0 and len(self.replicas) > self.min_size:
+            self._idle_checks += 1
+            if self._idle_checks >= self.idle_checks_before_shrink:
+                self._idle_checks = 0
+                replica = self.replicas.pop()
+                print(f"[MCP Pool] Scaled {self.name} down to {len(self.replicas)} replicas", file=sys.stderr)
+                await replica.stop()
+        else:
+            self._idle_checks = 0
+
+    async def _monitor(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            try:
+                await self._check_health()
+                await self._autoscale()
+            except Exception as e:
+                print(f"[MCP Pool] {self.name} monitor error: {e}", file=sys.stderr)
+
+
+class AgentDaemonPool(MCPServerPool):
+    """
+    Used like an MCPServerPool, but the server replicas run in the shared agent
+    daemon: this pool only keeps `connections` Unix socket connections to it
+    (least-loaded routing, reconnected by the monitor). Broadcasts and status go
+    to the daemon, which owns the replicas and their replay log.
+    """
+    def __init__(self, name, path, connections=4, startup_timeout=120.0, **kwargs):
+        super().__init__(
+            name, None, [], min_size=connections, max_size=connections, startup_timeout=startup_timeout, **kwargs
+        )
+        self.path = path
+        self.daemon_status = {}
+
+    def _new_client(self):
+        self._next_replica += 1
+        return UnixSocketMCPClient(
+            self.path, self.name,
+            name=f"{self.name}-conn-{self._next_replica}",
+            startup_timeout=self.startup_timeout
+        )
+
+    @property
+    def ready(self):
+        return super().ready and self.daemon_status.get("ready", False)
+
+    def status(self):
+        # The daemon's replicas, as reported at the last health check (none while it is
+        # booting or unreachable), plus this worker's connections
+        return {
+            "ready": self.ready,
+            "restarts": self.daemon_status.get("restarts", 0),
+            "replicas": self.daemon_status.get("replicas", []),
+            "daemon": self.path,
+            "connections": [connection.status() for connection in self.replicas]
+        }
+
+    async def refresh_status(self):
+        try:
+            self.daemon_status = await self.request("sentinel/status", {}, timeout=self.health_timeout)
+        except BaseException:
+            # Do not keep reporting the replicas of a daemon that stopped answering
+            self.daemon_status = {}
+            raise
+
+    async def start(self):
+        await super().start()
+        await self.refresh_status()
+
+    async def _check_health(self):
+        await super()._check_health()
+        await self.refresh_status()
+
+    async def call_all(self, tool_name, arguments, timeout=None, replay=False):
+        """Has the daemon call the tool on each of its replicas; returns their results."""
+        result = await self.request(
+            "sentinel/call_all", {"name": tool_name, "arguments": arguments, "replay": replay}, timeout=timeout
+        )
+        return result["results"]
@@ -0,0 +1,318 @@
+import bisect
+import json
+import os
+import threading
+import time
+
+# Latency buckets (seconds): sub-millisecond cache hits up to multi-second model calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Directory shared by the API workers (uvicorn --workers N). Each worker writes its samples
+# there and /metrics merges them, so a scrape covers every worker whichever one answers it.
+# Empty it before the workers start. Unset: /metrics reports this process only.
+MULTIPROCESS_DIR = os.environ.get("SENTINEL_METRICS_DIR")
+# How often each worker writes its samples to MULTIPROCESS_DIR
+MULTIPROCESS_FLUSH_S = float(os.environ.get("SENTINEL_METRICS_FLUSH_S", "1"))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class Registry:
+    """
+    Holds metrics and renders them in the Prometheus text exposition format.
+    With a multiprocess_dir, each process writes its samples to <dir>/<pid>-<start>.json
+    (write_snapshot, called periodically) and render() merges the files of every process.
+    The start token keeps a new process that reuses a dead worker's pid from overwriting
+    the dead worker's file.
+    """
+    def __init__(self, multiprocess_dir=None):
+        self.multiprocess_dir = multiprocess_dir
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self._start = None # (pid, time_ns) of the first snapshot, redone in a forked child
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric '{metric.name}' is already registered.")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def _snapshot_path(self):
+        pid = os.getpid()
+        if self._start is None or self._start[0] != pid:
+            self._start = (pid, time.time_ns())
+        return os.path.join(self.multiprocess_dir, f"{pid}-{self._start[1]}.json")
+
+    def write_snapshot(self):
+        """Writes this process' samples for the other workers to merge (atomic rename)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        snapshot = {metric.name: metric.snapshot() for metric in metrics}
+        os.makedirs(self.multiprocess_dir, exist_ok=True)
+        path = self._snapshot_path()
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(snapshot, f)
+        os.replace(temp_path, path)
+
+    def _read_snapshots(self):
+        """[(pid, alive, {metric name: [[label values, value], ...]})] for every process that wrote samples."""
+        self.write_snapshot()
+        files = []
+        for filename in os.listdir(self.multiprocess_dir):
+            if not filename.endswith(".json"):
+                continue
+            try:
+                pid, start = (int(part) for part in filename[:-len(".json")].split("-"))
+                with open(os.path.join(self.multiprocess_dir, filename)) as f:
+                    files.append((pid, start, json.load(f)))
+            except (OSError, ValueError):
+                continue # Not a worker's file, or removed while we read
+        # Only the latest process with a given pid can still be running
+        latest = {}
+        for pid, start, _ in files:
+            latest[pid] = max(start, latest.get(pid, start))
+        return [(pid, start == latest[pid] and _pid_alive(pid), values) for pid, start, values in files]
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        snapshots = self._read_snapshots() if self.multiprocess_dir else None
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            if snapshots is None:
+                lines.extend(metric.samples())
+            else:
+                lines.extend(metric.samples(*metric.merge(snapshots)))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry(MULTIPROCESS_DIR)
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+    @staticmethod
+    def _add(total, value):
+        return value if total is None else total + value
+
+    def merge(self, snapshots):
+        """
+        Sums this metric across the processes' snapshots, dead processes included,
+        so counters never go backwards. Returns (values, labelnames) for samples().
+        """
+        merged = {}
+        for _, _, values in snapshots:
+            for key, value in values.get(self.name, []):
+                key = tuple(key)
+                merged[key] = self._add(merged.get(key), value)
+        return list(merged.items()), self.labelnames
+
+    def _items(self, values):
+        if values is not None:
+            return values
+        with self._lock:
+            return list(self._values.items())
+
+
+class Counter(_Metric):
+    """Monotonically increasing count per label set."""
+    type = "counter"
+
+    def inc(self, amount=1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self, values=None, labelnames=None):
+        labelnames = labelnames or self.labelnames
+        return [f"{self.name}{_format_labels(labelnames, key)} {_format_value(value)}" for key, value in self._items(values)]
+
+
+class Gauge(_Metric):
+    """
+    Current value per label set, e.g. calls in flight on a replica.
+    Merged across processes, each live worker keeps its own series (worker=<pid> label).
+    """
+    type = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount=1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount=1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0.0)
+
+    def merge(self, snapshots):
+        # A gauge is a point-in-time value: summing workers is rarely right, and a dead worker's is gone
+        merged = [
+            (tuple(key) + (str(pid),), value)
+            for pid, alive, values in snapshots if alive
+            for key, value in values.get(self.name, [])
+        ]
+        return merged, self.labelnames + ("worker",)
+
+    def samples(self, values=None, labelnames=None):
+        labelnames = labelnames or self.labelnames
+        return [f"{self.name}{_format_labels(labelnames, key)} {_format_value(value)}" for key, value in self._items(values)]
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values per label set: cumulative bucket counts,
+    sum and count, so Prometheus can derive percentiles and averages.
+    """
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (non-cumulative) counts, the +Inf bucket last, then sum
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+
+    def count(self, **labels):
+        state = self._values.get(self._key(labels))
+        return sum(state[:-1]) if state else 0
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(key), list(state)] for key, state in self._values.items()]
+
+    @staticmethod
+    def _add(total, state):
+        return list(state) if total is None else [a + b for a, b in zip(total, state)]
+
+    def samples(self, values=None, labelnames=None):
+        labelnames = labelnames or self.labelnames
+        if values is None:
+            with self._lock:
+                values = [(key, list(state)) for key, state in self._values.items()]
+        lines = []
+        for key, state in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), state[:-1]):
+                cumulative += bucket_count
+                le = (("le", _format_value(bound)),)
+                lines.append(f"{self.name}_bucket{_format_labels(labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labelnames, key)} {_format_value(state[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(labelnames, key)} {cumulative}")
+        return lines
+
+
+def render():
+    return REGISTRY.render()
+
+
+# --- Sentinel metrics (served by the API on /metrics) ---
+
+HTTP_REQUESTS = Counter(
+    "sentinel_http_requests_total", "HTTP requests handled by the API.", ["route", "status"]
+)
+HTTP_LATENCY = Histogram(
+    "sentinel_http_request_duration_seconds", "End-to-end API request latency.", ["route"]
+)
+STAGE_LATENCY = Histogram(
+    "sentinel_stage_duration_seconds",
+    "Time spent per pipeline stage, supervisor and server side (intent detection, embedding, vector search...).",
+    ["stage"]
+)
+TOOL_CALLS = Counter(
+    "sentinel_mcp_tool_calls_total", "MCP tool calls per server replica and outcome.",
+    ["server", "replica", "tool", "outcome"]
+)
+TOOL_LATENCY = Histogram(
+    "sentinel_mcp_tool_call_duration_seconds", "MCP tool call round trip, as seen by the supervisor.",
+    ["server", "replica", "tool"]
+)
+RESPONSE_CACHE_LOOKUPS = Counter(
+    "sentinel_response_cache_lookups_total",
+    "/analyze response cache lookups: hit, miss, or coalesced onto an identical request in flight.", ["result"]
+)
+REPLICA_IN_FLIGHT = Gauge(
+    "sentinel_mcp_replica_in_flight", "Calls waiting for an answer, per server replica.", ["server", "replica"]
+)
+REPLICA_READY = Gauge(
+    "sentinel_mcp_replica_ready", "1 when the server replica is ready and alive.", ["server", "replica"]
+)
+AGENT_QUEUE_DEPTH = Gauge(
+    "sentinel_agent_queue_depth", "Agent calls admitted and waiting for a concurrency slot.", ["agent"]
+)
+AGENT_CALLS_RUNNING = Gauge(
+    "sentinel_agent_calls_running", "Agent calls holding a concurrency slot.", ["agent"]
+)
+AGENT_CALLS_SHED = Counter(
+    "sentinel_agent_calls_shed_total",
+    "Agent calls shed by admission control: queue_full (rejected with 503) or deadline (expired while queued).",
+    ["agent", "reason"]
+)
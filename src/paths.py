@@ -0,0 +1,7 @@
+import os
+
+# Resolve data and cache locations relative to the repository, overridable per deployment
+# (the Dockerfile sets SENTINEL_CACHE_DIR=/app/cache).
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.environ.get("SENTINEL_DATA_DIR", os.path.join(PROJECT_ROOT, "data"))
+CACHE_DIR = os.environ.get("SENTINEL_CACHE_DIR", os.path.join(PROJECT_ROOT, "cache"))
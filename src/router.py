@@ -0,0 +1,145 @@
+import inspect
+import os
+import re
+import sys
+
+from src.cache import TTLCache
+
+# Keywords per intent; each entry is a regex fragment matched on whole words,
+# so common inflections count ("bills", "invoiced") but "cute" is not "cut"
+INTENT_KEYWORDS = {
+    "billing": [
+        r"bill(?:s|ed|ing)?", r"invoic(?:e|es|ed|ing)", r"costs?", r"expensive", r"euros?", r"€",
+    ],
+    "tech": [
+        r"internet", r"slow(?:er|ly|ness)?", r"wi-?fi", r"connections?", r"cut(?:s|ting)?",
+        r"lights?", r"box(?:es)?",
+    ],
+}
+
+# Phrases describing each intent, embedded once when the Tech Agent warms up;
+# queries without any keyword are compared to them (cosine similarity)
+INTENT_EXEMPLARS = {
+    "billing": [
+        "Why is my bill so high this month?",
+        "I was charged too much on my invoice",
+        "How much do I have to pay for my subscription?",
+        "There is a payment I do not recognize on my account",
+        "I want a refund, the amount is wrong",
+    ],
+    "tech": [
+        "My internet connection is not working",
+        "The network keeps dropping all the time",
+        "My TV decoder picture is frozen",
+        "Web pages take forever to load",
+        "The modem does not turn on",
+    ],
+}
+
+# Minimum similarity to an intent's closest exemplar for the semantic fallback to pick it
+INTENT_SIMILARITY_THRESHOLD = float(os.environ.get("SENTINEL_INTENT_THRESHOLD", "0.5"))
+# Fallback results are cached per normalized query (LRU, 0 disables)
+INTENT_CACHE_SIZE = int(os.environ.get("SENTINEL_INTENT_CACHE_SIZE", "4096"))
+
+NO_INTENT_MESSAGE = "I'm sorry, I didn't understand your request. Please mention 'bill' or 'internet'."
+
+
+def _compile(keywords):
+    """
+    One alternation with a named group per intent, scanned in a single pass.
+    Word keywords are wrapped in lookarounds instead of \\b, so symbols such as
+    '€' match right next to a number ("50€").
+    """
+    groups = []
+    for intent, fragments in keywords.items():
+        alternatives = [
+            rf"(?<!\w)(?:{fragment})(?!\w)" if re.match(r"\w", fragment) else fragment
+            for fragment in fragments
+        ]
+        groups.append(f"(?P<{intent}>{'|'.join(alternatives)})")
+    return re.compile("|".join(groups), re.IGNORECASE)
+
+
+_KEYWORD_PATTERN = _compile(INTENT_KEYWORDS)
+
+
+def normalize_query(query):
+    """Lowercases and strips punctuation/extra spaces, so trivial variants share a cache entry."""
+    return " ".join(re.findall(r"\w+", query.lower()))
+
+
+def match_keywords(query):
+    """Returns the intents whose keywords appear in the query, in INTENT_KEYWORDS order."""
+    found = {match.lastgroup for match in _KEYWORD_PATTERN.finditer(query)}
+    return tuple(intent for intent in INTENT_KEYWORDS if intent in found)
+
+
+class IntentRouter:
+    """
+    Decides which agents a query needs.
+    Keywords are matched first (one precompiled regex). Only when none matches,
+    an optional classifier scores the query against the intent exemplars; its
+    answers are cached per normalized query.
+
+    classifier(query) returns {intent: similarity}, directly or as an awaitable.
+    """
+    def __init__(self, classifier=None, threshold=INTENT_SIMILARITY_THRESHOLD, cache_size=INTENT_CACHE_SIZE):
+        self.classifier = classifier
+        self.threshold = threshold
+        self.cache = TTLCache(maxsize=cache_size)
+
+    def _pick(self, scores):
+        return tuple(intent for intent in INTENT_KEYWORDS if scores.get(intent, 0.0) >= self.threshold)
+
+    def _match(self, query):
+        """
+        The steps shared by route() and route_async() before the classifier runs.
+        Returns (intents, None) when keywords or the cache answer, or (None, cache key)
+        when the classifier has to score the query.
+        """
+        intents = match_keywords(query)
+        if intents or self.classifier is None:
+            return intents, None
+
+        key = normalize_query(query)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached, None
+        return None, key
+
+    def _cache_fallback(self, key, scores):
+        intents = self._pick(scores)
+        self.cache.set(key, intents)
+        return intents
+
+    @staticmethod
+    def _fallback_failed(error):
+        # No answer (e.g. the Tech Agent is still warming up): treat as unknown, do not cache
+        print(f"[Router] Semantic fallback failed: {error}", file=sys.stderr)
+        return ()
+
+    def route(self, query):
+        """Intents of the query, for synchronous classifiers."""
+        intents, key = self._match(query)
+        if key is None:
+            return intents
+        try:
+            return self._cache_fallback(key, self.classifier(query))
+        except Exception as e:
+            return self._fallback_failed(e)
+
+    async def route_async(self, query):
+        """Intents of the query; the classifier may be a coroutine function."""
+        intents, key = self._match(query)
+        if key is None:
+            return intents
+        try:
+            scores = self.classifier(query)
+            if inspect.isawaitable(scores):
+                scores = await scores
+            return self._cache_fallback(key, scores)
+        except Exception as e:
+            return self._fallback_failed(e)
+
+    def stats(self):
+        return self.cache.stats()
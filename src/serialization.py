@@ -0,0 +1,80 @@
+import json
+import os
+
+# 'auto' uses orjson when it is installed, 'orjson' requires it, 'json' forces the standard library
+JSON_BACKEND = os.environ.get("SENTINEL_JSON_BACKEND", "auto")
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if JSON_BACKEND == "orjson" and orjson is None:
+    raise ImportError("SENTINEL_JSON_BACKEND=orjson but orjson is not installed (pip install orjson).")
+USE_ORJSON = orjson is not None and JSON_BACKEND != "json"
+BACKEND = "orjson" if USE_ORJSON else "json"
+
+
+def _std_dumps(obj):
+    # No indentation and no spaces after separators: every byte crosses the MCP pipe
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+
+if USE_ORJSON:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps_bytes(obj):
+        """Compact UTF-8 JSON."""
+        try:
+            return orjson.dumps(obj, option=_ORJSON_OPTIONS)
+        except TypeError:
+            # Types orjson refuses (e.g. non-string dict keys, big ints) still work with the stdlib
+            return _std_dumps(obj).encode("utf-8")
+
+    def dumps(obj):
+        """Compact JSON text."""
+        return dumps_bytes(obj).decode("utf-8")
+
+    def loads(data):
+        """Parses JSON from str or bytes."""
+        return orjson.loads(data)
+else:
+    def dumps_bytes(obj):
+        """Compact UTF-8 JSON."""
+        return _std_dumps(obj).encode("utf-8")
+
+    def dumps(obj):
+        """Compact JSON text."""
+        return _std_dumps(obj)
+
+    def loads(data):
+        """Parses JSON from str or bytes."""
+        return json.loads(data)
+
+
+def frame_to_columns(df, exclude=()):
+    """
+    Columnar encoding of a DataFrame: {column: [values]}. Each column name is
+    written once instead of once per row, and dates become "YYYY-MM-DD" strings.
+    """
+    columns = {}
+    for name in df.columns:
+        if name in exclude:
+            continue
+        values = df[name].to_numpy()
+        if values.dtype.kind == "M":
+            # NumPy's day-precision string cast is far cheaper than strftime
+            values = values.astype("datetime64[D]").astype(str)
+        columns[name] = values.tolist()
+    return columns
+
+
+def columns_to_frame(columns, parse_dates=("date",)):
+    """Rebuilds the DataFrame encoded by frame_to_columns."""
+    import pandas as pd
+
+    df = pd.DataFrame(columns)
+    for name in parse_dates:
+        if name in df.columns:
+            df[name] = pd.to_datetime(df[name])
+    return df
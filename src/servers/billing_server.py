@@ -1,6 +1,10 @@
+import os
+
 from mcp.server.fastmcp import FastMCP
 from src.billing_agent import BillingAgent
-import json
+from src.cache import TTLCache
+from src.serialization import dumps, frame_to_columns
+from src.tracing import traced_tool
 
 # Create the MCP Server
 mcp = FastMCP("Sentinel Billing Service")
@@ -8,28 +12,146 @@ mcp = FastMCP("Sentinel Billing Service")
 # Initialize the agent logic (reusing our existing robust class)
 agent = BillingAgent()
 
+# Results per (tool, customer_id, data_version): bills only change through ingestion, which
+# bumps data_version, so an entry can never be stale. Size 0 disables the cache.
+RESULT_CACHE_SIZE = int(os.environ.get("SENTINEL_BILLING_CACHE_SIZE", "10000"))
+result_cache = TTLCache(maxsize=RESULT_CACHE_SIZE)
+
+def _cached(tool, customer_id, compute):
+    # Read the version before computing: a result computed during an ingestion is then
+    # filed under the older version, which no later lookup uses
+    key = (tool, customer_id, agent.data_version)
+    value = result_cache.get(key)
+    if value is None:
+        value = compute()
+        result_cache.set(key, value)
+    return value
+
 @mcp.tool()
+@traced_tool(mcp)
 def get_billing_history(customer_id: str) -> str:
-    """Retrieves the billing history for a specific customer ID from the database."""
-    try:
+    """
+    Retrieves the billing history for a specific customer ID from the database.
+    Returns a JSON string with the bills in columnar form, oldest first:
+    {"columns": {"billing_id": [...], "date": ["YYYY-MM-DD", ...], "amount": [...]}}.
+    """
+    def encode():
         df = agent.get_billing_history(customer_id)
-        if df.empty:
-            return "No billing history found."
-        return df.to_string(index=False)
+        return dumps({
+            "status": "SUCCESS",
+            "customer_id": customer_id,
+            "rows": len(df),
+            "columns": frame_to_columns(df, exclude=("customer_id",))
+        })
+
+    try:
+        # Cached already encoded: the history is the biggest payload to rebuild
+        return _cached("get_billing_history", customer_id, encode)
     except Exception as e:
-        return f"Error accessing database: {str(e)}"
+        return dumps({"status": "ERROR", "message": f"Error accessing database: {str(e)}"})
 
 @mcp.tool()
+@traced_tool(mcp)
 def detect_billing_anomaly(customer_id: str) -> str:
     """
     Analyzes the customer's billing history to detect statistical anomalies (spikes).
     Returns a JSON string with the analysis result.
     """
     try:
-        result = agent.detect_billing_anomaly(customer_id)
-        return json.dumps(result, indent=2)
+        result = _cached("detect_billing_anomaly", customer_id, lambda: agent.detect_billing_anomaly(customer_id))
+        return dumps(result)
+    except Exception as e:
+        return dumps({"status": "ERROR", "message": str(e)})
+
+@mcp.tool()
+@traced_tool(mcp)
+def detect_billing_anomalies_bulk(customer_ids: list[str]) -> str:
+    """
+    Runs detect_billing_anomaly for many customers in one call.
+    Returns a JSON string with one result per customer id, in the same order.
+    """
+    try:
+        # Shares the detect_billing_anomaly cache entries; only the misses are analyzed
+        version = agent.data_version
+        results = [result_cache.get(("detect_billing_anomaly", customer_id, version)) for customer_id in customer_ids]
+        missing = list(dict.fromkeys(
+            customer_id for customer_id, result in zip(customer_ids, results) if result is None
+        ))
+        if missing:
+            computed = dict(zip(missing, agent.detect_billing_anomalies_bulk(missing)))
+            for customer_id, result in computed.items():
+                result_cache.set(("detect_billing_anomaly", customer_id, version), result)
+            results = [computed[customer_id] if result is None else result for customer_id, result in zip(customer_ids, results)]
+        return dumps({"status": "SUCCESS", "results": results})
+    except Exception as e:
+        return dumps({"status": "ERROR", "message": str(e)})
+
+@mcp.tool()
+@traced_tool(mcp)
+def scan_billing_anomalies(threshold: float = 3.0, top_n: int | None = 100) -> str:
+    """
+    Scores every customer's latest bill against their earlier bills in one
+    vectorized pass and returns the anomalies, worst first, as a JSON string.
+    Use top_n=0 or null to return every flagged customer.
+    """
+    try:
+        result = agent.scan_billing_anomalies(threshold=threshold, top_n=top_n or None)
+        return dumps(result)
     except Exception as e:
-        return json.dumps({"status": "ERROR", "message": str(e)})
+        return dumps({"status": "ERROR", "message": str(e)})
+
+@mcp.tool()
+@traced_tool(mcp)
+def ingest_bills(records: list[dict]) -> str:
+    """
+    Appends new bills while the server runs. Each record needs customer_id,
+    date (YYYY-MM-DD) and amount; billing_id is optional. Running statistics are
+    updated in place, so anomaly checks see the new bills immediately.
+    Returns a JSON string with the ingested count and the new data_version.
+    """
+    try:
+        result = agent.ingest_bills(records)
+        # Entries of older versions can never be hit again, free them now
+        result_cache.clear()
+        return dumps(result)
+    except ValueError as e:
+        # Rejected before any bill was applied: the caller's records are at fault
+        return dumps({"status": "ERROR", "error": "INVALID_RECORDS", "message": str(e)})
+    except Exception as e:
+        return dumps({"status": "ERROR", "message": str(e)})
+
+@mcp.tool()
+@traced_tool(mcp)
+def export_ingested_bills() -> str:
+    """
+    Returns the bills ingested since startup and the data_version as a JSON string,
+    so a new replica can be brought to the same state with restore_ingested_bills.
+    """
+    try:
+        return dumps(agent.export_ingested())
+    except Exception as e:
+        return dumps({"status": "ERROR", "message": str(e)})
+
+@mcp.tool()
+@traced_tool(mcp)
+def restore_ingested_bills(records: list[dict], data_version: int) -> str:
+    """Applies an export_ingested_bills snapshot to this (freshly started) server."""
+    try:
+        result = agent.restore_ingested(records, data_version)
+        result_cache.clear()
+        return dumps(result)
+    except Exception as e:
+        return dumps({"status": "ERROR", "message": str(e)})
+
+@mcp.tool()
+def get_data_version() -> str:
+    """Returns the data_version (bumped by every ingestion) as a JSON string. Never blocks on analysis."""
+    return dumps({"data_version": agent.data_version})
+
+@mcp.tool()
+def get_cache_stats() -> str:
+    """Returns the result cache counters (size, hits, misses, evictions, hit rate) as a JSON string."""
+    return dumps(dict(result_cache.stats(), data_version=agent.data_version))
 
 if __name__ == "__main__":
     # Runs the server using Standard IO (stdin/stdout) for MCP communication
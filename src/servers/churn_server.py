@@ -0,0 +1,53 @@
+from mcp.server.fastmcp import FastMCP
+from src.churn_agent import ChurnAgent
+from src.serialization import dumps
+from src.tracing import traced_tool
+
+# Create the MCP Server
+mcp = FastMCP("Sentinel Churn Service")
+
+# Builds every customer's running usage aggregates in one pass at startup
+agent = ChurnAgent()
+
+@mcp.tool()
+@traced_tool(mcp)
+def get_churn_risk(customer_id: str) -> str:
+    """
+    Scores the customer's data usage trend (weak signals of churn).
+    Returns a JSON string with the analysis result.
+    """
+    try:
+        result = agent.get_churn_risk(customer_id)
+        return dumps(result)
+    except Exception as e:
+        return dumps({"status": "ERROR", "message": str(e)})
+
+@mcp.tool()
+@traced_tool(mcp)
+def record_usage(customer_id: str, date: str, data_usage_gb: float) -> str:
+    """
+    Adds one daily usage record (date as YYYY-MM-DD) and returns the customer's
+    updated churn assessment as a JSON string. The update does not rescan history.
+    """
+    try:
+        result = agent.record_usage(customer_id, date, data_usage_gb)
+        return dumps(result)
+    except Exception as e:
+        return dumps({"status": "ERROR", "message": str(e)})
+
+@mcp.tool()
+@traced_tool(mcp)
+def scan_churn_risks(top_n: int = 100) -> str:
+    """
+    Scores every customer's usage trend and returns the churn risks, steepest
+    decline first, as a JSON string. Use top_n=0 to return every flagged customer.
+    """
+    try:
+        result = agent.scan_churn_risks(top_n=top_n or None)
+        return dumps(result)
+    except Exception as e:
+        return dumps({"status": "ERROR", "message": str(e)})
+
+if __name__ == "__main__":
+    # Runs the server using Standard IO (stdin/stdout) for MCP communication
+    mcp.run()
@@ -1,23 +1,74 @@
+import time
+
+# Phase timings of this process' startup, so cold-start regressions show up in rollouts
+_process_start = time.perf_counter()
+
+import asyncio
+import sys
 from mcp.server.fastmcp import FastMCP
 from src.tech_agent import TechnicalAgent
+from src.serialization import dumps
+from src.tracing import traced_tool
 
 # Create the MCP Server
 mcp = FastMCP("Sentinel Technical Service")
 
 # Initialize the RAG agent
-# Note: This might take a few seconds to load models, so it happens on server start
+# The model and index load on a background thread: the server answers the MCP handshake
+# and health checks right away, and tool calls wait until warm-up is done
 agent = TechnicalAgent()
+server_timings = {"imports_ms": round((time.perf_counter() - _process_start) * 1000, 2)}
+print(f"[Tech Server] Serving protocol {server_timings['imports_ms']} ms after start, agent warming up", file=sys.stderr)
 
 @mcp.tool()
-def search_technical_manual(query: str) -> str:
+@traced_tool(mcp)
+async def search_technical_manual(query: str) -> str:
     """
     Searches the technical knowledge base (manuals) for a solution to the user's problem.
     Uses vector search (RAG) to find the most relevant section.
     """
     try:
-        return agent.search_manual(query)
+        # Runs off the event loop, so protocol traffic keeps flowing during the search
+        return await asyncio.to_thread(agent.search_manual, query)
     except Exception as e:
         return f"Error searching manual: {str(e)}"
 
+@mcp.tool()
+@traced_tool(mcp)
+async def search_technical_manual_batch(queries: list[str], top_k: int = 3) -> str:
+    """
+    Searches the technical manual for many queries in one call (batched embedding
+    and vector search). Returns a JSON string with the top_k sections and their
+    similarity scores for each query, in the same order as the queries.
+    """
+    try:
+        results = await asyncio.to_thread(agent.search_manual_batch, queries, top_k)
+        return dumps({"status": "SUCCESS", "results": results})
+    except Exception as e:
+        return dumps({"status": "ERROR", "message": str(e)})
+
+@mcp.tool()
+@traced_tool(mcp)
+async def classify_intent(query: str) -> str:
+    """
+    Scores a query against each intent's example phrases (embedded at warm-up).
+    Returns a JSON string with the best cosine similarity per intent.
+    """
+    try:
+        scores = await asyncio.to_thread(agent.classify_intent, query)
+        return dumps({"status": "SUCCESS", "scores": scores})
+    except Exception as e:
+        return dumps({"status": "ERROR", "message": str(e)})
+
+@mcp.tool()
+def get_search_cache_stats() -> str:
+    """Returns the hit/miss counters of the manual search caches as a JSON string."""
+    return dumps(agent.search_cache_stats())
+
+@mcp.tool()
+def get_health() -> str:
+    """Returns warm-up state and startup phase timings as a JSON string. Never blocks."""
+    return dumps(dict(agent.health(), server_timings_ms=server_timings))
+
 if __name__ == "__main__":
     mcp.run()
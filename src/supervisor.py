@@ -1,4 +1,5 @@
 from src.billing_agent import BillingAgent
+from src.router import NO_INTENT_MESSAGE, IntentRouter
 from src.tech_agent import TechnicalAgent
 
 class SupervisorAgent:
@@ -6,6 +7,7 @@ class SupervisorAgent:
         print("[Supervisor] Initializing Team...")
         self.billing_agent = BillingAgent()
         self.tech_agent = TechnicalAgent()
+        self.router = IntentRouter(classifier=self.tech_agent.classify_intent)
         print("[Supervisor] Team Ready.")
 
     def handle_request(self, customer_id, query):
@@ -16,13 +18,14 @@ class SupervisorAgent:
         
         response_parts = []
         
-        # --- 1. INTENT DETECTION (Simple Keyword Rule-Based) ---
-        intent_billing = any(word in query.lower() for word in ['bill', 'invoice', 'cost', 'expensive', 'euro', '€'])
-        intent_tech = any(word in query.lower() for word in ['internet', 'slow', 'wifi', 'connection', 'cut', 'light', 'box'])
+        # --- 1. INTENT DETECTION (keywords, then semantic fallback) ---
+        intents = self.router.route(query)
+        intent_billing = "billing" in intents
+        intent_tech = "tech" in intents
         
         # Default to both if unsure, or just say I don't know
-        if not intent_billing and not intent_tech:
-            return "I'm sorry, I didn't understand your request. Please mention 'bill' or 'internet'."
+        if not intents:
+            return NO_INTENT_MESSAGE
 
         # --- 2. DELEGATION ---
         
@@ -1,172 +1,453 @@
-import subprocess
+import asyncio
+import os
 import sys
-import json
-import threading
 import time
+from src.admission import AdmissionController, DeadlineExceeded, Overloaded
+from src.cache import SingleFlight, TTLCache
+from src.mcp_client import AgentDaemonPool, MCPServerPool
+from src.metrics import RESPONSE_CACHE_LOOKUPS
+from src.router import NO_INTENT_MESSAGE, IntentRouter, normalize_query
+from src.serialization import loads
+from src.tracing import span
+
+# Per-agent deadlines (seconds) for a single /analyze request
+AGENT_DEADLINES = {
+    "billing": float(os.environ.get("SENTINEL_BILLING_DEADLINE_S", "5")),
+    "tech": float(os.environ.get("SENTINEL_TECH_DEADLINE_S", "10")),
+}
+# How long a server may take to answer the MCP handshake (model loading included)
+STARTUP_TIMEOUT_S = float(os.environ.get("SENTINEL_STARTUP_TIMEOUT_S", "120"))
+AGENT_LABELS = {"billing": "Billing Agent", "tech": "Tech Agent"}
+# Modules run as MCP servers (benchmarks swap in stubs with a fixed latency)
+SERVER_MODULES = {
+    "billing": os.environ.get("SENTINEL_BILLING_SERVER_MODULE", "src.servers.billing_server"),
+    "tech": os.environ.get("SENTINEL_TECH_SERVER_MODULE", "src.servers.tech_server"),
+}
+# /analyze answers cached per (customer, intents, normalized query, data versions); size 0 disables
+RESPONSE_CACHE_SIZE = int(os.environ.get("SENTINEL_RESPONSE_CACHE_SIZE", "10000"))
+RESPONSE_CACHE_TTL_S = float(os.environ.get("SENTINEL_RESPONSE_CACHE_TTL_S", "60"))
+# How often the billing data_version and the manual's index_version are re-read from the servers
+DATA_VERSION_REFRESH_S = float(os.environ.get("SENTINEL_DATA_VERSION_REFRESH_S", "5"))
+# Socket of a shared agent daemon (python -m src.agent_daemon); when set, workers connect to
+# its server pools instead of spawning their own servers
+AGENT_DAEMON_SOCKET = os.environ.get("SENTINEL_AGENT_DAEMON_SOCKET")
+# Connections each worker keeps open to the daemon, per agent
+AGENT_DAEMON_CONNECTIONS = int(os.environ.get("SENTINEL_AGENT_DAEMON_CONNECTIONS", "4"))
+
+
+class InvalidBills(ValueError):
+    """The Billing Server rejected an ingestion batch (bad date, amount...); nothing was applied."""
+
+
+def _pool_sizes(agent, default_min=1):
+    """Reads SENTINEL_<AGENT>_REPLICAS and SENTINEL_<AGENT>_MAX_REPLICAS."""
+    prefix = f"SENTINEL_{agent.upper()}"
+    min_size = int(os.environ.get(f"{prefix}_REPLICAS", default_min))
+    max_size = int(os.environ.get(f"{prefix}_MAX_REPLICAS", min_size))
+    return min_size, max_size
+
+
+def build_server_pools():
+    """
+    The agent server pools, {agent: MCPServerPool}: each agent runs as a pool of
+    server processes (N replicas, least-loaded routing).
+    Used by the supervisor, or by the agent daemon to share them between workers.
+    """
+    # We need to find the project root
+    project_root = os.getcwd() # Assumption: running from Sentinel root or passed in
+    if "Sentinel" not in project_root and os.path.exists("Sentinel"):
+        project_root = os.path.join(project_root, "Sentinel")
+
+    env = os.environ.copy()
+    env["PYTHONPATH"] = project_root
+
+    billing_min, billing_max = _pool_sizes("billing")
+    billing_pool = MCPServerPool(
+        "billing",
+        sys.executable, 
+        ["-m", SERVER_MODULES["billing"]],
+        cwd=project_root,
+        env=env,
+        min_size=billing_min,
+        max_size=billing_max,
+        startup_timeout=STARTUP_TIMEOUT_S,
+        # Ingested bills reach new replicas as one state snapshot plus the latest ingestions
+        snapshot_tools=("export_ingested_bills", "restore_ingested_bills")
+    )
+    
+    tech_min, tech_max = _pool_sizes("tech")
+    tech_pool = MCPServerPool(
+        "tech",
+        sys.executable, 
+        ["-m", SERVER_MODULES["tech"]],
+        cwd=project_root,
+        env=env,
+        min_size=tech_min,
+        max_size=tech_max,
+        startup_timeout=STARTUP_TIMEOUT_S,
+        # The tech server answers the handshake while its model is still loading
+        ready_tool="get_health"
+    )
+    return {"billing": billing_pool, "tech": tech_pool}
 
-class SimpleMCPClient:
-    def __init__(self, command, args, cwd=None, env=None):
-        self.command = command
-        self.args = args
-        self.cwd = cwd
-        self.env = env
-        self.process = None
-        self.request_id = 0
-        self.lock = threading.Lock()
-
-    def start(self):
-        full_cmd = [self.command] + self.args
-        print(f"Starting MCP Server: {' '.join(full_cmd)}")
-        self.process = subprocess.Popen(
-            full_cmd,
-            cwd=self.cwd,
-            env=self.env,
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=sys.stderr, # Redirect stderr to main process stderr
-            text=True,
-            bufsize=1 # Line buffered
-        )
-        # Verify it started
-        time.sleep(1)
-        if self.process.poll() is not None:
-            raise RuntimeError(f"Server failed to start. Return code: {self.process.returncode}")
 
-    def call_tool(self, tool_name, arguments):
+class SupervisorAgentMCP:
+    def __init__(self, agent_deadlines=None, daemon_socket=AGENT_DAEMON_SOCKET):
+        print("[Supervisor MCP] Initializing Custom Clients...")
+        self.agent_deadlines = dict(AGENT_DEADLINES, **(agent_deadlines or {}))
+
+        if daemon_socket:
+            # The servers live in the agent daemon, shared by every worker on the machine:
+            # this process only holds socket connections, not its own DataFrame and model copies
+            print(f"[Supervisor MCP] Using the agent daemon at {daemon_socket}")
+            self.billing_pool = AgentDaemonPool(
+                "billing", daemon_socket, connections=AGENT_DAEMON_CONNECTIONS, startup_timeout=STARTUP_TIMEOUT_S
+            )
+            self.tech_pool = AgentDaemonPool(
+                "tech", daemon_socket, connections=AGENT_DAEMON_CONNECTIONS, startup_timeout=STARTUP_TIMEOUT_S
+            )
+        else:
+            pools = build_server_pools()
+            self.billing_pool = pools["billing"]
+            self.tech_pool = pools["tech"]
+        # Keywords first; queries without any go to the Tech Server's embedding classifier
+        self.router = IntentRouter(classifier=self._classify_intent)
+        self.response_cache = TTLCache(maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL_S)
+        self.singleflight = SingleFlight()
+        # Bounded queue and concurrency limit per agent; a full queue sheds the request (503)
+        self.admission = AdmissionController(AGENT_LABELS)
+        self.data_versions = {"billing": None, "tech": None}
+        self._version_task = None
+        self.boot_time_ms = None
+
+    async def start(self):
         """
-        Sends a JSON-RPC request to execute a tool.
-        Docs: https://www.jsonrpc.org/specification
+        Spawns all MCP servers in parallel (must run inside the event loop that will use them).
+        Returns once every pool has completed the MCP handshake; raises the first pool's
+        error otherwise, the pools' monitors and the version watcher carrying on regardless.
         """
-        if not self.process:
-            self.start()
-
-        with self.lock:
-            self.request_id += 1
-            current_id = self.request_id
-
-        # 1. Structure the request
-        # MCP uses 'tools/call' method usually, but FastMCP simplifies it. 
-        # Actually FastMCP expects specific JSON-RPC method names.
-        # Let's try the standard 'call_tool' format or direct method name based on inspection.
-        # fastmcp uses 'tools/call'
-        
-        req = {
-            "jsonrpc": "2.0",
-            "method": "tools/call", 
-            "params": {
-                "name": tool_name,
-                "arguments": arguments
-            },
-            "id": current_id
+        start_time = time.perf_counter()
+        results = await asyncio.gather(self.billing_pool.start(), self.tech_pool.start(), return_exceptions=True)
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if not errors:
+            self.boot_time_ms = round((time.perf_counter() - start_time) * 1000, 2)
+            print(f"[Supervisor MCP] All servers ready in {self.boot_time_ms} ms")
+        if self.response_cache.maxsize > 0:
+            if not errors:
+                try:
+                    await self.refresh_data_versions()
+                except Exception as e:
+                    # Not ready until the watcher gets them: answers cached under unknown versions would be wasted
+                    print(f"[Supervisor MCP] Could not read data versions: {e}", file=sys.stderr)
+            # Started even when a pool failed its first boot: the worker turns ready once
+            # the pool's monitor has recovered it and the versions can be read
+            self._version_task = asyncio.create_task(self._watch_data_versions())
+        if errors:
+            raise errors[0]
+
+    @property
+    def ready(self):
+        if self.response_cache.maxsize > 0 and None in self.data_versions.values():
+            return False
+        return self.billing_pool.ready and self.tech_pool.ready
+
+    def status(self):
+        return {
+            "ready": self.ready,
+            "boot_time_ms": self.boot_time_ms,
+            "data_versions": dict(self.data_versions),
+            "response_cache": dict(self.response_cache.stats(), singleflight=self.singleflight.stats()),
+            "admission": self.admission.stats(),
+            "servers": {
+                "billing": self.billing_pool.status(),
+                "tech": self.tech_pool.status()
+            }
         }
-        
-        # 2. Send
-        try:
-            json_str = json.dumps(req)
-            self.process.stdin.write(json_str + "\n")
-            self.process.stdin.flush()
-        except BrokenPipeError:
-            raise RuntimeError("Server disconnected.")
-
-        # 3. Receive Response
-        # We need to read lines until we find the response with matching ID
-        while True:
-            line = self.process.stdout.readline()
-            if not line:
-                raise RuntimeError("Server closed connection.")
-            
+
+    async def stop(self):
+        if self._version_task:
+            self._version_task.cancel()
             try:
-                data = json.loads(line)
-                if data.get("id") == current_id:
-                    # Found our response
-                    if "error" in data:
-                        raise RuntimeError(f"Tool error: {data['error']}")
-                    
-                    # Result is in 'result' -> 'content' -> list
-                    # Verify structure matches MCP spec
-                    return data.get("result", {})
-            except json.JSONDecodeError:
-                continue # Ignore non-JSON log lines
-
-    def stop(self):
-        if self.process:
-            self.process.terminate()
+                await self._version_task
+            except asyncio.CancelledError:
+                pass
+        await self.billing_pool.stop()
+        await self.tech_pool.stop()
 
-class SupervisorAgentMCP:
-    def __init__(self):
-        print("[Supervisor MCP] Initializing Custom Clients...")
-        
-        # We need to find the project root
-        import os
-        project_root = os.getcwd() # Assumption: running from Sentinel root or passed in
-        if "Sentinel" not in project_root and os.path.exists("Sentinel"):
-            project_root = os.path.join(project_root, "Sentinel")
-
-        env = os.environ.copy()
-        env["PYTHONPATH"] = project_root
-
-        self.billing_client = SimpleMCPClient(
-            sys.executable, 
-            ["-m", "src.servers.billing_server"], 
-            cwd=project_root,
-            env=env
+    def _set_data_versions(self, billing=None, tech=None):
+        versions = {
+            "billing": self.data_versions["billing"] if billing is None else billing,
+            "tech": self.data_versions["tech"] if tech is None else tech,
+        }
+        if versions != self.data_versions:
+            # Entries under the old versions can never be hit again, free them now
+            self.response_cache.clear()
+            self.data_versions = versions
+            print(f"[Supervisor MCP] Data versions: {versions}", file=sys.stderr)
+
+    async def refresh_data_versions(self):
+        """Reads the billing data_version and the manual's index_version from every replica."""
+        billing_results, tech_results = await asyncio.gather(
+            self.billing_pool.call_all("get_data_version", {}),
+            self.tech_pool.call_all("get_health", {})
         )
+        billing_versions = [loads(result['content'][0]['text'])['data_version'] for result in billing_results]
+        index_versions = {str(loads(result['content'][0]['text']).get('index_version')) for result in tech_results}
+        # Replicas that disagree (e.g. a manual changed between two boots) yield a distinct version
+        self._set_data_versions(billing=max(billing_versions), tech=",".join(sorted(index_versions)))
+
+    async def _watch_data_versions(self):
+        while True:
+            await asyncio.sleep(DATA_VERSION_REFRESH_S)
+            try:
+                await self.refresh_data_versions()
+            except Exception as e:
+                print(f"[Supervisor MCP] Could not refresh data versions: {e}", file=sys.stderr)
+
+    @staticmethod
+    def _format_billing(billing_result):
+        if billing_result.get('status') == 'SUCCESS':
+            if billing_result.get('is_anomaly'):
+                return f"⚠️ **BILLING ALERT**: {billing_result['message']}"
+            return f"✅ **Billing Status**: Normal."
+        return f"Storage Error: {billing_result.get('message')}"
+
+    async def _ask_billing(self, customer_id):
+        print("[Supervisor MCP] -> Calling Billing Server...")
+        # FastMCP returns result content list
+        result = await self.billing_pool.call_tool("detect_billing_anomaly", {"customer_id": customer_id})
         
-        self.tech_client = SimpleMCPClient(
-            sys.executable, 
-            ["-m", "src.servers.tech_server"], 
-            cwd=project_root,
-            env=env
+        # Extract text
+        # Format: {'content': [{'type': 'text', 'text': '...'}]}
+        content_text = result['content'][0]['text']
+        return self._format_billing(loads(content_text))
+
+    async def _ask_tech(self, query):
+        print("[Supervisor MCP] -> Calling Tech Server...")
+        result = await self.tech_pool.call_tool("search_technical_manual", {"query": query})
+        tech_solution = result['content'][0]['text']
+        return f"🔧 **Technical Support**: {tech_solution}"
+
+    async def _ask_billing_bulk(self, customer_ids):
+        """All billing lookups of a batch in one Billing Server call; returns {customer_id: answer}."""
+        print(f"[Supervisor MCP] -> Calling Billing Server for {len(customer_ids)} customers...")
+        result = await self.billing_pool.call_tool("detect_billing_anomalies_bulk", {"customer_ids": customer_ids})
+        bulk_result = loads(result['content'][0]['text'])
+        if bulk_result.get('status') != 'SUCCESS':
+            raise RuntimeError(bulk_result.get('message'))
+        return {
+            customer_id: self._format_billing(billing_result)
+            for customer_id, billing_result in zip(customer_ids, bulk_result['results'])
+        }
+
+    async def _ask_tech_batch(self, queries):
+        """All tech queries of a batch in one batched embedding and search call; returns {query: answer}."""
+        print(f"[Supervisor MCP] -> Calling Tech Server for {len(queries)} queries...")
+        result = await self.tech_pool.call_tool("search_technical_manual_batch", {"queries": queries, "top_k": 1})
+        batch_result = loads(result['content'][0]['text'])
+        if batch_result.get('status') != 'SUCCESS':
+            raise RuntimeError(batch_result.get('message'))
+        return {
+            query: f"🔧 **Technical Support**: {matches[0]['document'] if matches else 'No relevant info found.'}"
+            for query, matches in zip(queries, batch_result['results'])
+        }
+
+    async def _classify_intent(self, query):
+        result = await self.tech_pool.call_tool(
+            "classify_intent", {"query": query}, timeout=self.agent_deadlines["tech"]
         )
-        
-        # Start them to warm up
-        self.billing_client.start()
-        self.tech_client.start()
+        classification = loads(result['content'][0]['text'])
+        if classification.get('status') != 'SUCCESS':
+            raise RuntimeError(classification.get('message'))
+        return classification['scores']
 
-    async def handle_request_async(self, customer_id, query):
-        # We can implement this sync or async, but since our custom client is sync (blocking I/O),
-        # we will wrap it or just run it. For this demo, sync is fine inside async def.
-        
+    def _admit(self, agents):
+        """
+        Admits one call on each agent, all or none, before any of them starts.
+        Raises Overloaded when an agent's queue is full.
+        """
+        return self.admission.admit({agent: self.agent_deadlines[agent] for agent in agents})
+
+    async def _with_deadline(self, agent, call, ticket):
+        """
+        Awaits one agent call and returns (answer, outcome), outcome being 'ok', 'timeout' or 'error'.
+        The call first waits for a slot on the agent (ticket), then runs within what is left of
+        the agent's deadline (none when the deadline is 0 or None). Past the deadline, queued or
+        running, it is dropped and a timeout marker is returned; a failed call returns the error text.
+        """
+        deadline = self.agent_deadlines[agent]
+        try:
+            with span(f"agent.{agent}"):
+                async with ticket:
+                    if ticket.expires_at is None:
+                        return await call, "ok"
+                    return await asyncio.wait_for(call, max(ticket.expires_at - time.monotonic(), 0.0)), "ok"
+        except asyncio.TimeoutError:
+            print(f"[Supervisor MCP] -> {AGENT_LABELS[agent]} missed its {deadline}s deadline", file=sys.stderr)
+            return f"⏳ **{AGENT_LABELS[agent]} Timeout**: No answer within {deadline}s, this response is partial.", "timeout"
+        except Exception as e:
+            return f"{AGENT_LABELS[agent]} Error: {e}", "error"
+        finally:
+            # A call dropped while queued never started
+            call.close()
+
+    async def dispatch(self, customer_id, query):
+        """
+        Fans the request out to every agent the query needs, concurrently, so latency
+        is the slowest agent rather than the sum. Agents that miss their deadline are
+        reported with a timeout marker instead of holding up the others.
+        Returns a dict with the response text, a partial flag and the timed-out agents.
+        """
         print(f"\n[Supervisor MCP] Processing request for {customer_id}: '{query}'")
-        response_parts = []
-        
-        intent_billing = any(word in query.lower() for word in ['bill', 'invoice', 'cost', 'expensive', 'euro', '€'])
-        intent_tech = any(word in query.lower() for word in ['internet', 'slow', 'wifi', 'connection', 'cut', 'light', 'box'])
         
-        if intent_billing:
-            print("[Supervisor MCP] -> Calling Billing Server...")
-            try:
-                # FastMCP returns result content list
-                result = self.billing_client.call_tool("detect_billing_anomaly", {"customer_id": customer_id})
-                
-                # Extract text
-                # Format: {'content': [{'type': 'text', 'text': '...'}]}
-                content_text = result['content'][0]['text']
-                billing_result = json.loads(content_text)
-                
-                if billing_result.get('status') == 'SUCCESS':
-                    if billing_result.get('is_anomaly'):
-                        response_parts.append(f"⚠️ **BILLING ALERT**: {billing_result['message']}")
-                    else:
-                        response_parts.append(f"✅ **Billing Status**: Normal.")
-                else:
-                    response_parts.append(f"Storage Error: {billing_result.get('message')}")
-            except Exception as e:
-                response_parts.append(f"Billing Agent Error: {e}")
+        with span("intent_detection"):
+            intents = await self.router.route_async(query)
+        if not intents:
+            return {"response": NO_INTENT_MESSAGE, "partial": False, "timed_out": []}
 
-        if intent_tech:
-            print("[Supervisor MCP] -> Calling Tech Server...")
-            try:
-                result = self.tech_client.call_tool("search_technical_manual", {"query": query})
-                tech_solution = result['content'][0]['text']
-                response_parts.append(f"🔧 **Technical Support**: {tech_solution}")
-            except Exception as e:
-                 response_parts.append(f"Tech Agent Error: {e}")
+        if self.response_cache.maxsize <= 0:
+            return await self._answer(customer_id, query, intents)
+
+        # Versions are part of the key, so new bills or a new manual never serve an old answer
+        key = (customer_id, intents, normalize_query(query), self.data_versions["billing"], self.data_versions["tech"])
+        cached = self.response_cache.get(key)
+        if cached is not None:
+            RESPONSE_CACHE_LOOKUPS.inc(result="hit")
+            return dict(cached)
+        # Identical requests arriving while this one is computed wait for its answer
+        RESPONSE_CACHE_LOOKUPS.inc(result="coalesced" if key in self.singleflight else "miss")
+        return dict(await self.singleflight.do(key, lambda: self._answer(customer_id, query, intents, cache_key=key)))
+
+    async def _answer(self, customer_id, query, intents, cache_key=None):
+        # Only the agents the query needs are called
+        tickets = self._admit(agent for agent in AGENT_LABELS if agent in intents)
+        calls = {}
+        if "billing" in intents:
+            calls["billing"] = self._ask_billing(customer_id)
+        if "tech" in intents:
+            calls["tech"] = self._ask_tech(query)
+
+        try:
+            results = await asyncio.gather(*(self._with_deadline(agent, call, tickets[agent]) for agent, call in calls.items()))
+        finally:
+            for ticket in tickets.values():
+                ticket.close()
+        timed_out = [agent for agent, (_, outcome) in zip(calls, results) if outcome == "timeout"]
+
+        answer = {
+            "response": "\n\n".join(part for part, _ in results),
+            "partial": bool(timed_out),
+            "timed_out": timed_out
+        }
+        # Partial answers and agent errors are not worth repeating
+        if cache_key is not None and all(outcome == "ok" for _, outcome in results):
+            self.response_cache.set(cache_key, answer)
+        return answer
+
+    async def dispatch_batch(self, items):
+        """
+        Answers a batch of (customer_id, query) items with one call per agent: the
+        whole batch is routed first, then every billing lookup goes to the Billing
+        Server in one bulk call and every tech query into one batched search.
+        Returns one dict per item (as dispatch() does), in the order of the items.
+        """
+        print(f"\n[Supervisor MCP] Processing a batch of {len(items)} requests")
+        # Repeated queries, customers and tech questions are only routed and looked up once
+        unique_queries = list(dict.fromkeys(query for _, query in items))
+        with span("intent_detection", batch=len(items)):
+            intents_by_query = dict(zip(
+                unique_queries, await asyncio.gather(*(self.router.route_async(query) for query in unique_queries))
+            ))
+        routes = [intents_by_query[query] for _, query in items]
+
+        customer_ids = list(dict.fromkeys(customer_id for (customer_id, _), intents in zip(items, routes) if "billing" in intents))
+        queries = list(dict.fromkeys(query for (_, query), intents in zip(items, routes) if "tech" in intents))
+        # The whole batch takes one slot per agent it needs
+        tickets = self._admit(agent for agent, needed in (("billing", customer_ids), ("tech", queries)) if needed)
+        calls = {}
+        if customer_ids:
+            calls["billing"] = self._ask_billing_bulk(customer_ids)
+        if queries:
+            calls["tech"] = self._ask_tech_batch(queries)
+        try:
+            answers = dict(zip(calls, await asyncio.gather(
+                *(self._with_deadline(agent, call, tickets[agent]) for agent, call in calls.items())
+            )))
+        finally:
+            for ticket in tickets.values():
+                ticket.close()
 
-        return "\n\n".join(response_parts)
+        results = []
+        for (customer_id, query), intents in zip(items, routes):
+            if not intents:
+                results.append({"response": NO_INTENT_MESSAGE, "partial": False, "timed_out": []})
+                continue
+            parts, timed_out = [], []
+            for agent, key in (("billing", customer_id), ("tech", query)):
+                if agent not in intents:
+                    continue
+                agent_answers, outcome = answers[agent]
+                # A missed deadline or an error leaves one message instead of per-item answers
+                parts.append(agent_answers[key] if outcome == "ok" else agent_answers)
+                if outcome == "timeout":
+                    timed_out.append(agent)
+            results.append({"response": "\n\n".join(parts), "partial": bool(timed_out), "timed_out": timed_out})
+        return results
+
+    async def handle_request_async(self, customer_id, query):
+        # The clients are asyncio-native: awaiting a tool call never blocks the event loop,
+        # and concurrent requests are multiplexed over the same server pipes.
+        result = await self.dispatch(customer_id, query)
+        return result["response"]
+
+    async def scan_billing_anomalies_async(self, threshold=3.0, top_n=100):
+        """
+        Runs the fleet-wide anomaly scan on the Billing Server in a single tool call.
+        The scan takes a billing slot like any request: Overloaded when the queue is
+        full or the billing deadline passes before a slot frees up. Once running, it
+        is not cut short by that deadline.
+        """
+        print(f"[Supervisor MCP] -> Scanning all customers for billing anomalies (threshold={threshold}, top_n={top_n})...")
+        ticket = self._admit(["billing"])["billing"]
+        try:
+            with span("agent.billing"):
+                async with ticket:
+                    result = await self.billing_pool.call_tool("scan_billing_anomalies", {"threshold": threshold, "top_n": top_n})
+        except DeadlineExceeded:
+            raise Overloaded("billing", self.admission.queues["billing"].retry_after_s) from None
+        finally:
+            ticket.close()
+        scan_result = loads(result['content'][0]['text'])
+        if scan_result.get('status') != 'SUCCESS':
+            raise RuntimeError(f"Billing scan failed: {scan_result.get('message')}")
+        return scan_result
+
+    async def ingest_bills_async(self, records):
+        """
+        Applies new bills to every Billing Server replica, so whichever replica
+        answers next sees them. Replicas started later replay the same batches, and
+        a replica that fails one is replaced. Bills already known by billing_id are
+        skipped, so retrying a failed batch is safe.
+        """
+        print(f"[Supervisor MCP] -> Ingesting {len(records)} bills on every Billing Server replica...")
+        results = await self.billing_pool.call_all("ingest_bills", {"records": records}, replay=True)
+        ingest_results = [loads(result['content'][0]['text']) for result in results]
+        failed = [result for result in ingest_results if result.get('status') != 'SUCCESS']
+        if failed and all(result.get('error') == 'INVALID_RECORDS' for result in failed):
+            raise InvalidBills(failed[0].get('message'))
+        if failed:
+            raise RuntimeError(f"Billing ingestion failed: {failed[0].get('message')}")
+        self._set_data_versions(billing=max(result['data_version'] for result in ingest_results))
+        return dict(ingest_results[0], replicas=len(ingest_results))
 
 if __name__ == "__main__":
     # Test
-    import asyncio
-    sup = SupervisorAgentMCP()
-    print(asyncio.run(sup.handle_request_async("CUST_0001", "My bill is huge and internet is slow")))
+    async def main():
+        sup = SupervisorAgentMCP()
+        await sup.start()
+        try:
+            print(await sup.handle_request_async("CUST_0001", "My bill is huge and internet is slow"))
+        finally:
+            await sup.stop()
+
+    asyncio.run(main())
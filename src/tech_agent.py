@@ -1,38 +1,161 @@
 import os
-import chromadb
-from chromadb.utils import embedding_functions
+import hashlib
 import sys
+import threading
+import time
+from contextlib import contextmanager
+import numpy as np
+from src.cache import SemanticCache, TTLCache
+from src.embeddings import EMBEDDING_BACKEND, EMBEDDING_THREADS, load_embedding_model
+from src.paths import CACHE_DIR, DATA_DIR
+from src.router import INTENT_EXEMPLARS, normalize_query
+from src.tracing import span
 
 # --- FIX: Set cache paths BEFORE importing heavy libs to avoid permission errors ---
-CACHE_BASE = r"C:\Users\hayth\Desktop\SFR\Sentinel\cache"
+CACHE_BASE = CACHE_DIR
 os.environ['HF_HOME'] = os.path.join(CACHE_BASE, 'huggingface')
 os.environ['SENTENCE_TRANSFORMERS_HOME'] = os.path.join(CACHE_BASE, 'sentence_transformers')
 
+# sentence_transformers (torch) and chromadb are imported lazily on the warm-up thread
+from src.vector_store import create_vector_store
+
+# Use a lightweight embedding model
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+# 'chroma' (persistent ChromaDB) or 'numpy' (in-process exact search, best for small manuals)
+VECTOR_BACKEND = os.environ.get("SENTINEL_VECTOR_BACKEND", "chroma")
+
+# Search cache: exact hits on normalized query text, plus an optional semantic layer
+# that reuses an answer when a new query embedding is this similar to a cached one (0 disables it)
+QUERY_CACHE_SIZE = int(os.environ.get("SENTINEL_QUERY_CACHE_SIZE", "1024"))
+QUERY_CACHE_TTL_S = float(os.environ.get("SENTINEL_QUERY_CACHE_TTL_S", "3600"))
+SEMANTIC_CACHE_THRESHOLD = float(os.environ.get("SENTINEL_SEMANTIC_CACHE_THRESHOLD", "0.95"))
+
+def split_sections(text):
+    """
+    Splits the manual by sections into (id, title, document, content_hash) chunks.
+    Ids derive from the section title, so adding or removing a section does not
+    shift the ids (and force a re-embedding) of every section after it.
+    """
+    chunks = []
+    seen_ids = {}
+
+    for i, section in enumerate(text.split("##")):
+        content = section.strip()
+        if not content: continue
+
+        lines = content.split('\n')
+        title = lines[0] if lines else f"Doc {i}"
+        document = "## " + content
+
+        doc_id = "doc_" + hashlib.sha1(title.encode("utf-8")).hexdigest()[:16]
+        duplicates = seen_ids.get(doc_id, 0)
+        seen_ids[doc_id] = duplicates + 1
+        if duplicates:
+            doc_id = f"{doc_id}_{duplicates}"
+
+        content_hash = hashlib.sha256(document.encode("utf-8")).hexdigest()
+        chunks.append((doc_id, title, document, content_hash))
+
+    return chunks
+
+
 class TechnicalAgent:
-    def __init__(self, data_dir=r"C:\Users\hayth\Desktop\SFR\Sentinel\data"):
+    def __init__(self, data_dir=DATA_DIR, vector_backend=VECTOR_BACKEND, embedding_backend=EMBEDDING_BACKEND):
         self.data_dir = data_dir
         self.kb_file = os.path.join(data_dir, "knowledge_base.txt")
-        self.chroma_path = os.path.join(CACHE_BASE, "chroma_db")
+        self.vector_backend = vector_backend
+        self.embedding_backend = embedding_backend
+        # Fingerprint of the indexed sections, changes whenever the manual does
+        self.index_version = None
+
+        self.query_cache = TTLCache(maxsize=QUERY_CACHE_SIZE, ttl=QUERY_CACHE_TTL_S)
+        self.semantic_cache = (
+            SemanticCache(threshold=SEMANTIC_CACHE_THRESHOLD, maxsize=QUERY_CACHE_SIZE, ttl=QUERY_CACHE_TTL_S)
+            if SEMANTIC_CACHE_THRESHOLD > 0 else None
+        )
         
-        # Initialize ChromaDB with LOCAL persistence
+        # Heavy loading happens on a background thread, so the owning process can answer
+        # protocol and health traffic right away; searches wait until warm-up is done
+        self.startup_timings = {}
+        self._warmup_error = None
+        self._warmed_up = threading.Event()
+        self._warmup_thread = threading.Thread(target=self._warm_up, name="tech-agent-warmup", daemon=True)
+        self._warmup_thread.start()
+
+    @contextmanager
+    def _timed_phase(self, phase):
+        start_time = time.perf_counter()
         try:
-            self.chroma_client = chromadb.PersistentClient(path=self.chroma_path)
-            
-            # Use a lightweight embedding model
-            self.embedding_fn = embedding_functions.SentenceTransformerEmbeddingFunction(model_name="all-MiniLM-L6-v2")
-            
-            self.collection = self.chroma_client.get_or_create_collection(
-                name="tech_manuals",
-                embedding_function=self.embedding_fn
-            )
-            
-            # Load data immediately
-            self._load_knowledge_base()
+            yield
+        finally:
+            self.startup_timings[phase] = round((time.perf_counter() - start_time) * 1000, 2)
+
+    def _warm_up(self):
+        start_time = time.perf_counter()
+        # The agent computes embeddings itself; the vector store (LOCAL persistence) only indexes them
+        try:
+            with self._timed_phase("import_model_lib"):
+                import sentence_transformers  # noqa: F401
+            with self._timed_phase("load_model"):
+                self.model = load_embedding_model(EMBEDDING_MODEL, self.embedding_backend, EMBEDDING_THREADS)
+            with self._timed_phase("open_index"):
+                self.store = create_vector_store(self.vector_backend, CACHE_BASE)
+            with self._timed_phase("index_knowledge_base"):
+                self._load_knowledge_base()
+            with self._timed_phase("embed_intents"):
+                # One matrix of exemplar embeddings, plus the intent of each row
+                self._intent_labels = [intent for intent, phrases in INTENT_EXEMPLARS.items() for _ in phrases]
+                self._intent_embeddings = self._embed(
+                    [phrase for phrases in INTENT_EXEMPLARS.values() for phrase in phrases]
+                )
         except Exception as e:
+            self._warmup_error = e
             print(f"Error initializing Tech Agent: {e}", file=sys.stderr)
+        finally:
+            self.startup_timings["total"] = round((time.perf_counter() - start_time) * 1000, 2)
+            phases = ", ".join(f"{phase}: {ms} ms" for phase, ms in self.startup_timings.items())
+            print(f"[TechnicalAgent] Warm-up finished ({phases})", file=sys.stderr)
+            self._warmed_up.set()
+
+    @property
+    def ready(self):
+        return self._warmed_up.is_set() and self._warmup_error is None
+
+    def wait_until_ready(self, timeout=None):
+        """Blocks until warm-up is done; raises if it failed or did not finish in time."""
+        if not self._warmed_up.wait(timeout):
+            raise TimeoutError("Technical Agent is still warming up.")
+        if self._warmup_error is not None:
+            raise RuntimeError(f"Technical Agent failed to initialize: {self._warmup_error}")
+
+    def health(self):
+        """Non-blocking status, safe to call while warming up."""
+        return {
+            "ready": self.ready,
+            "warming_up": not self._warmed_up.is_set(),
+            "error": str(self._warmup_error) if self._warmup_error else None,
+            "embedding_backend": self.embedding_backend,
+            "startup_timings_ms": dict(self.startup_timings),
+            "index_version": self.index_version
+        }
+
+    def _embed(self, texts):
+        """Embeds texts in one batched forward pass, as unit-length float32 vectors."""
+        return self.model.encode(list(texts), normalize_embeddings=True, convert_to_numpy=True).astype(np.float32)
+
+    def _stored_hash(self, content_hash):
+        # Vectors from different embedding backends are close but not interchangeable,
+        # so switching backend re-embeds the manual (torch keeps the plain hash of older indexes)
+        if self.embedding_backend == "torch":
+            return content_hash
+        return f"{content_hash}:{self.embedding_backend}"
 
     def _load_knowledge_base(self):
-        """Reads the text file and indexes it."""
+        """
+        Reads the text file and indexes it incrementally: only sections whose content
+        hash is new or changed are (re-)embedded, and sections that disappeared from
+        the manual are deleted from the persisted index.
+        """
         if not os.path.exists(self.kb_file):
             print(f"Warning: Knowledge base not found at {self.kb_file}", file=sys.stderr)
             return
@@ -40,46 +163,133 @@ class TechnicalAgent:
         with open(self.kb_file, "r", encoding="utf-8") as f:
             text = f.read()
 
-        # Simple splitting by sections
-        sections = text.split("##")
-        
-        documents = []
-        ids = []
-        metadatas = []
+        chunks = split_sections(text)
 
-        for i, section in enumerate(sections):
-            content = section.strip()
-            if not content: continue
-            
-            lines = content.split('\n')
-            title = lines[0] if lines else f"Doc {i}"
-            
-            documents.append("## " + content)
-            ids.append(f"doc_{i}")
-            metadatas.append({"title": title})
+        try:
+            indexed_hashes = self.store.get_hashes()
+
+            wanted_ids = {doc_id for doc_id, _, _, _ in chunks}
+            removed_ids = [doc_id for doc_id in indexed_hashes if doc_id not in wanted_ids]
+            changed = [chunk for chunk in chunks if indexed_hashes.get(chunk[0]) != self._stored_hash(chunk[3])]
 
-        if documents:
-            try:
-                self.collection.upsert(
+            if removed_ids:
+                self.store.delete(removed_ids)
+            if changed:
+                documents = [document for _, _, document, _ in changed]
+                self.store.upsert(
+                    ids=[doc_id for doc_id, _, _, _ in changed],
                     documents=documents,
-                    ids=ids,
-                    metadatas=metadatas
+                    metadatas=[{"title": title, "content_hash": self._stored_hash(content_hash)} for _, title, _, content_hash in changed],
+                    embeddings=self._embed(documents)
                 )
-            except Exception as e:
-                print(f"Error upserting docs: {e}", file=sys.stderr)
+
+            print(
+                f"[TechnicalAgent] Knowledge base indexed: {len(changed)} embedded, "
+                f"{len(removed_ids)} removed, {len(chunks) - len(changed)} unchanged",
+                file=sys.stderr
+            )
+        except Exception as e:
+            print(f"Error upserting docs: {e}", file=sys.stderr)
+            return
+
+        fingerprint = "\n".join(sorted(f"{doc_id}:{content_hash}" for doc_id, _, _, content_hash in chunks))
+        index_version = hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()[:16]
+        if index_version != self.index_version:
+            # Cached answers may point at sections that changed
+            self._clear_search_cache()
+        self.index_version = index_version
+
+    def _clear_search_cache(self):
+        self.query_cache.clear()
+        if self.semantic_cache is not None:
+            self.semantic_cache.clear()
+
+    def search_cache_stats(self):
+        """Hit/miss counters of the exact and semantic search caches."""
+        return {
+            "index_version": self.index_version,
+            "exact": self.query_cache.stats(),
+            "semantic": self.semantic_cache.stats() if self.semantic_cache is not None else None
+        }
 
     def search_manual(self, query):
-        """Searches the knowledge base for a solution."""
+        """
+        Searches the knowledge base for a solution.
+        Repeated phrasings are answered from the exact cache, close paraphrases from
+        the semantic cache; only genuinely new queries reach the vector search.
+        """
+        cache_key = normalize_query(query)
+        cached = self.query_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         try:
-            results = self.collection.query(
-                query_texts=[query],
-                n_results=1
-            )
+            with span("tech.wait_ready"):
+                self.wait_until_ready()
+            with span("tech.embed"):
+                query_embedding = self._embed([query])[0]
+
+            if self.semantic_cache is not None:
+                answer = self.semantic_cache.get(query_embedding)
+                if answer is not None:
+                    self.query_cache.set(cache_key, answer)
+                    return answer
+
+            with span("tech.vector_search", backend=self.vector_backend):
+                matches = self.store.query([query_embedding], top_k=1)[0]
             
-            if not results['documents'] or not results['documents'][0]:
-                return "No relevant info found."
-                
-            return results['documents'][0][0]
+            if not matches:
+                answer = "No relevant info found."
+            else:
+                answer = matches[0]["document"]
         except Exception as e:
-            print(f"Error searching Chroma: {e}", file=sys.stderr)
+            print(f"Error searching {self.vector_backend} index: {e}", file=sys.stderr)
             return "Search failed."
+
+        self.query_cache.set(cache_key, answer)
+        if self.semantic_cache is not None:
+            self.semantic_cache.set(cache_key, query_embedding, answer)
+        return answer
+
+    def classify_intent(self, query):
+        """
+        Scores a query against the intent exemplars embedded at warm-up.
+        Returns {intent: cosine similarity to its closest exemplar}.
+        """
+        self.wait_until_ready()
+        with span("tech.classify_intent"):
+            similarities = self._intent_embeddings @ self._embed([query])[0]
+        scores = {}
+        for intent, similarity in zip(self._intent_labels, similarities):
+            scores[intent] = max(scores.get(intent, -1.0), round(float(similarity), 4))
+        return scores
+
+    def search_manual_batch(self, queries, top_k=3):
+        """
+        Searches the knowledge base for many queries at once: a single batched
+        embedding forward pass and a single multi-query vector search.
+        Returns, for each query in order, its top_k sections with similarity scores.
+        """
+        queries = list(queries)
+        if not queries:
+            return []
+
+        with span("tech.wait_ready"):
+            self.wait_until_ready()
+        with span("tech.embed", batch=len(queries)):
+            query_embeddings = self._embed(queries)
+        with span("tech.vector_search", backend=self.vector_backend, batch=len(queries)):
+            results = self.store.query(query_embeddings, top_k=top_k)
+
+        return [
+            [
+                {
+                    "id": match["id"],
+                    "title": match["metadata"].get("title"),
+                    "document": match["document"],
+                    "score": match["score"]
+                }
+                for match in matches
+            ]
+            for matches in results
+        ]
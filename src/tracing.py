@@ -0,0 +1,152 @@
+import contextvars
+import functools
+import inspect
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+from src.metrics import STAGE_LATENCY
+from src.serialization import dumps
+
+# Print one JSON line per finished trace to stderr (set to 0 to silence)
+TRACE_LOG = os.environ.get("SENTINEL_TRACE_LOG", "1") == "1"
+
+_current_trace = contextvars.ContextVar("sentinel_trace", default=None)
+
+
+class Trace:
+    """
+    The spans recorded for one request, keyed by its trace_id.
+    asyncio tasks and to_thread() workers copy the context they start from, so
+    spans recorded by concurrent agent calls all land in the same Trace.
+    """
+    def __init__(self, trace_id):
+        self.trace_id = trace_id
+        self.started_at = time.perf_counter()
+        self.spans = []
+
+    def add(self, name, start, duration_ms, **attributes):
+        span = {
+            "name": name,
+            "start_ms": round((start - self.started_at) * 1000, 3),
+            "duration_ms": round(duration_ms, 3),
+        }
+        if attributes:
+            span["attributes"] = attributes
+        self.spans.append(span)
+        return span
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "duration_ms": round((time.perf_counter() - self.started_at) * 1000, 3),
+            "spans": sorted(self.spans, key=lambda span: span["start_ms"])
+        }
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def current_trace_id():
+    trace = _current_trace.get()
+    return trace.trace_id if trace is not None else None
+
+
+@contextmanager
+def start_trace(trace_id, log=False):
+    """Makes a new Trace current for the enclosed code; with log=True it is printed when done."""
+    trace = Trace(trace_id)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+        if log and TRACE_LOG:
+            print(dumps({"trace": trace.to_dict()}), file=sys.stderr)
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Times the enclosed block as one pipeline stage: observed in the stage latency
+    histogram, and added to the current trace if there is one.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, start, (time.perf_counter() - start) * 1000, **attributes)
+
+
+def record_span(name, start, duration_ms, **attributes):
+    """Records an already-measured stage (start is a perf_counter() value)."""
+    STAGE_LATENCY.observe(duration_ms / 1000, stage=name)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(name, start, duration_ms, **attributes)
+
+
+def add_remote_spans(spans, start, replica=None):
+    """
+    Joins spans reported by an MCP server into the current trace. Their offsets are
+    relative to the server receiving the call, placed here at the call's start.
+    """
+    trace = _current_trace.get()
+    for remote in spans:
+        STAGE_LATENCY.observe(remote["duration_ms"] / 1000, stage=remote["name"])
+        if trace is not None:
+            attributes = dict(remote.get("attributes", {}), replica=replica) if replica else remote.get("attributes", {})
+            trace.add(remote["name"], start + remote["start_ms"] / 1000, remote["duration_ms"], **attributes)
+
+
+def _request_trace_id(mcp):
+    """Reads the trace_id the client put in the tools/call params._meta, if any."""
+    request_context = mcp.get_context().request_context
+    meta = getattr(request_context, "meta", None) if request_context is not None else None
+    return getattr(meta, "trace_id", None)
+
+
+def _traced_result(trace, text):
+    from mcp.types import CallToolResult, TextContent
+
+    # The payload travels once, as text; the server-side spans ride in the result _meta
+    return CallToolResult(
+        content=[TextContent(type="text", text=text)],
+        _meta={"trace_id": trace.trace_id, "spans": trace.to_dict()["spans"]}
+    )
+
+
+def traced_tool(mcp):
+    """
+    Decorator for MCP server tools returning a string (place it under @mcp.tool()).
+    The tool runs inside a trace keyed by the caller's trace_id and its spans are
+    sent back in the result _meta, so server-side timings join the API's trace.
+    """
+    from mcp.types import CallToolResult
+
+    def decorator(fn):
+        stage = f"server.{fn.__name__}"
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                with start_trace(_request_trace_id(mcp)) as trace:
+                    with span(stage):
+                        text = await fn(*args, **kwargs)
+                return _traced_result(trace, text)
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with start_trace(_request_trace_id(mcp)) as trace:
+                    with span(stage):
+                        text = fn(*args, **kwargs)
+                return _traced_result(trace, text)
+
+        # Same parameters as the tool; returning CallToolResult tells FastMCP not to add a
+        # structuredContent copy of the text, which would double every payload on the pipe
+        wrapper.__signature__ = inspect.signature(fn).replace(return_annotation=CallToolResult)
+        return wrapper
+
+    return decorator
@@ -0,0 +1,241 @@
+import json
+import os
+import sys
+import uuid
+
+import numpy as np
+
+
+class VectorStore:
+    """
+    Interface of the knowledge base index. Documents are stored together with
+    embeddings computed by the caller, so backends never load a model themselves.
+    query() returns, per query embedding, a list of
+    {"id", "document", "metadata", "score"} dicts sorted by cosine similarity.
+    """
+    def get_hashes(self):
+        """Maps every stored id to the content_hash kept in its metadata."""
+        raise NotImplementedError
+
+    def upsert(self, ids, documents, metadatas, embeddings):
+        raise NotImplementedError
+
+    def delete(self, ids):
+        raise NotImplementedError
+
+    def query(self, query_embeddings, top_k=1):
+        raise NotImplementedError
+
+    def count(self):
+        raise NotImplementedError
+
+
+class ChromaVectorStore(VectorStore):
+    """ChromaDB persistent collection using cosine distance."""
+    # Collections of earlier versions (L2 distance), dropped once the cosine one is used
+    LEGACY_COLLECTIONS = ("tech_manuals",)
+
+    def __init__(self, path, collection_name="tech_manuals_cosine"):
+        import chromadb
+
+        self.client = chromadb.PersistentClient(path=path)
+        for legacy_name in set(self.LEGACY_COLLECTIONS) & set(self._collection_names()) - {collection_name}:
+            self.client.delete_collection(legacy_name)
+            print(f"[Vector Store] Removed the legacy '{legacy_name}' collection", file=sys.stderr)
+        # Embeddings are always passed in, so the collection needs no embedding function
+        self.collection = self.client.get_or_create_collection(
+            name=collection_name,
+            metadata={"hnsw:space": "cosine"},
+            embedding_function=None
+        )
+
+    def _collection_names(self):
+        # Names with chromadb >= 0.6, Collection objects before
+        return [getattr(collection, "name", collection) for collection in self.client.list_collections()]
+
+    def get_hashes(self):
+        existing = self.collection.get(include=["metadatas"])
+        return {
+            doc_id: (metadata or {}).get("content_hash")
+            for doc_id, metadata in zip(existing["ids"], existing["metadatas"])
+        }
+
+    def upsert(self, ids, documents, metadatas, embeddings):
+        self.collection.upsert(
+            ids=list(ids),
+            documents=list(documents),
+            metadatas=list(metadatas),
+            embeddings=np.asarray(embeddings, dtype=np.float32).tolist()
+        )
+
+    def delete(self, ids):
+        self.collection.delete(ids=list(ids))
+
+    def count(self):
+        return self.collection.count()
+
+    def query(self, query_embeddings, top_k=1):
+        query_embeddings = np.asarray(query_embeddings, dtype=np.float32)
+        top_k = min(top_k, self.count())
+        if top_k == 0:
+            return [[] for _ in range(len(query_embeddings))]
+
+        results = self.collection.query(
+            query_embeddings=query_embeddings.tolist(),
+            n_results=top_k,
+            include=["documents", "metadatas", "distances"]
+        )
+        return [
+            [
+                {"id": doc_id, "document": document, "metadata": metadata or {}, "score": round(1 - distance, 4)}
+                for doc_id, document, metadata, distance in zip(ids, documents, metadatas, distances)
+            ]
+            for ids, documents, metadatas, distances in zip(
+                results["ids"], results["documents"], results["metadatas"], results["distances"]
+            )
+        ]
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    In-process exact search for small corpora (a few thousand chunks).
+    Unit-normalized embeddings live in a memory-mapped .npy file, documents and
+    metadata in a JSON sidecar naming that file; a query is one matrix product plus
+    a top-k partition.
+    """
+    # Embeddings file of indexes written before the sidecar named it
+    EMBEDDINGS_FILE = "embeddings.npy"
+    DOCUMENTS_FILE = "documents.json"
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        self.embeddings, self._embeddings_file = None, None
+        self.ids, self.documents, self.metadatas = [], [], []
+        documents_path = os.path.join(self.path, self.DOCUMENTS_FILE)
+        # A second try covers a writer replacing the index between our two reads
+        for _ in range(2):
+            try:
+                with open(documents_path, "r", encoding="utf-8") as f:
+                    stored = json.load(f)
+            except FileNotFoundError:
+                return
+            embeddings_file = stored.get("embeddings_file", self.EMBEDDINGS_FILE)
+            try:
+                embeddings = np.load(os.path.join(self.path, embeddings_file), mmap_mode="r")
+            except FileNotFoundError:
+                continue
+            if len(embeddings) != len(stored["ids"]):
+                # Torn index (e.g. left by an older version): start empty, the caller re-embeds
+                print(f"Warning: Vector index at {self.path} is inconsistent, rebuilding.", file=sys.stderr)
+                return
+            self.embeddings, self._embeddings_file = embeddings, embeddings_file
+            self.ids, self.documents, self.metadatas = stored["ids"], stored["documents"], stored["metadatas"]
+            return
+
+    def _save(self, embeddings):
+        # Every save writes its embeddings to a new file, and the sidecar naming that file is
+        # swapped in with a single rename: neither a crash nor a concurrent _load can pair the
+        # embeddings of one save with the documents of another. The temp name is per process,
+        # as several replicas may build the same index at once
+        embeddings_file = f"embeddings-{uuid.uuid4().hex}.npy"
+        with open(os.path.join(self.path, embeddings_file), "wb") as f:
+            np.save(f, embeddings)
+        documents_path = os.path.join(self.path, self.DOCUMENTS_FILE)
+        documents_tmp = f"{documents_path}.tmp-{os.getpid()}"
+        with open(documents_tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "embeddings_file": embeddings_file,
+                "ids": self.ids, "documents": self.documents, "metadatas": self.metadatas
+            }, f)
+        os.replace(documents_tmp, documents_path)
+
+        previous, self._embeddings_file = self._embeddings_file, embeddings_file
+        if previous and previous != embeddings_file:
+            # Readers that mapped it keep their mapping; later loads follow the new sidecar
+            try:
+                os.remove(os.path.join(self.path, previous))
+            except FileNotFoundError:
+                pass
+        self.embeddings = np.load(os.path.join(self.path, embeddings_file), mmap_mode="r")
+
+    @staticmethod
+    def _normalize(embeddings):
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.where(norms == 0, 1, norms)
+
+    def get_hashes(self):
+        return {doc_id: metadata.get("content_hash") for doc_id, metadata in zip(self.ids, self.metadatas)}
+
+    def upsert(self, ids, documents, metadatas, embeddings):
+        ids = list(ids)
+        replaced = set(ids)
+        keep = [i for i, doc_id in enumerate(self.ids) if doc_id not in replaced]
+
+        new_embeddings = self._normalize(embeddings)
+        if self.embeddings is not None and keep:
+            new_embeddings = np.concatenate([np.asarray(self.embeddings[keep]), new_embeddings])
+
+        self.ids = [self.ids[i] for i in keep] + ids
+        self.documents = [self.documents[i] for i in keep] + list(documents)
+        self.metadatas = [self.metadatas[i] for i in keep] + [dict(metadata) for metadata in metadatas]
+        self._save(new_embeddings)
+
+    def delete(self, ids):
+        removed = set(ids)
+        keep = [i for i, doc_id in enumerate(self.ids) if doc_id not in removed]
+        if len(keep) == len(self.ids):
+            return
+        self.ids = [self.ids[i] for i in keep]
+        self.documents = [self.documents[i] for i in keep]
+        self.metadatas = [self.metadatas[i] for i in keep]
+        self._save(np.asarray(self.embeddings[keep]))
+
+    def count(self):
+        return len(self.ids)
+
+    def query(self, query_embeddings, top_k=1):
+        queries = self._normalize(np.atleast_2d(query_embeddings))
+        top_k = min(top_k, self.count())
+        if top_k == 0:
+            return [[] for _ in range(len(queries))]
+
+        # (queries x documents) cosine similarities in one product
+        scores = queries @ self.embeddings.T
+        if top_k < scores.shape[1]:
+            candidates = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+        else:
+            candidates = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+        candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+        order = np.argsort(-candidate_scores, axis=1)
+        top_indices = np.take_along_axis(candidates, order, axis=1)
+
+        return [
+            [
+                {
+                    "id": self.ids[i],
+                    "document": self.documents[i],
+                    "metadata": self.metadatas[i],
+                    "score": round(float(scores[row, i]), 4)
+                }
+                for i in top_indices[row]
+            ]
+            for row in range(len(queries))
+        ]
+
+
+VECTOR_BACKENDS = {
+    "chroma": lambda cache_dir: ChromaVectorStore(os.path.join(cache_dir, "chroma_db")),
+    "numpy": lambda cache_dir: NumpyVectorStore(os.path.join(cache_dir, "numpy_index")),
+}
+
+
+def create_vector_store(backend, cache_dir):
+    """Builds the configured backend ('chroma' or 'numpy') under cache_dir."""
+    if backend not in VECTOR_BACKENDS:
+        raise ValueError(f"Unknown vector backend '{backend}'. Choose from: {', '.join(VECTOR_BACKENDS)}")
+    return VECTOR_BACKENDS[backend](cache_dir)
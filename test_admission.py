@@ -0,0 +1,59 @@
+import asyncio
+import time
+
+from src.admission import AgentQueue, DeadlineExceeded, Overloaded
+from src.supervisor_mcp import SupervisorAgentMCP
+
+
+async def _slow_answer(seconds, answer):
+    await asyncio.sleep(seconds)
+    return answer
+
+
+async def _queue_scenario():
+    queue = AgentQueue("test", max_concurrency=1, max_queue=1)
+    running = queue.admit()
+    queued = queue.admit(time.monotonic() + 0.05)
+
+    # 1. A FULL QUEUE REJECTS AT ONCE
+    try:
+        queue.admit()
+        print("❌ FAIL: A full queue admitted a call.")
+        return False
+    except Overloaded as e:
+        print(f"✅ PASS: Rejected with Retry-After {e.retry_after_s}s.")
+
+    # 2. A QUEUED CALL PAST ITS DEADLINE IS DROPPED BEFORE IT RUNS
+    await asyncio.sleep(0.1)
+    try:
+        async with queued:
+            print("❌ FAIL: An expired call got a slot.")
+            return False
+    except DeadlineExceeded:
+        print("✅ PASS: Expired call dropped while queued.")
+    running.close()
+    return queue.stats()["running"] == 0 and queue.stats()["queued"] == 0
+
+
+async def _no_deadline_scenario():
+    # 3. DEADLINE 0 MEANS NO DEADLINE: the call runs to completion, however long it takes
+    # (the servers are not started, the call does not need them)
+    supervisor = SupervisorAgentMCP(agent_deadlines={"billing": 0, "tech": None})
+    tickets = supervisor._admit(["billing", "tech"])
+    results = await asyncio.gather(
+        supervisor._with_deadline("billing", _slow_answer(0.05, "billing answer"), tickets["billing"]),
+        supervisor._with_deadline("tech", _slow_answer(0.05, "tech answer"), tickets["tech"])
+    )
+    print(results)
+    return results == [("billing answer", "ok"), ("tech answer", "ok")]
+
+
+def test_admission():
+    assert asyncio.run(_queue_scenario())
+    ok = asyncio.run(_no_deadline_scenario())
+    print("✅ PASS: Calls without a deadline are answered." if ok else "❌ FAIL: Calls without a deadline failed.")
+    assert ok
+
+
+if __name__ == "__main__":
+    test_admission()
@@ -1,4 +1,6 @@
 from src.billing_agent import BillingAgent
+import os
+import tempfile
 import pandas as pd
 
 def test_billing_agent():
@@ -40,5 +42,24 @@ def test_billing_agent():
     else:
         print("❌ FAIL: Agent flagged a normal bill as anomaly (False Positive).")
 
+def test_empty_billing_table():
+    print("\nInitializing Billing Agent on a header-only billing.csv...")
+    with tempfile.TemporaryDirectory() as data_dir:
+        with open(os.path.join(data_dir, "billing.csv"), "w") as f:
+            f.write("billing_id,customer_id,date,amount,is_anomaly_truth\n")
+        agent = BillingAgent(data_dir=data_dir)
+        assert agent.scan_billing_anomalies()["customers_scanned"] == 0
+
+        # Bills pushed at runtime are the only data
+        agent.ingest_bills([
+            {"customer_id": "CUST_NEW", "date": f"2026-0{month}-01", "amount": amount}
+            for month, amount in [(1, 40.0), (2, 42.0), (3, 41.0), (4, 400.0)]
+        ])
+        result = agent.detect_billing_anomaly("CUST_NEW")
+        print(result)
+        assert result["is_anomaly"]
+        print("✅ PASS: Agent starts empty and scores ingested bills.")
+
 if __name__ == "__main__":
     test_billing_agent()
+    test_empty_billing_table()
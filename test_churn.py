@@ -0,0 +1,47 @@
+from src.churn_agent import ChurnAgent
+import pandas as pd
+
+def test_churn_agent():
+    print("Initializing Churn Agent...")
+    agent = ChurnAgent()
+
+    # 1. COMPARE THE SCAN WITH THE GENERATOR'S HIDDEN LABELS
+    usage_df = pd.read_csv(agent.usage_file)
+    truth = set(usage_df.loc[usage_df['is_churn_risk_truth'], 'customer_id'])
+
+    scan = agent.scan_churn_risks()
+    flagged = {risk['customer_id'] for risk in scan['churn_risks']}
+    print(f"\nScan flagged {len(flagged)} customers, {len(truth)} labelled as churn risks.")
+
+    if flagged == truth:
+        print("✅ PASS: Scan matches the churn risk labels.")
+    else:
+        print(f"❌ FAIL: Missed {sorted(truth - flagged)}, false positives {sorted(flagged - truth)}.")
+
+    # 2. STREAM A COLLAPSE IN USAGE FOR A HEALTHY CUSTOMER
+    healthy_customer_id = sorted(set(usage_df['customer_id']) - truth)[0]
+    before = agent.get_churn_risk(healthy_customer_id)
+    print(f"\nTesting streaming updates on Customer: {healthy_customer_id}")
+    print(before)
+
+    last_date = pd.Timestamp(before['last_usage_date'])
+    for day in range(1, 31):
+        after = agent.record_usage(healthy_customer_id, last_date + pd.Timedelta(days=day), 0.5)
+    print(after)
+
+    if not before['is_churn_risk'] and after['is_churn_risk']:
+        print("✅ PASS: Agent picked up the usage drop from the new records.")
+    else:
+        print("❌ FAIL: Agent did not react to the usage drop.")
+
+    # 3. NON-FINITE USAGE IS REJECTED, LEAVING THE SCORE UNTOUCHED
+    for bad_usage in (float("nan"), float("inf"), "nan"):
+        try:
+            agent.record_usage(healthy_customer_id, last_date + pd.Timedelta(days=31), bad_usage)
+            print(f"❌ FAIL: Usage {bad_usage!r} was accepted.")
+        except ValueError as e:
+            print(f"✅ PASS: Rejected usage {bad_usage!r}: {e}")
+    assert agent.get_churn_risk(healthy_customer_id) == after
+
+if __name__ == "__main__":
+    test_churn_agent()
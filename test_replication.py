@@ -0,0 +1,70 @@
+import asyncio
+import os
+import sys
+
+from src.mcp_client import MCPServerPool
+from src.serialization import loads
+
+BILLS = [
+    {"customer_id": "CUST_REPL", "date": f"2031-0{month}-01", "amount": amount}
+    for month, amount in [(1, 40.0), (2, 42.0), (3, 41.0), (4, 400.0)]
+]
+
+
+def _payload(result):
+    return loads(result["content"][0]["text"])
+
+
+async def _state(replica):
+    version = _payload(await replica.call_tool("get_data_version", {}))["data_version"]
+    anomaly = _payload(await replica.call_tool("detect_billing_anomaly", {"customer_id": "CUST_REPL"}))
+    return version, anomaly.get("z_score")
+
+
+async def _scenario():
+    pool = MCPServerPool(
+        "billing", sys.executable, ["-m", "src.servers.billing_server"],
+        cwd=os.path.dirname(os.path.abspath(__file__)), min_size=2, max_size=2, health_interval=3600
+    )
+    await pool.start()
+    try:
+        # 1. ONE REPLICA APPLIES THE BATCH, THEN ITS ANSWER IS LOST
+        healthy, flaky = pool.replicas
+        call_tool = flaky.call_tool
+
+        async def applied_then_timed_out(tool_name, arguments, timeout=None):
+            await call_tool(tool_name, arguments, timeout=timeout)
+            raise asyncio.TimeoutError()
+
+        flaky.call_tool = applied_then_timed_out
+        results = await pool.call_all("ingest_bills", {"records": BILLS}, replay=True)
+        assert [_payload(result)["ingested"] for result in results] == [len(BILLS)]
+        assert flaky not in pool.replicas and len(pool.replicas) == 2 and pool.restarts == 1
+        states = [await _state(replica) for replica in pool.replicas]
+        print(states)
+        assert states[0] == states[1] and states[0][0] == 1
+        print("✅ PASS: The failed replica was replaced by one with the same bills.")
+
+        # 2. A CLIENT RETRY DOES NOT INGEST THE BATCH TWICE
+        results = await pool.call_all("ingest_bills", {"records": BILLS}, replay=True)
+        assert all(_payload(result)["duplicates"] == len(BILLS) for result in results)
+        assert [await _state(replica) for replica in pool.replicas] == states
+        print("✅ PASS: Re-sent bills were skipped on every replica.")
+
+        # 3. A BATCH EVERY REPLICA REJECTS IS NEITHER LOGGED NOR REPLACED
+        replay_log = list(pool._replay_log)
+        bad = [{"customer_id": "CUST_REPL", "date": "not a date", "amount": 1.0}]
+        results = await pool.call_all("ingest_bills", {"records": bad}, replay=True)
+        assert all(_payload(result)["status"] == "ERROR" for result in results)
+        assert pool._replay_log == replay_log and pool.restarts == 1
+        print("✅ PASS: Rejected batch left the pool untouched.")
+    finally:
+        await pool.stop()
+
+
+def test_replicated_ingest():
+    asyncio.run(_scenario())
+
+
+if __name__ == "__main__":
+    test_replicated_ingest()
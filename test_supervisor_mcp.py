@@ -4,6 +4,7 @@ from src.supervisor_mcp import SupervisorAgentMCP
 async def test_supervisor_mcp():
     print("Booting up Sentinel System (MCP Mode)...")
     supervisor = SupervisorAgentMCP()
+    await supervisor.start()
     
     # Customer ID (hardcoded for now as we don't have direct access to billing_agent inside supervisor client)
     target_customer = "CUST_0001" 
@@ -19,6 +20,8 @@ async def test_supervisor_mcp():
         import traceback
         traceback.print_exc()
         return
+    finally:
+        await supervisor.stop()
     
     print("\n" + "="*40)
     print("       FINAL RESPONSE FROM SENTINEL (MCP)       ")